@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+index.html资源依赖图与关键路径分析
+列出页面加载的全部脚本、样式、预加载、字体和图标，区分阻塞/非阻塞，
+检查预加载是否重复或未被使用，并按关键路径层级统计字节数，给出首次渲染的理论字节预算
+
+层级:
+    0  HTML文档本身
+    1  阻塞首次渲染: <head>中的样式表和同步脚本、内联脚本/样式
+    2  阻塞解析: <body>中的同步脚本（延迟其后内容和DOMContentLoaded）
+    3  非阻塞: async/defer/module脚本、预加载、图标、manifest
+
+用法（在站点根目录下运行）:
+    python3 asset_graph.py
+    python3 asset_graph.py --json
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from urllib.parse import urljoin, urlparse
+
+import html_scan
+import site_cache
+
+TIER_NAMES = {
+    0: 'HTML文档',
+    1: '阻塞渲染',
+    2: '阻塞解析',
+    3: '非阻塞',
+}
+
+# 只建立连接、不下载资源的link类型
+HINT_RELS = {'preconnect', 'dns-prefetch'}
+
+# 与资源加载无关的link类型
+IGNORED_RELS = {'canonical', 'alternate', 'author', 'license', 'me'}
+
+# 不影响渲染的样式表media
+NON_RENDER_MEDIA = {'print', 'speech'}
+
+CSS_IMPORT_RE = re.compile(r'@import\s+(?:url\(\s*)?["\']?([^"\')\s;]+)', re.IGNORECASE)
+
+ANY_TEXT = re.compile('')
+
+ASSET_QUERIES = [
+    html_scan.Query('scripts', tag='script', text=ANY_TEXT, find_all=True),
+    html_scan.Query('styles', tag='style', text=ANY_TEXT, find_all=True),
+    html_scan.Query('links', tag='link', attrs={'href': True}, find_all=True),
+]
+
+
+def _local_path(url, root):
+    """同站资源对应的本地文件路径；外部资源返回None"""
+    parsed = urlparse(url)
+    if parsed.scheme or parsed.netloc:
+        return None
+    return os.path.join(root, parsed.path.lstrip('/'))
+
+
+def _size(path):
+    if path and site_cache.exists(path):
+        return os.path.getsize(path)
+    return None
+
+
+def _resource(kind, element, url=None, root='.'):
+    local = _local_path(url, root) if url else None
+    return {
+        'kind': kind,
+        'url': url,
+        'local': local,
+        'exists': bool(local and os.path.exists(local)) if url else True,
+        'bytes': _size(local) if url else len((element.text or '').encode('utf-8')),
+        'in_head': element.in_head,
+        'line': element.line,
+        'order': element.index,
+        'attrs': element.attrs,
+        'tier': 3,
+        'blocking': False,
+        'imports': [],
+    }
+
+
+def _classify_script(resource):
+    attrs = resource['attrs']
+    script_type = attrs.get('type', '').lower()
+    if script_type and script_type not in ('text/javascript', 'module', 'application/javascript'):
+        # JSON-LD等数据块不执行
+        resource['kind'] = 'data'
+        return
+    if resource['url'] is None:
+        resource['kind'] = 'inline-script'
+        resource['blocking'] = True
+        resource['tier'] = 1 if resource['in_head'] else 2
+        return
+    if 'async' in attrs or 'defer' in attrs or script_type == 'module':
+        return
+    resource['blocking'] = True
+    resource['tier'] = 1 if resource['in_head'] else 2
+
+
+def _classify_link(resource):
+    rels = set(resource['attrs'].get('rel', '').lower().split())
+    if 'stylesheet' in rels:
+        resource['kind'] = 'stylesheet'
+        media = resource['attrs'].get('media', 'all').lower().strip()
+        if media in NON_RENDER_MEDIA or 'disabled' in resource['attrs']:
+            return
+        resource['blocking'] = True
+        resource['tier'] = 1
+    elif 'preload' in rels or 'modulepreload' in rels:
+        resource['kind'] = 'preload'
+    elif rels & HINT_RELS:
+        resource['kind'] = 'hint'
+    elif 'manifest' in rels:
+        resource['kind'] = 'manifest'
+    elif rels & {'icon', 'apple-touch-icon', 'shortcut', 'mask-icon'}:
+        resource['kind'] = 'icon'
+    else:
+        resource['kind'] = 'link:' + ' '.join(sorted(rels))
+
+
+def _css_imports(resource, root, seen):
+    """递归解析本地样式表中的@import（同样阻塞渲染）"""
+    if not resource['local'] or not resource['exists'] or resource['local'] in seen:
+        return
+    seen.add(resource['local'])
+    css = site_cache.read_text(resource['local'])
+    for match in CSS_IMPORT_RE.finditer(css):
+        url = urljoin(resource['url'], match.group(1))
+        local = _local_path(url, root)
+        child = {
+            'kind': 'stylesheet',
+            'url': url,
+            'local': local,
+            'exists': bool(local and os.path.exists(local)),
+            'bytes': _size(local),
+            'in_head': resource['in_head'],
+            'line': resource['line'],
+            'order': resource['order'],
+            'attrs': {},
+            'tier': resource['tier'],
+            'blocking': resource['blocking'],
+            'imports': [],
+        }
+        resource['imports'].append(child)
+        _css_imports(child, root, seen)
+
+
+def build_asset_graph(html_path='index.html', root=None):
+    """分析页面资源，返回 {'document', 'resources', 'issues', 'tiers', 'first_render_bytes'}"""
+    if root is None:
+        root = os.path.dirname(html_path) or '.'
+    found = html_scan.scan_file(html_path, ASSET_QUERIES)
+
+    resources = []
+    for element in found['scripts']:
+        resource = _resource('script', element, element.get('src') or None, root)
+        _classify_script(resource)
+        if resource['kind'] != 'data':
+            resources.append(resource)
+    for element in found['styles']:
+        resource = _resource('inline-style', element, None, root)
+        resource['blocking'] = True
+        resource['tier'] = 1
+        resources.append(resource)
+    for element in found['links']:
+        rels = set(element.get('rel', '').lower().split())
+        if rels and rels <= IGNORED_RELS:
+            continue
+        resource = _resource('link', element, element.get('href'), root)
+        _classify_link(resource)
+        resources.append(resource)
+    resources.sort(key=lambda r: r['order'])
+
+    seen_css = set()
+    for resource in resources:
+        if resource['kind'] == 'stylesheet':
+            _css_imports(resource, root, seen_css)
+
+    document = {'url': html_path, 'bytes': os.path.getsize(html_path)}
+    issues = find_issues(resources)
+    tiers = tier_totals(document, resources)
+    return {
+        'document': document,
+        'resources': resources,
+        'issues': issues,
+        'tiers': tiers,
+        'first_render_bytes': tiers[0]['bytes'] + tiers[1]['bytes'],
+        'first_render_unknown': tiers[1]['unknown'],
+    }
+
+
+def iter_resources(resources):
+    """依次返回所有资源，包括@import进来的样式表"""
+    for resource in resources:
+        yield resource
+        yield from iter_resources(resource['imports'])
+
+
+def find_issues(resources):
+    """找出重复预加载、未使用的预加载、阻塞渲染的脚本和缺失的本地文件"""
+    issues = []
+    fetched = {}
+    for resource in iter_resources(resources):
+        if resource['url'] and resource['kind'] in ('script', 'stylesheet'):
+            fetched.setdefault(resource['url'], resource)
+
+    preloads = {}
+    for resource in resources:
+        if resource['kind'] != 'preload':
+            continue
+        url = resource['url']
+        if url in preloads:
+            issues.append({'type': 'duplicate-preload', 'url': url, 'line': resource['line'],
+                           'message': f'重复预加载 {url}（第{preloads[url]["line"]}行已预加载）'})
+            continue
+        preloads[url] = resource
+        target = fetched.get(url)
+        expected = {'script': 'script', 'style': 'stylesheet'}.get(resource['attrs'].get('as', ''))
+        if target is None:
+            if expected in ('script', 'stylesheet'):
+                issues.append({'type': 'unused-preload', 'url': url, 'line': resource['line'],
+                               'message': f'预加载的 {url} 没有被页面使用'})
+        elif expected and target['kind'] != expected:
+            issues.append({'type': 'preload-type-mismatch', 'url': url, 'line': resource['line'],
+                           'message': f'预加载 {url} 的as属性与实际资源类型（{target["kind"]}）不符'})
+        elif target['tier'] == 1:
+            issues.append({'type': 'redundant-preload', 'url': url, 'line': resource['line'],
+                           'message': f'{url} 已在<head>中同步加载，预加载没有收益'})
+
+    for resource in resources:
+        if resource['kind'] == 'script' and resource['blocking']:
+            where = '<head>' if resource['in_head'] else '<body>'
+            issues.append({'type': 'blocking-script', 'url': resource['url'], 'line': resource['line'],
+                           'message': f'{where}中的同步脚本 {resource["url"]} 阻塞解析（可考虑defer）'})
+        if resource['kind'] == 'stylesheet' and resource['blocking'] and resource['local'] is None:
+            issues.append({'type': 'external-blocking-stylesheet', 'url': resource['url'], 'line': resource['line'],
+                           'message': f'外部样式表 {resource["url"]} 阻塞首次渲染'})
+
+    for resource in iter_resources(resources):
+        if resource['local'] and not resource['exists']:
+            issues.append({'type': 'missing-file', 'url': resource['url'], 'line': resource['line'],
+                           'message': f'本地文件不存在: {resource["local"]}'})
+    return issues
+
+
+def tier_totals(document, resources):
+    """按层级统计资源数、已知字节数和未知大小（外部）资源数"""
+    tiers = {tier: {'count': 0, 'bytes': 0, 'unknown': 0} for tier in TIER_NAMES}
+    tiers[0] = {'count': 1, 'bytes': document['bytes'], 'unknown': 0}
+    counted = set()
+    for resource in iter_resources(resources):
+        if resource['kind'] == 'hint':
+            continue
+        key = resource['url'] or id(resource)
+        if key in counted:
+            # 同一URL只下载一次（例如预加载后再使用），计入最早需要它的层级
+            continue
+        counted.add(key)
+        tier = resource['tier']
+        if resource['kind'] == 'preload' and resource['url']:
+            later = [r['tier'] for r in iter_resources(resources)
+                     if r['url'] == resource['url'] and r['kind'] != 'preload']
+            tier = min(later + [tier])
+        tiers[tier]['count'] += 1
+        if resource['bytes'] is None:
+            tiers[tier]['unknown'] += 1
+        else:
+            tiers[tier]['bytes'] += resource['bytes']
+    return tiers
+
+
+def print_report(graph):
+    """打印资源图和关键路径分析"""
+    print("🕸️ 资源依赖图与关键路径分析")
+    print("=" * 60)
+    print(f"📄 {graph['document']['url']} ({graph['document']['bytes']} 字节)")
+
+    def show(resource, indent='  '):
+        if resource['bytes'] is not None:
+            size = f"{resource['bytes']} 字节"
+        elif resource['local']:
+            size = '文件缺失'
+        else:
+            size = '外部/未知大小'
+        flag = '⛔' if resource['blocking'] else '  '
+        name = resource['url'] or f'(第{resource["line"]}行)'
+        print(f"{indent}{flag} [T{resource['tier']}] {resource['kind']:<14} {name} — {size}")
+        for child in resource['imports']:
+            show(child, indent + '    ')
+
+    for resource in graph['resources']:
+        show(resource)
+
+    print("\n📊 关键路径层级:")
+    for tier, name in TIER_NAMES.items():
+        totals = graph['tiers'][tier]
+        unknown = f"，{totals['unknown']} 个外部资源大小未知" if totals['unknown'] else ''
+        print(f"  T{tier} {name}: {totals['count']} 个资源，{totals['bytes']} 字节{unknown}")
+
+    print(f"\n🎯 首次渲染理论字节预算: {graph['first_render_bytes']} 字节"
+          + (f"（另有 {graph['first_render_unknown']} 个外部资源）" if graph['first_render_unknown'] else ''))
+
+    if graph['issues']:
+        print("\n⚠️ 发现的问题:")
+        for issue in graph['issues']:
+            print(f"  • 第{issue['line']}行: {issue['message']}")
+    else:
+        print("\n✅ 未发现问题")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='分析页面资源依赖和关键渲染路径')
+    parser.add_argument('html', nargs='?', default='index.html', help='页面文件')
+    parser.add_argument('--root', default=None, help='站点根目录（默认为页面所在目录）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    graph = build_asset_graph(args.html, args.root)
+    if args.json:
+        json.dump(graph, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(graph)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+批量图片处理
+对一个目录或通配符匹配的全部图片按同一个操作配方执行裁剪、缩放、旋转、翻转和滤镜，
+参数与编辑器的工具和滤镜一致。图片在进程池中流式处理: 同时在处理中的图片数量
+有上限（内存占用有界），输入通过mmap读取，每张图片处理完立即写出
+
+配方格式（JSON）:
+    {
+        "operations": [
+            {"tool": "crop", "x": 0, "y": 0, "width": 1600, "height": 1200},
+            {"tool": "resize", "width": 1200, "height": 800, "keepAspect": true},
+            {"tool": "rotate", "angle": 90},
+            {"tool": "flip", "direction": "horizontal"},
+            {"filter": "brightness", "value": 1.2},
+            {"filter": "contrast(1.1) blur(1px)"}
+        ],
+        "format": "jpeg",
+        "quality": 85
+    }
+
+输出目录中的 .batch-manifest.json 记录每个输出对应的配方哈希和输入文件状态，
+重新运行时只跳过配方、输出格式和输入都没有变化的图片
+
+用法:
+    python3 batch_process.py photos/ --recipe recipe.json --out processed/
+    python3 batch_process.py "photos/**/*.jpg" --recipe recipe.json --out processed/ --workers 8
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import math
+import mmap
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:
+    np = None
+    Image = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff')
+
+OUTPUT_FORMATS = {
+    'jpeg': '.jpg',
+    'png': '.png',
+    'webp': '.webp',
+}
+
+DEFAULT_QUALITY = 90
+
+# 每个工作进程同时最多排队的图片数
+WINDOW_PER_WORKER = 2
+
+# 输出目录中记录已生成输出的清单
+MANIFEST_FILE = '.batch-manifest.json'
+MANIFEST_VERSION = 1
+
+
+# ---- 配方 ----
+
+def _require(operation, *names):
+    for name in names:
+        if name not in operation:
+            raise ValueError(f'{operation} 缺少参数 {name}')
+
+
+def _numeric(operation, *names):
+    """把存在的数值参数统一转换为数字（接受"90"这样的字符串），类型不对时抛出ValueError"""
+    for name in names:
+        value = operation.get(name)
+        if value is None:
+            continue
+        try:
+            if isinstance(value, bool):
+                raise TypeError
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{operation} 的参数 {name} 必须是数字: {value!r}') from None
+        if not math.isfinite(number):
+            raise ValueError(f'{operation} 的参数 {name} 必须是有限的数字: {value!r}')
+        operation[name] = int(number) if number.is_integer() else number
+
+
+def load_recipe(path):
+    """读取并校验配方，滤镜参数统一解析为 [(名称, 参数)]"""
+    import image_filters
+
+    with open(path, encoding='utf-8') as f:
+        recipe = json.load(f)
+    if not isinstance(recipe, dict) or not isinstance(recipe.get('operations', []), list):
+        raise ValueError('配方必须是包含operations列表的JSON对象')
+    operations = []
+    for operation in recipe.get('operations', []):
+        if not isinstance(operation, dict):
+            raise ValueError(f'操作必须是JSON对象: {operation!r}')
+        operation = dict(operation)
+        if 'filter' in operation:
+            name = operation['filter']
+            if 'value' in operation:
+                name = f"{name}({operation['value']})"
+            operation['filters'] = image_filters.parse_filter(name)
+        elif operation.get('tool') == 'crop':
+            _require(operation, 'x', 'y', 'width', 'height')
+            _numeric(operation, 'x', 'y', 'width', 'height')
+        elif operation.get('tool') == 'resize':
+            if 'width' not in operation and 'height' not in operation:
+                raise ValueError('resize 需要 width 或 height')
+            _numeric(operation, 'width', 'height')
+        elif operation.get('tool') == 'rotate':
+            _require(operation, 'angle')
+            _numeric(operation, 'angle')
+            if operation['angle'] % 90:
+                raise ValueError(f"只支持90度倍数的旋转: {operation['angle']}")
+        elif operation.get('tool') == 'flip':
+            if operation.get('direction') not in ('horizontal', 'vertical'):
+                raise ValueError("flip 的 direction 必须是 horizontal 或 vertical")
+        else:
+            raise ValueError(f'未知的操作: {operation}')
+        operations.append(operation)
+    fmt = recipe.get('format')
+    if fmt is not None and fmt not in OUTPUT_FORMATS:
+        raise ValueError(f'不支持的输出格式: {fmt}')
+    options = {'quality': recipe.get('quality', DEFAULT_QUALITY)}
+    _numeric(options, 'quality')
+    return {
+        'operations': operations,
+        'format': fmt,
+        'quality': int(options['quality']),
+    }
+
+
+# ---- 操作 ----
+
+def crop(pixels, x, y, width, height):
+    """裁剪，超出图片的部分自动截掉"""
+    x0, y0 = max(0, int(x)), max(0, int(y))
+    x1 = min(pixels.shape[1], int(x) + int(width))
+    y1 = min(pixels.shape[0], int(y) + int(height))
+    if x1 <= x0 or y1 <= y0:
+        raise ValueError(f'裁剪区域在图片之外: {x},{y} {width}x{height}')
+    return pixels[y0:y1, x0:x1]
+
+
+def resize(pixels, width=None, height=None, keep_aspect=True):
+    """缩放；keepAspect时在width×height内等比缩放，只给一个边时按比例计算另一边"""
+    import canvas_sim
+
+    src_height, src_width = pixels.shape[:2]
+    if width is None:
+        width = round(src_width * height / src_height)
+    elif height is None:
+        height = round(src_height * width / src_width)
+    elif keep_aspect:
+        scale = min(width / src_width, height / src_height)
+        width, height = round(src_width * scale), round(src_height * scale)
+    width, height = max(1, int(width)), max(1, int(height))
+    if (width, height) == (src_width, src_height):
+        return pixels
+    return canvas_sim.resize_progressive(np.ascontiguousarray(pixels), width, height)
+
+
+def apply_operation(pixels, operation):
+    """执行配方中的一步"""
+    import image_filters
+
+    if 'filters' in operation:
+        return image_filters.apply_filters(pixels, operation['filters'])
+    tool = operation['tool']
+    if tool == 'crop':
+        return crop(pixels, operation['x'], operation['y'], operation['width'], operation['height'])
+    if tool == 'resize':
+        return resize(pixels, operation.get('width'), operation.get('height'), operation.get('keepAspect', True))
+    if tool == 'rotate':
+        # 编辑器的角度是顺时针
+        return np.rot90(pixels, k=-(int(operation['angle']) // 90) % 4)
+    if operation['direction'] == 'horizontal':
+        return pixels[:, ::-1]
+    return pixels[::-1]
+
+
+# ---- 工作进程 ----
+
+_recipe = None
+
+
+def _init_worker(recipe):
+    global _recipe
+    _recipe = recipe
+
+
+def read_image(path):
+    """通过mmap读取图片并解码为 (H, W, 4) 的uint8 RGBA"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError('空文件')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with Image.open(mapped) as image:
+                image.load()
+                return np.asarray(image.convert('RGBA'))
+
+
+def write_image(pixels, path, fmt, quality):
+    """编码并原子写入"""
+    import canvas_sim
+
+    if fmt == 'jpeg':
+        image = Image.fromarray(np.ascontiguousarray(canvas_sim.composite_over_white(pixels))[:, :, :3])
+        options = {'quality': quality, 'optimize': True, 'progressive': True}
+    else:
+        image = Image.fromarray(np.ascontiguousarray(pixels))
+        options = {'quality': quality} if fmt == 'webp' else {'optimize': True}
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, fmt.upper(), **options)
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def process_image(source, destination, fmt):
+    """在工作进程中处理一张图片，只把统计信息传回主进程"""
+    start = time.perf_counter()
+    result = {'source': source, 'output': destination, 'error': None}
+    try:
+        pixels = read_image(source)
+        result['input_size'] = [pixels.shape[1], pixels.shape[0]]
+        for operation in _recipe['operations']:
+            pixels = apply_operation(pixels, operation)
+        write_image(pixels, destination, fmt, _recipe['quality'])
+        result['output_size'] = [pixels.shape[1], pixels.shape[0]]
+        result['bytes'] = os.path.getsize(destination)
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    result['ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+# ---- 主流程 ----
+
+def iter_inputs(pattern, exclude=None):
+    """逐个返回 (输入文件, 相对路径)；目录按递归遍历，其他按通配符匹配
+
+    exclude 目录（输出目录位于输入目录中时）下的文件不作为输入，避免重复处理上次的输出
+    """
+    excluded = os.path.realpath(exclude) if exclude else None
+
+    def is_excluded(path):
+        return excluded is not None and (os.path.realpath(path) + os.sep).startswith(excluded + os.sep)
+
+    if os.path.isdir(pattern):
+        for directory, dirs, files in os.walk(pattern):
+            dirs[:] = sorted(d for d in dirs if not is_excluded(os.path.join(directory, d)))
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(directory, name)
+                    yield path, os.path.relpath(path, pattern)
+        return
+    # 相对路径从第一个含通配符的路径段之前算起
+    parts = []
+    for part in pattern.replace(os.sep, '/').split('/'):
+        if any(ch in part for ch in '*?['):
+            break
+        parts.append(part)
+    base = '/'.join(parts)
+    if not os.path.isdir(base):
+        base = os.path.dirname(base)
+    for path in glob.iglob(pattern, recursive=True):
+        if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS) and not is_excluded(path):
+            yield path, os.path.relpath(path, base or '.')
+
+
+def _output_path(relative, out_dir, fmt):
+    stem, ext = os.path.splitext(relative)
+    if fmt is None:
+        fmt = 'jpeg' if ext.lower() in ('.jpg', '.jpeg') else ext.lower().lstrip('.')
+        if fmt not in OUTPUT_FORMATS:
+            fmt = 'png'
+    return os.path.join(out_dir, stem + OUTPUT_FORMATS[fmt]), fmt
+
+
+def recipe_key(recipe, fmt):
+    """配方和输出格式的哈希；配方修改后已有的输出需要重新生成"""
+    text = json.dumps({'recipe': recipe, 'format': fmt}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def _source_signature(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_manifest(out_dir):
+    """读取输出清单: 相对输出路径 -> {'recipe', 'source'}"""
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('outputs', {})
+
+
+def save_manifest(out_dir, outputs):
+    """原子写入输出清单"""
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix=MANIFEST_FILE + '.')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'outputs': outputs}, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, os.path.join(out_dir, MANIFEST_FILE))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _up_to_date(entry, key, source, destination):
+    return (entry is not None and entry.get('recipe') == key
+            and entry.get('source') == _source_signature(source)
+            and os.path.exists(destination))
+
+
+def run_batch(pattern, recipe, out_dir, workers=None, overwrite=False, on_result=None):
+    """流式处理全部图片，返回汇总；on_result在每张图片完成时调用"""
+    workers = workers or os.cpu_count() or 1
+    window = workers * WINDOW_PER_WORKER
+    summary = {'processed': 0, 'skipped': 0, 'failed': 0, 'bytes': 0, 'megapixels': 0.0, 'results': []}
+    start = time.perf_counter()
+
+    inputs = iter_inputs(pattern, exclude=out_dir)
+    outputs = load_manifest(out_dir)
+    keys = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(recipe,)) as pool:
+        # future -> (清单中的输出路径, 清单条目)
+        running = {}
+
+        def fill():
+            # 只在窗口有空位时才继续读取输入，处理中的图片数始终不超过window
+            while len(running) < window:
+                try:
+                    source, relative = next(inputs)
+                except StopIteration:
+                    return
+                destination, fmt = _output_path(relative, out_dir, recipe['format'])
+                if fmt not in keys:
+                    keys[fmt] = recipe_key(recipe, fmt)
+                name = os.path.relpath(destination, out_dir)
+                if not overwrite and _up_to_date(outputs.get(name), keys[fmt], source, destination):
+                    summary['skipped'] += 1
+                    continue
+                entry = {'recipe': keys[fmt], 'source': _source_signature(source)}
+                running[pool.submit(process_image, source, destination, fmt)] = (name, entry)
+
+        try:
+            fill()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, entry = running.pop(future)
+                    result = future.result()
+                    summary['results'].append(result)
+                    if result['error']:
+                        summary['failed'] += 1
+                        outputs.pop(name, None)
+                    else:
+                        outputs[name] = entry
+                        summary['processed'] += 1
+                        summary['bytes'] += result['bytes']
+                        summary['megapixels'] += result['input_size'][0] * result['input_size'][1] / 1e6
+                    if on_result:
+                        on_result(result)
+                fill()
+        finally:
+            # 中断时也保存已完成的输出，下次运行可以跳过
+            save_manifest(out_dir, outputs)
+
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    summary['workers'] = workers
+    summary['megapixels'] = round(summary['megapixels'], 2)
+    return summary
+
+
+def print_result(result):
+    if result['error']:
+        print(f"❌ {result['source']}: {result['error']}")
+    else:
+        size = 'x'.join(map(str, result['output_size']))
+        print(f"✅ {result['source']} → {result['output']} ({size}, {result['bytes']} 字节, {result['ms']:.0f} ms)")
+
+
+def print_summary(summary):
+    print("\n" + "=" * 60)
+    print(f"📊 处理 {summary['processed']} 张，跳过 {summary['skipped']} 张，失败 {summary['failed']} 张")
+    if summary['seconds'] and summary['processed']:
+        print(f"⏱️ {summary['seconds']:.1f} 秒，{summary['workers']} 个进程，"
+              f"{summary['processed'] / summary['seconds']:.1f} 张/秒，"
+              f"{summary['megapixels'] / summary['seconds']:.1f} 百万像素/秒")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按配方批量处理图片')
+    parser.add_argument('input', help='图片目录或通配符（如 "photos/**/*.jpg"）')
+    parser.add_argument('--recipe', required=True, help='操作配方JSON文件')
+    parser.add_argument('--out', required=True, help='输出目录（保持输入的相对路径）')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='进程数（默认CPU核数）')
+    parser.add_argument('--overwrite', action='store_true', help='配方和输入都未变化的图片也重新处理')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出汇总')
+    args = parser.parse_args(argv)
+
+    if Image is None:
+        print("⚠️ 批量处理需要NumPy和Pillow（pip install numpy Pillow）")
+        return 1
+
+    try:
+        recipe = load_recipe(args.recipe)
+    except (OSError, ValueError) as e:
+        print(f"❌ 配方无效: {e}")
+        return 1
+
+    summary = run_batch(args.input, recipe, args.out, args.workers, args.overwrite,
+                        on_result=None if args.json else print_result)
+    if args.json:
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_summary(summary)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+前端资源构建
+按 index.html 中的声明顺序合并同步脚本和样式表，保守压缩后写入带内容哈希的文件名，
+并在输出目录中生成改写了 <script>/<link> 标签的 index.html 副本
+
+只有在页面中相邻（标签之间只有空白）且可以安全合并的资源才会打包在一起:
+    脚本    同源、同步（无async/defer/module）、除src外没有其他属性、'use strict'声明一致
+    样式表  同源、同一目录、media相同；带@import的文件只能位于包的开头
+
+压缩只做不改变语义的处理:
+    JS   去掉注释、缩进和多余空白，保留换行（避免影响自动分号插入）
+    CSS  去掉注释和多余空白，保留字符串和url()原样
+
+输出目录只包含改写后的页面和打包文件，部署时覆盖到站点根目录即可
+
+用法（在站点根目录下运行）:
+    python3 build_assets.py
+    python3 build_assets.py --out dist --json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from urllib.parse import urlparse
+
+import asset_graph
+import html_scan
+import js_tokens
+import site_cache
+
+DIST_DIR = 'dist'
+HASH_LENGTH = 8
+
+# 带内容哈希的文件名，例如 bundle.1a2b3c4d.js
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{%d}\.(?:js|css)$' % HASH_LENGTH)
+
+SCRIPT_TYPES = ('', 'text/javascript', 'application/javascript')
+
+CSS_CHARSET_RE = re.compile(r'^\s*@charset\s+["\'][^"\']*["\']\s*;', re.IGNORECASE)
+CSS_IMPORT_AT_RE = re.compile(r'@import\b', re.IGNORECASE)
+CSS_NO_SPACE_AROUND = set('{};,>')
+
+TAG_QUERIES = [
+    html_scan.Query('scripts', tag='script', attrs={'src': True}, find_all=True),
+    html_scan.Query('links', tag='link', attrs={'href': True}, find_all=True),
+]
+
+
+# ---- 压缩 ----
+
+def _is_ident_char(ch):
+    return ch.isalnum() or ch in '_$\\' or ord(ch) > 127
+
+
+def _js_needs_space(prev, token):
+    """两个相邻的JS词法单元之间是否必须保留空格"""
+    a = prev[-1]
+    b = token[0]
+    if _is_ident_char(a) and _is_ident_char(b):
+        return True
+    if a in '+-' and b == a:
+        return True
+    if a == '/' and b in '/*':
+        return True
+    return a.isdigit() and b == '.'
+
+
+def minify_js(source):
+    """保守压缩JavaScript: 去掉注释和多余空白，保留换行"""
+    parts = []
+    prev = None
+    newline = space = False
+    for token in js_tokens.tokenize(source):
+        if token.type == js_tokens.NEWLINE:
+            newline = True
+        elif token.type == js_tokens.WS:
+            space = True
+        elif token.type == js_tokens.COMMENT:
+            if '\n' in token.value:
+                newline = True
+            else:
+                space = True
+        else:
+            if prev is not None:
+                if newline:
+                    parts.append('\n')
+                elif space and _js_needs_space(prev, token.value):
+                    parts.append(' ')
+            parts.append(token.value)
+            prev = token.value
+            newline = space = False
+    return ''.join(parts) + '\n'
+
+
+def minify_css(source):
+    """保守压缩CSS: 去掉注释和多余空白，字符串、转义和url()保持原样"""
+    out = []
+    pending_space = False
+    i = 0
+    n = len(source)
+
+    def emit(text):
+        nonlocal pending_space
+        if pending_space and out and out[-1][-1] not in CSS_NO_SPACE_AROUND and text[0] not in CSS_NO_SPACE_AROUND:
+            out.append(' ')
+        pending_space = False
+        out.append(text)
+
+    while i < n:
+        ch = source[i]
+        if ch in ' \t\r\n\f':
+            pending_space = True
+            i += 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            pending_space = True
+        elif ch in '"\'':
+            j = i + 1
+            while j < n and source[j] != ch:
+                j += 2 if source[j] == '\\' else 1
+            emit(source[i:j + 1])
+            i = j + 1
+        elif ch == '\\':
+            emit(source[i:i + 2])
+            i += 2
+        elif source[i:i + 4].lower() == 'url(' and (not out or not _is_ident_char(out[-1][-1])):
+            j = i + 4
+            while j < n and source[j] in ' \t\r\n\f':
+                j += 1
+            if j < n and source[j] in '"\'':
+                # 带引号的url按普通字符串处理
+                emit(source[i:i + 4])
+                i = j
+                continue
+            end = source.find(')', j)
+            end = n - 1 if end == -1 else end
+            emit(source[i:end + 1])
+            i = end + 1
+        else:
+            if ch == '}' and out and out[-1] == ';':
+                out.pop()
+            emit(ch)
+            if ch == ':':
+                # 冒号之后的空白可以去掉，之前的不行（后代选择器 .a :hover）
+                while i + 1 < n and source[i + 1] in ' \t\r\n\f':
+                    i += 1
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+
+def content_hash(data):
+    """文件内容哈希（用于文件名）"""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+# ---- 打包计划 ----
+
+def _is_strict(source):
+    """脚本是否以 'use strict' 指令开头"""
+    for token in js_tokens.tokenize(source):
+        if token.type in (js_tokens.WS, js_tokens.NEWLINE, js_tokens.COMMENT):
+            continue
+        return token.type == js_tokens.STRING and token.value[1:-1] == 'use strict'
+    return False
+
+
+def _bundle_key(resource):
+    """资源可以与哪些相邻资源合并；不能打包时返回None"""
+    if not resource['local'] or not resource['exists'] or urlparse(resource['url']).query:
+        return None
+    attrs = resource['attrs']
+    if resource['kind'] == 'script':
+        if not resource['blocking'] or set(attrs) - {'src', 'type'}:
+            return None
+        if attrs.get('type', '').lower() not in SCRIPT_TYPES:
+            return None
+        return ('js', _is_strict(site_cache.read_text(resource['local'])))
+    if resource['kind'] == 'stylesheet':
+        if set(attrs) - {'rel', 'href', 'media', 'type'} or attrs.get('rel', '').lower() != 'stylesheet':
+            return None
+        media = attrs.get('media', 'all').strip().lower() or 'all'
+        return ('css', os.path.dirname(urlparse(resource['url']).path), media)
+    return None
+
+
+def plan_bundles(graph, text, doc, elements):
+    """把页面资源划分为若干个包，返回 [{'type', 'resources', 'spans'}]"""
+    bundles = []
+    current = None
+    last_end = None
+    for resource in graph['resources']:
+        element = elements.get(resource['order'])
+        if element is None or resource['kind'] not in ('script', 'stylesheet'):
+            continue
+        key = _bundle_key(resource)
+        span = html_scan.element_span(text, doc.line_starts, element)
+        adjacent = last_end is not None and not text[last_end:span[0]].strip()
+        imports = key and key[0] == 'css' and CSS_IMPORT_AT_RE.search(site_cache.read_text(resource['local']))
+        if key is None:
+            current = None
+        elif current is not None and current['key'] == key and adjacent and not imports:
+            current['resources'].append(resource)
+            current['spans'].append(span)
+        else:
+            current = {'key': key, 'type': key[0], 'resources': [resource], 'spans': [span]}
+            bundles.append(current)
+        last_end = span[1]
+    return bundles
+
+
+# ---- 构建 ----
+
+def _bundle_source(bundle, warnings):
+    """合并并压缩一个包的所有文件，返回 (压缩前字节数, 压缩后文本)"""
+    parts = []
+    raw_bytes = 0
+    for index, resource in enumerate(bundle['resources']):
+        source = site_cache.read_text(resource['local'])
+        raw_bytes += len(source.encode('utf-8'))
+        if bundle['type'] == 'js':
+            try:
+                parts.append(minify_js(source))
+            except js_tokens.JSSyntaxError as e:
+                warnings.append(f"{resource['url']}: {e}，按原样打包")
+                parts.append(source if source.endswith('\n') else source + '\n')
+        else:
+            if index:
+                source = CSS_CHARSET_RE.sub('', source)
+            parts.append(minify_css(source))
+    # 分号防止上一个文件末尾的表达式与下一个文件开头的括号连在一起
+    joiner = ';\n' if bundle['type'] == 'js' else ''
+    return raw_bytes, joiner.join(parts)
+
+
+def _bundle_url(bundle, digest, number):
+    first = urlparse(bundle['resources'][0]['url']).path
+    directory, filename = os.path.split(first)
+    stem, ext = os.path.splitext(filename)
+    if len(bundle['resources']) > 1:
+        stem = 'bundle' if number == 1 else f'bundle-{number}'
+    name = f'{stem}.{digest}{ext}'
+    return f'{directory}/{name}' if directory else name
+
+
+def _line_span(text, start, end):
+    """把要删除的标签扩展到整行（标签独占一行时）"""
+    line_start = text.rfind('\n', 0, start) + 1
+    if not text[line_start:start].strip():
+        start = line_start
+    line_end = text.find('\n', end)
+    line_end = len(text) if line_end == -1 else line_end + 1
+    if not text[end:line_end].strip():
+        end = line_end
+    return start, end
+
+
+def _replace_url(start_tag, attr, old, new):
+    pattern = re.compile(r'(\b%s\s*=\s*["\']?)%s' % (attr, re.escape(old)), re.IGNORECASE)
+    return pattern.sub(lambda m: m.group(1) + new, start_tag, count=1)
+
+
+def _remove_stale(directory, url, keep):
+    """删除同名包的旧哈希版本"""
+    stem, ext = os.path.splitext(os.path.basename(url))
+    stem = stem.rsplit('.', 1)[0]
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name != keep and name.startswith(stem + '.') and HASHED_NAME_RE.search(name) \
+                and name.endswith(ext) and name.count('.') == 2:
+            os.remove(os.path.join(directory, name))
+
+
+def build(html_path='index.html', out_dir=DIST_DIR, root=None):
+    """执行构建，返回构建报告"""
+    if root is None:
+        root = os.path.dirname(html_path) or '.'
+    graph = asset_graph.build_asset_graph(html_path, root)
+    doc = site_cache.load(html_path)
+    text = doc.text
+    found = html_scan.scan_file(html_path, TAG_QUERIES)
+    elements = {e.index: e for e in found['scripts'] + found['links']}
+
+    warnings = []
+    edits = []  # (开始, 结束, 替换文本)
+    report = []
+    bundled_urls = {}
+    numbers = {}
+    for bundle in plan_bundles(graph, text, doc, elements):
+        raw_bytes, minified = _bundle_source(bundle, warnings)
+        data = minified.encode('utf-8')
+        digest = content_hash(data)
+        if len(bundle['resources']) > 1:
+            numbers[bundle['type']] = numbers.get(bundle['type'], 0) + 1
+        url = _bundle_url(bundle, digest, numbers.get(bundle['type'], 1))
+
+        target = os.path.join(out_dir, url.lstrip('/'))
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        _remove_stale(os.path.dirname(target), url, os.path.basename(target))
+
+        attr = 'src' if bundle['type'] == 'js' else 'href'
+        first = bundle['resources'][0]
+        start, end = bundle['spans'][0]
+        edits.append((start, start + len(elements[first['order']].start_tag),
+                      _replace_url(elements[first['order']].start_tag, attr, first['url'], url)))
+        for start, end in bundle['spans'][1:]:
+            edits.append(_line_span(text, start, end) + ('',))
+        for resource in bundle['resources']:
+            bundled_urls[resource['url']] = url
+
+        report.append({
+            'type': bundle['type'],
+            'url': url,
+            'sources': [r['url'] for r in bundle['resources']],
+            'bytes_in': raw_bytes,
+            'bytes_out': len(data),
+        })
+
+    # 预加载改为指向包文件；同一个包只保留第一个预加载
+    preloaded = set()
+    for resource in graph['resources']:
+        if resource['kind'] != 'preload' or resource['url'] not in bundled_urls:
+            continue
+        element = elements[resource['order']]
+        start, end = html_scan.element_span(text, doc.line_starts, element)
+        url = bundled_urls[resource['url']]
+        if url in preloaded:
+            edits.append(_line_span(text, start, end) + ('',))
+        else:
+            preloaded.add(url)
+            edits.append((start, end, _replace_url(element.start_tag, 'href', resource['url'], url)))
+
+    html = text
+    for start, end, replacement in sorted(edits, reverse=True):
+        html = html[:start] + replacement + html[end:]
+    html_out = os.path.join(out_dir, os.path.basename(html_path))
+    os.makedirs(out_dir, exist_ok=True)
+    with open(html_out, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+    result = {
+        'html': html_out,
+        'bundles': report,
+        'requests_before': sum(len(b['sources']) for b in report),
+        'requests_after': len(report),
+        'bytes_in': sum(b['bytes_in'] for b in report),
+        'bytes_out': sum(b['bytes_out'] for b in report),
+        'warnings': warnings,
+    }
+    with open(os.path.join(out_dir, 'build-manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return result
+
+
+def print_report(result):
+    """打印构建结果"""
+    print("📦 前端资源构建")
+    print("=" * 60)
+    for bundle in result['bundles']:
+        saved = 1 - bundle['bytes_out'] / bundle['bytes_in'] if bundle['bytes_in'] else 0
+        print(f"✅ {bundle['url']}  ({len(bundle['sources'])} 个文件，"
+              f"{bundle['bytes_in']} → {bundle['bytes_out']} 字节，-{saved:.0%})")
+        for source in bundle['sources']:
+            print(f"     • {source}")
+    for warning in result['warnings']:
+        print(f"⚠️ {warning}")
+    print("=" * 60)
+    print(f"📋 请求数: {result['requests_before']} → {result['requests_after']}，"
+          f"字节数: {result['bytes_in']} → {result['bytes_out']}")
+    print(f"📄 已生成 {result['html']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='合并压缩脚本和样式表，生成带哈希文件名的页面副本')
+    parser.add_argument('html', nargs='?', default='index.html', help='页面文件')
+    parser.add_argument('--out', default=DIST_DIR, help='输出目录')
+    parser.add_argument('--root', default=None, help='站点根目录（默认为页面所在目录）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.html):
+        print(f"❌ {args.html} 不存在")
+        return 1
+
+    result = build(args.html, args.out, args.root)
+    if args.json:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(result)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+loadImage 画布处理流程的参考实现与基准测试
+用NumPy模拟 fix_image_import.fix_load_image_method 写入的 loadImage:
+读取文件（data URL）→ 解码 → 等比缩小到 1200×800 以内（最小100px）→
+白底绘制到主画布，再清空后绘制到当前图层（两次缩放绘制）
+
+比较以下策略在不同尺寸图片（100px到8K）上的耗时和峰值内存:
+    读取方式  data-url（FileReader.readAsDataURL）/ object-url（URL.createObjectURL）
+    绘制次数  double（每个画布各缩放一次）/ single（缩放一次，再1:1复制到主画布）
+    缩放方式  direct（一次双线性缩放）/ progressive（先逐级减半，再双线性缩放）
+
+并以面积平均缩放为参考计算各缩放方式的PSNR。解码器本身的开销不在模拟范围内，
+“文件”是未压缩的RGBA数据，两种读取方式解码的是同样的字节
+
+用法:
+    python3 canvas_sim.py
+    python3 canvas_sim.py --sizes 1920x1080,7680x4320 --repeat 5
+    python3 canvas_sim.py --json
+"""
+
+import argparse
+import base64
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 与 loadImage 中的常量保持一致
+MAX_WIDTH = 1200
+MAX_HEIGHT = 800
+MIN_SIZE = 100
+
+# 基准测试图片尺寸（宽, 高）
+CORPUS_SIZES = [
+    (100, 100),
+    (640, 480),
+    (1200, 800),
+    (1080, 1920),
+    (1920, 1080),
+    (4000, 3000),
+    (7680, 4320),
+]
+
+# 策略名: (读取方式, 绘制次数, 缩放方式)
+STRATEGIES = {
+    'current': ('data-url', 'double', 'direct'),
+    'data-url/double/progressive': ('data-url', 'double', 'progressive'),
+    'data-url/single/direct': ('data-url', 'single', 'direct'),
+    'data-url/single/progressive': ('data-url', 'single', 'progressive'),
+    'object-url/double/direct': ('object-url', 'double', 'direct'),
+    'object-url/double/progressive': ('object-url', 'double', 'progressive'),
+    'object-url/single/direct': ('object-url', 'single', 'direct'),
+    'object-url/single/progressive': ('object-url', 'single', 'progressive'),
+}
+
+# 生成/参考缩放时每次处理的行数，限制8K图片的临时内存
+CHUNK_ROWS = 512
+
+
+# ---- 尺寸计算 ----
+
+def fit_size(width, height, max_width=MAX_WIDTH, max_height=MAX_HEIGHT, min_size=MIN_SIZE):
+    """与loadImage相同的尺寸计算: 超出时等比缩小并向下取整，再各自保证最小尺寸"""
+    new_width, new_height = width, height
+    if new_width > max_width or new_height > max_height:
+        scale = min(max_width / new_width, max_height / new_height)
+        new_width = int(new_width * scale)
+        new_height = int(new_height * scale)
+    return max(new_width, min_size), max(new_height, min_size)
+
+
+# ---- 测试图片 ----
+
+def make_image(width, height):
+    """生成RGBA测试图: R通道是频率逐渐升到奈奎斯特频率的波带片（暴露缩放混叠），G/B是渐变"""
+    pixels = np.empty((height, width, 4), dtype=np.uint8)
+    k = np.float32(np.pi / max(width, height))
+    x = np.arange(width, dtype=np.float32) - width / 2
+    x2 = x * x
+    pixels[:, :, 1] = (np.arange(width, dtype=np.float32) * (255 / max(width - 1, 1))).astype(np.uint8)
+    for top in range(0, height, CHUNK_ROWS):
+        rows = np.arange(top, min(top + CHUNK_ROWS, height), dtype=np.float32)
+        y = rows - height / 2
+        phase = (y * y)[:, None] + x2[None, :]
+        phase *= k
+        np.sin(phase, out=phase)
+        phase *= 127.5
+        phase += 127.5
+        pixels[top:top + len(rows), :, 0] = phase.astype(np.uint8)
+        pixels[top:top + len(rows), :, 2] = (rows * (255 / max(height - 1, 1))).astype(np.uint8)[:, None]
+    pixels[:, :, 3] = 255
+    return pixels
+
+
+# ---- 读取方式 ----
+
+def read_as_data_url(data, mime='image/x-raw-rgba'):
+    """FileReader.readAsDataURL: 整个文件转为base64字符串"""
+    return f'data:{mime};base64,' + base64.b64encode(data).decode('ascii')
+
+
+def decode_data_url(url, shape):
+    """img.src = dataURL: 浏览器先把base64还原为字节再解码"""
+    data = base64.b64decode(url[url.index(',') + 1:])
+    return np.frombuffer(data, dtype=np.uint8).reshape(shape)
+
+
+def decode_object_url(data, shape):
+    """img.src = URL.createObjectURL(file): 直接引用文件字节"""
+    return np.frombuffer(data, dtype=np.uint8).reshape(shape)
+
+
+# ---- 缩放 ----
+
+def _sample_positions(n_out, n_in):
+    """输出像素中心对应的源坐标，返回 (下标0, 下标1, 权重)"""
+    pos = (np.arange(n_out, dtype=np.float32) + 0.5) * np.float32(n_in / n_out) - 0.5
+    np.clip(pos, 0, n_in - 1, out=pos)
+    i0 = pos.astype(np.intp)
+    i1 = np.minimum(i0 + 1, n_in - 1)
+    return i0, i1, pos - i0
+
+
+def resize_bilinear(src, width, height):
+    """drawImage的双线性插值: 每个输出像素只采样4个源像素，缩小倍数大时会混叠"""
+    y0, y1, fy = _sample_positions(height, src.shape[0])
+    x0, x1, fx = _sample_positions(width, src.shape[1])
+    fx = fx[None, :, None]
+    fy = fy[:, None, None]
+    rows0 = src.take(y0, axis=0)
+    rows1 = src.take(y1, axis=0)
+    top = rows0.take(x0, axis=1).astype(np.float32)
+    top += (rows0.take(x1, axis=1) - top) * fx
+    bottom = rows1.take(x0, axis=1).astype(np.float32)
+    bottom += (rows1.take(x1, axis=1) - bottom) * fx
+    top += (bottom - top) * fy
+    top += 0.5
+    return top.astype(np.uint8)
+
+
+def halve(src):
+    """2×2平均，尺寸减半（奇数时丢弃最后一行/列）"""
+    h, w = src.shape[0] // 2 * 2, src.shape[1] // 2 * 2
+    total = src[0:h:2, 0:w:2].astype(np.uint16)
+    total += src[1:h:2, 0:w:2]
+    total += src[0:h:2, 1:w:2]
+    total += src[1:h:2, 1:w:2]
+    total += 2
+    total >>= 2
+    return total.astype(np.uint8)
+
+
+def resize_progressive(src, width, height):
+    """逐级减半直到目标尺寸的两倍以内，最后一步双线性缩放"""
+    while src.shape[1] >= 2 * width and src.shape[0] >= 2 * height:
+        src = halve(src)
+    return resize_bilinear(src, width, height)
+
+
+def _area_weights(n_out, n_in):
+    """面积平均的权重矩阵 (n_out, n_in)：每个输出像素覆盖的源像素按重叠长度加权"""
+    scale = n_in / n_out
+    start = np.arange(n_out, dtype=np.float64)[:, None] * scale
+    end = start + scale
+    j = np.arange(n_in, dtype=np.float64)[None, :]
+    overlap = np.minimum(end, j + 1) - np.maximum(start, j)
+    np.clip(overlap, 0, None, out=overlap)
+    overlap /= overlap.sum(axis=1, keepdims=True)
+    return overlap.astype(np.float32)
+
+
+def resize_area(src, width, height):
+    """面积平均缩放，作为画质参考"""
+    wy = _area_weights(height, src.shape[0])
+    wx = _area_weights(width, src.shape[1])
+    out = np.zeros((src.shape[2], height, src.shape[1]), dtype=np.float32)
+    for top in range(0, src.shape[0], CHUNK_ROWS):
+        block = src[top:top + CHUNK_ROWS].astype(np.float32)
+        weights = wy[:, top:top + CHUNK_ROWS]
+        for c in range(src.shape[2]):
+            out[c] += weights @ block[:, :, c]
+    out = np.stack([out[c] @ wx.T for c in range(src.shape[2])], axis=-1)
+    out += 0.5
+    return np.clip(out, 0, 255).astype(np.uint8)
+
+
+RESIZERS = {
+    'direct': resize_bilinear,
+    'progressive': resize_progressive,
+}
+
+
+# ---- 合成 ----
+
+def composite_over_white(pixels):
+    """fillRect白底后以source-over绘制，返回不透明的主画布像素"""
+    alpha = pixels[:, :, 3:4].astype(np.uint16)
+    out = np.empty_like(pixels)
+    rgb = pixels[:, :, :3] * alpha + 255 * (255 - alpha) + 127
+    out[:, :, :3] = rgb // 255
+    out[:, :, 3] = 255
+    return out
+
+
+def load_image(data, shape, source='data-url', draws='double', resize='direct'):
+    """模拟loadImage，返回 (主画布, 当前图层) 像素"""
+    if source == 'data-url':
+        pixels = decode_data_url(read_as_data_url(data), shape)
+    else:
+        pixels = decode_object_url(data, shape)
+    width, height = fit_size(shape[1], shape[0])
+    resizer = RESIZERS[resize]
+
+    layer = resizer(pixels, width, height)
+    # 主画布: 白底上绘制；single时直接把图层1:1复制过去
+    canvas = composite_over_white(layer)
+    if draws == 'double':
+        # 图层画布clearRect后重新从原图缩放绘制
+        layer = resizer(pixels, width, height)
+    return canvas, layer
+
+
+# ---- 基准测试 ----
+
+def psnr(a, b):
+    """峰值信噪比（dB），完全相同时返回None"""
+    diff = a[:, :, :3].astype(np.float32) - b[:, :, :3]
+    mse = float(np.mean(diff * diff))
+    if mse == 0:
+        return None
+    return round(10 * np.log10(255 * 255 / mse), 2)
+
+
+def measure(func, repeat):
+    """中位耗时和单独一次运行中的峰值内存（不含输入文件本身）"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_ms': round(statistics.median(times) * 1000, 3),
+        'min_ms': round(min(times) * 1000, 3),
+        'peak_mb': round(peak / (1 << 20), 2),
+    }
+
+
+def run_benchmark(sizes=CORPUS_SIZES, strategies=None, repeat=3):
+    """对每个尺寸运行全部策略，返回逐尺寸结果"""
+    strategies = strategies or list(STRATEGIES)
+    results = []
+    for width, height in sizes:
+        pixels = make_image(width, height)
+        data = pixels.tobytes()
+        shape = pixels.shape
+        target = fit_size(width, height)
+        reference = composite_over_white(resize_area(pixels, *target))
+        quality = {}
+        for mode, resizer in RESIZERS.items():
+            quality[mode] = psnr(composite_over_white(resizer(pixels, *target)), reference)
+        del pixels, reference
+
+        entry = {'size': [width, height], 'file_bytes': len(data), 'canvas': list(target),
+                 'psnr': quality, 'strategies': {}}
+        for name in strategies:
+            source, draws, resize = STRATEGIES[name]
+            stats = measure(lambda: load_image(data, shape, source, draws, resize), repeat)
+            stats['psnr'] = quality[resize]
+            entry['strategies'][name] = stats
+        results.append(entry)
+    return results
+
+
+def print_report(results):
+    """打印结果"""
+    print("🖼️ loadImage 画布流程基准测试")
+    print("=" * 60)
+    print(f"目标画布: 不超过 {MAX_WIDTH}x{MAX_HEIGHT}，最小 {MIN_SIZE}px；"
+          f"current = {'/'.join(STRATEGIES['current'])}")
+
+    for entry in results:
+        width, height = entry['size']
+        print(f"\n📐 {width}x{height} → {entry['canvas'][0]}x{entry['canvas'][1]}"
+              f"（文件 {entry['file_bytes'] / (1 << 20):.1f} MB）")
+        name_width = max(len(name) for name in entry['strategies'])
+        for name, stats in entry['strategies'].items():
+            quality = '无损' if stats['psnr'] is None else f"{stats['psnr']:.1f} dB"
+            print(f"  {name.ljust(name_width)}  {stats['median_ms']:9.2f} ms  "
+                  f"{stats['peak_mb']:8.2f} MB  PSNR {quality}")
+
+        best = min(entry['strategies'], key=lambda n: entry['strategies'][n]['median_ms'])
+        current = entry['strategies'].get('current')
+        if current and best != 'current':
+            saved = 1 - entry['strategies'][best]['median_ms'] / current['median_ms']
+            print(f"  🚀 最快: {best}，比current快 {saved:.0%}")
+
+
+def _parse_sizes(value):
+    sizes = []
+    for part in value.split(','):
+        width, _, height = part.lower().partition('x')
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='模拟并比较loadImage的图片缩放与绘制策略')
+    parser.add_argument('--sizes', type=_parse_sizes, default=CORPUS_SIZES,
+                        help='测试尺寸，如 640x480,7680x4320（默认100px到8K共7种）')
+    parser.add_argument('--strategy', action='append', choices=list(STRATEGIES),
+                        help='只测试指定策略（可重复）')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='每个策略的计时次数')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    if np is None:
+        print("⚠️ 未安装NumPy，跳过画布模拟（pip install numpy）")
+        return 0
+
+    results = run_benchmark(args.sizes, args.strategy, args.repeat)
+    if args.json:
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+检查的耗时与内存剖析
+为每次检查调用记录墙钟时间、CPU时间（当前线程）、tracemalloc峰值、读取的文件数和字节数，
+并按固定间隔采样调用栈，输出:
+
+- .cache/check_profile.json       本次运行的机器可读结果
+- .cache/check_profile.collapsed  折叠调用栈（flamegraph.pl / speedscope 可直接读取）
+- .cache/profile_history.jsonl    滚动历史，每次运行一行；与最近几次相比明显变慢/变大的检查会被标出
+
+两种接入方式:
+    run_checks.py --profile           运行器对每个检查计时（剖析时串行运行，内存峰值才能归到单个检查）
+    @check_profiler.profiled          装饰单个函数，在有活动的Profiler时记录
+
+读取的文件通过审计钩子（open事件）统计，只计入解释器和第三方库之外的文件，
+字节数按打开时的文件大小计算；通过site_cache命中内存缓存的读取不产生磁盘读取，
+只计入 inputs（site_cache.track记录的输入文件数）
+
+用法（在站点根目录下运行）:
+    python3 check_profiler.py              # 显示最近一次剖析结果和回归
+    python3 check_profiler.py --history seo_verification.check_technical_files
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+import site_cache
+from patch_engine import atomic_write
+
+PROFILE_FILE = '.cache/check_profile.json'
+COLLAPSED_FILE = '.cache/check_profile.collapsed'
+HISTORY_FILE = '.cache/profile_history.jsonl'
+
+# 调用栈采样间隔（秒）
+SAMPLE_INTERVAL = 0.002
+
+# 历史保留的运行次数
+HISTORY_LIMIT = 100
+
+# 回归判断: 与最近 HISTORY_WINDOW 次运行的中位数比较，至少需要 HISTORY_MIN_RUNS 次历史
+HISTORY_WINDOW = 10
+HISTORY_MIN_RUNS = 3
+REGRESSION_RATIO = 1.5
+
+# 指标 -> 视为回归的最小绝对增量（避免毫秒级检查的抖动被误报）
+REGRESSION_FLOORS = {
+    'wall': 0.05,
+    'cpu': 0.05,
+    'memory_peak': 1 << 20,
+    'bytes_read': 1 << 20,
+}
+
+# 不计入读取统计的目录（解释器、标准库和第三方库）
+_LIBRARY_PREFIXES = tuple({os.path.abspath(p) + os.sep for p in (sys.prefix, sys.base_prefix, sys.exec_prefix)})
+
+# 当前线程正在记录的读取统计（见 _audit）
+_io = threading.local()
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+# 当前活动的Profiler（profiled装饰器使用）
+_active_profiler = None
+
+
+def _is_read(mode, flags):
+    if mode is not None:
+        return 'r' in mode or '+' in mode
+    return (flags & os.O_ACCMODE) != os.O_WRONLY
+
+
+def _audit(event, args):
+    """审计钩子: 记录当前线程以读方式打开的文件"""
+    if event != 'open':
+        return
+    stats = getattr(_io, 'stats', None)
+    if stats is None:
+        return
+    try:
+        path, mode, flags = args
+        if not isinstance(path, (str, bytes)) or not _is_read(mode, flags):
+            return
+        path = os.path.abspath(os.fsdecode(path))
+        if path.startswith(_LIBRARY_PREFIXES) or '__pycache__' in path:
+            return
+        size = os.stat(path).st_size
+    except (OSError, ValueError):
+        return
+    stats['opens'] += 1
+    stats['bytes'] += size
+    stats['files'].add(path)
+
+
+def _install_hook():
+    """审计钩子无法移除，每个进程只安装一次；不在记录中的线程直接返回"""
+    global _hook_installed
+    with _hook_lock:
+        if not _hook_installed:
+            sys.addaudithook(_audit)
+            _hook_installed = True
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class _Measurement:
+    """一次检查调用的计量；root为调用者的帧，采样时只保留它以下的调用栈"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.record = None
+
+    def __enter__(self):
+        self.root = sys._getframe(1)
+        self.stats = {'opens': 0, 'bytes': 0, 'files': set()}
+        self.previous_stats = getattr(_io, 'stats', None)
+        _io.stats = self.stats
+        self.inputs = contextlib.ExitStack()
+        self.tracked = self.inputs.enter_context(site_cache.track())
+        self.memory_base = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self.memory_base = tracemalloc.get_traced_memory()[0]
+        self.thread = threading.get_ident()
+        self.profiler._begin(self.thread, self)
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        memory_peak = 0
+        if tracemalloc.is_tracing():
+            memory_peak = max(0, tracemalloc.get_traced_memory()[1] - self.memory_base)
+        self.profiler._end(self.thread)
+        self.inputs.close()
+        _io.stats = self.previous_stats
+        if self.previous_stats is not None:
+            self.previous_stats['opens'] += self.stats['opens']
+            self.previous_stats['bytes'] += self.stats['bytes']
+            self.previous_stats['files'] |= self.stats['files']
+        self.record = {
+            'id': self.name,
+            'wall': round(wall, 6),
+            'cpu': round(cpu, 6),
+            'memory_peak': memory_peak,
+            'files_read': len(self.stats['files']),
+            'bytes_read': self.stats['bytes'],
+            'opens': self.stats['opens'],
+            'inputs': len(self.tracked),
+            'error': exc_type.__name__ if exc_type else None,
+        }
+        self.profiler._add(self.record)
+        return False
+
+
+class Profiler:
+    """收集一次运行中所有检查的计量和调用栈样本
+
+    with Profiler() as profiler:
+        with profiler.measure('module.check'):
+            ...
+
+    tracemalloc的峰值是进程级的，多个检查并行时峰值无法区分归属，需要逐个运行
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, trace_memory=True):
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.records = []
+        self.stacks = {}
+        self.started = None
+        self._active = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        global _active_profiler
+        _install_hook()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.started = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self._sampler = threading.Thread(target=self._sample, name='check-profiler', daemon=True)
+        self._sampler.start()
+        _active_profiler = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active_profiler
+        _active_profiler = None
+        self._stop.set()
+        self._sampler.join()
+        if self._started_tracing:
+            tracemalloc.stop()
+        return False
+
+    def measure(self, name):
+        """计量with块内的执行"""
+        return _Measurement(self, name)
+
+    def measuring(self):
+        """当前线程是否正在计量"""
+        with self._lock:
+            return threading.get_ident() in self._active
+
+    def _begin(self, thread, measurement):
+        with self._lock:
+            self._active.setdefault(thread, []).append(measurement)
+
+    def _end(self, thread):
+        with self._lock:
+            stack = self._active[thread]
+            stack.pop()
+            if not stack:
+                del self._active[thread]
+
+    def _add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                active = [(thread, stack[0]) for thread, stack in self._active.items()]
+            for thread, measurement in active:
+                frame = frames.get(thread)
+                labels = []
+                while frame is not None and frame is not measurement.root:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                if frame is None:
+                    continue
+                labels.append(measurement.name)
+                key = ';'.join(reversed(labels))
+                with self._lock:
+                    self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def samples_of(self, name):
+        """某个检查的采样数"""
+        prefix = name + ';'
+        return sum(count for key, count in self.stacks.items() if key == name or key.startswith(prefix))
+
+    def report(self):
+        """机器可读的剖析结果"""
+        records = []
+        for record in self.records:
+            records.append(dict(record, samples=self.samples_of(record['id'])))
+        return {
+            'started': self.started,
+            'python': sys.version.split()[0],
+            'sample_interval': self.interval,
+            'memory_traced': self.trace_memory,
+            'checks': records,
+        }
+
+    def collapsed(self):
+        """折叠调用栈文本: 每行 '帧;帧;帧 采样数'"""
+        return ''.join(f'{key} {count}\n' for key, count in sorted(self.stacks.items()))
+
+
+def profiled(func):
+    """装饰器: 有活动的Profiler时记录每次调用，没有时直接调用
+
+    已在计量中的线程（例如运行器正在计量的检查内部）不再重复计量，避免重置外层的内存峰值
+    """
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _active_profiler
+        if profiler is None or profiler.measuring():
+            return func(*args, **kwargs)
+        with profiler.measure(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# ---- 历史与回归 ----
+
+def load_history(path=HISTORY_FILE):
+    """读取历史，跳过损坏的行"""
+    history = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and isinstance(entry.get('checks'), dict):
+                    history.append(entry)
+    except FileNotFoundError:
+        pass
+    return history
+
+
+def _history_entry(report):
+    return {
+        'time': report['started'],
+        'checks': {record['id']: {metric: record[metric] for metric in REGRESSION_FLOORS}
+                   for record in report['checks']},
+    }
+
+
+def find_regressions(report, history):
+    """与历史中位数相比明显变差的 (检查, 指标)"""
+    regressions = []
+    recent = history[-HISTORY_WINDOW:]
+    for record in report['checks']:
+        past = [entry['checks'][record['id']] for entry in recent if record['id'] in entry['checks']]
+        if len(past) < HISTORY_MIN_RUNS:
+            continue
+        for metric, floor in REGRESSION_FLOORS.items():
+            values = [p[metric] for p in past if metric in p]
+            if len(values) < HISTORY_MIN_RUNS:
+                continue
+            baseline = statistics.median(values)
+            value = record[metric]
+            if value > baseline * REGRESSION_RATIO and value - baseline > floor:
+                regressions.append({
+                    'id': record['id'],
+                    'metric': metric,
+                    'value': value,
+                    'baseline': baseline,
+                    'runs': len(values),
+                })
+    return regressions
+
+
+def save(profiler, extra=None, profile_path=PROFILE_FILE, collapsed_path=COLLAPSED_FILE,
+         history_path=HISTORY_FILE):
+    """写入剖析结果、折叠调用栈并追加历史，返回带回归信息的报告"""
+    report = profiler.report()
+    if extra:
+        report.update(extra)
+    history = load_history(history_path)
+    report['regressions'] = find_regressions(report, history)
+
+    os.makedirs(os.path.dirname(profile_path) or '.', exist_ok=True)
+    atomic_write(profile_path, json.dumps(report, ensure_ascii=False, indent=2) + '\n')
+    atomic_write(collapsed_path, profiler.collapsed())
+    if report['checks']:
+        history = (history + [_history_entry(report)])[-HISTORY_LIMIT:]
+        atomic_write(history_path, ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in history))
+    return report
+
+
+# ---- 输出 ----
+
+def _format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.0f}{unit}' if unit == 'B' else f'{size:.1f}{unit}'
+        size /= 1024
+    return f'{size:.1f}GB'
+
+
+def _format_metric(metric, value):
+    if metric in ('wall', 'cpu'):
+        return f'{value * 1000:.1f}ms'
+    return _format_bytes(value)
+
+
+def print_report(report, limit=None):
+    """按墙钟时间从长到短打印各检查的计量和回归"""
+    records = sorted(report['checks'], key=lambda r: r['wall'], reverse=True)
+    print("\n⏱️ 检查剖析（按耗时排序）")
+    print("=" * 80)
+    print(f"  {'检查':<46} {'墙钟':>8} {'CPU':>8} {'内存峰值':>9} {'读取':>10}")
+    for record in records[:limit]:
+        print(f"  {record['id']:<48} {record['wall'] * 1000:>7.1f}ms {record['cpu'] * 1000:>7.1f}ms "
+              f"{_format_bytes(record['memory_peak']):>10} "
+              f"{record['files_read']:>3}个/{_format_bytes(record['bytes_read']):>7}")
+    print("=" * 80)
+    if report['regressions']:
+        print(f"⚠️ {len(report['regressions'])} 项指标比最近几次运行明显变差:")
+        for item in report['regressions']:
+            print(f"  📈 {item['id']} {item['metric']}: {_format_metric(item['metric'], item['value'])}"
+                  f"（最近{item['runs']}次中位数 {_format_metric(item['metric'], item['baseline'])}）")
+    else:
+        print("✅ 未发现性能回归")
+    print(f"💾 剖析结果: {PROFILE_FILE}，折叠调用栈: {COLLAPSED_FILE}")
+
+
+def print_history(check_id, history):
+    """打印某个检查在历史中的变化"""
+    print(f"📜 {check_id} 的剖析历史")
+    print("=" * 60)
+    rows = [(entry['time'], entry['checks'][check_id]) for entry in history if check_id in entry['checks']]
+    if not rows:
+        print("  ⚠️ 历史中没有这个检查")
+        return False
+    for started, metrics in rows:
+        print(f"  {started}  墙钟 {_format_metric('wall', metrics['wall']):>9}  "
+              f"CPU {_format_metric('cpu', metrics['cpu']):>9}  "
+              f"内存 {_format_bytes(metrics['memory_peak']):>8}  读取 {_format_bytes(metrics['bytes_read']):>8}")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='查看检查剖析结果（运行: python3 run_checks.py --profile）')
+    parser.add_argument('--history', metavar='CHECK_ID', help='显示某个检查的历史')
+    parser.add_argument('--top', type=int, help='只显示耗时最长的N个检查')
+    args = parser.parse_args(argv)
+
+    if args.history:
+        return 0 if print_history(args.history, load_history()) else 1
+
+    try:
+        with open(PROFILE_FILE, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (FileNotFoundError, ValueError):
+        print("❌ 没有剖析结果，请先运行: python3 run_checks.py --profile")
+        return 1
+    print(f"📅 剖析时间: {report['started']}（Python {report['python']}）")
+    print_report(report, limit=args.top)
+    return 1 if report['regressions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+首屏关键CSS提取与内联
+解析页面DOM，找出首屏元素（顶部菜单、hero区域、编辑器主区域、工具栏和画布）
+及其祖先和后代，从全部本地样式表中挑出可能匹配这些元素的规则，
+以 <style id="critical-css"> 内联到 <head>，原来阻塞渲染的样式表改为异步加载
+（preload + onload，并保留 <noscript> 回退）
+
+选择器匹配是保守的: 动态伪类（:hover、:focus等）、:not()/:is() 和伪元素都按
+"可能匹配"处理，宁可多内联也不漏掉首屏需要的规则；完整样式表加载后层叠结果与原来相同
+
+用法（在站点根目录下运行）:
+    python3 critical_css.py                       # index.html → dist/index.html
+    python3 critical_css.py dist/index.html --out dist/index.html
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+import sys
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+import asset_graph
+import build_assets
+import css_parse
+import html_scan
+import site_cache
+
+# 首屏元素
+FOLD_SELECTORS = [
+    '.skip-nav',
+    'nav.top-menu',
+    'header.hero-section',
+    'main.main-content',
+    'aside.toolbar',
+    'canvas#mainCanvas',
+]
+
+# 超过首个TCP往返窗口（约14KB）的内联CSS会推迟首次渲染
+CRITICAL_BUDGET = 14 * 1024
+
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr',
+}
+
+CRITICAL_STYLE_ID = 'critical-css'
+KEYFRAMES_NAME_RE = re.compile(r'@(?:-[\w]+-)?keyframes\s+([\w-]+)', re.IGNORECASE)
+URL_RE = re.compile(r'url\(\s*(["\']?)([^"\')]+)\1\s*\)', re.IGNORECASE)
+
+STYLESHEET_QUERIES = [
+    html_scan.Query('links', tag='link', attrs={'href': True}, find_all=True),
+    html_scan.Query('critical', tag='style', id=CRITICAL_STYLE_ID),
+]
+
+
+# ---- DOM ----
+
+class Node:
+    """DOM元素"""
+
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.id = attrs.get('id')
+        self.classes = set(attrs.get('class', '').split())
+        self.parent = parent
+        self.children = []
+
+    def previous_siblings(self):
+        """从近到远返回前面的兄弟元素"""
+        if self.parent is None:
+            return []
+        siblings = self.parent.children
+        return siblings[:siblings.index(self)][::-1]
+
+    def descendants(self):
+        for child in self.children:
+            yield child
+            yield from child.descendants()
+
+    def ancestors(self):
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def __repr__(self):
+        return f'<Node {self.tag} id={self.id} class={" ".join(sorted(self.classes))}>'
+
+
+class DomBuilder(HTMLParser):
+    """构建简化的DOM树（只保留元素）"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node('#document', {}, None)
+        self.stack = [self.root]
+        self.elements = []
+
+    def handle_starttag(self, tag, attrs):
+        parent = self.stack[-1]
+        node = Node(tag, {name: (value if value is not None else '') for name, value in attrs}, parent)
+        parent.children.append(node)
+        self.elements.append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        # 与最近的同名元素配对，隐式关闭中间未闭合的元素
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+
+def build_dom(path):
+    """解析页面，返回 (根节点, 所有元素列表)"""
+    builder = DomBuilder()
+    for chunk in site_cache.iter_chunks(path, html_scan.CHUNK_SIZE):
+        builder.feed(chunk)
+    builder.close()
+    return builder.root, builder.elements
+
+
+# ---- 选择器匹配 ----
+
+_COMPOUND_RE = re.compile(r'''
+    (?P<tag>\*|(?:[\w-]|\\.)+)
+  | \#(?P<id>(?:[\w-]|\\.|[^\x00-\x7f])+)
+  | \.(?P<cls>(?:[\w-]|\\.|[^\x00-\x7f])+)
+  | (?P<attr>\[)
+  | (?P<pseudo>::?[\w-]+)
+''', re.VERBOSE)
+_ATTR_RE = re.compile(r'\s*([\w-]+)\s*(?:([~|^$*]?=)\s*(?:"([^"]*)"|\'([^\']*)\'|([^\]\s]+))\s*(i)?)?\s*$',
+                      re.IGNORECASE)
+_COMBINATOR_RE = re.compile(r'\s*([>+~])\s*|\s+')
+
+
+def _unescape(name):
+    return re.sub(r'\\(.)', r'\1', name)
+
+
+def parse_selector(selector):
+    """把选择器解析为 [(组合符, 复合选择器)]，从左到右；无法解析时返回None"""
+    parts = []
+    combinator = None
+    pos = 0
+    n = len(selector)
+    while pos < n:
+        compound = {'tag': None, 'ids': [], 'classes': [], 'attrs': [], 'root': False}
+        start = pos
+        while pos < n:
+            match = _COMPOUND_RE.match(selector, pos)
+            if match is None:
+                break
+            if match.group('tag'):
+                compound['tag'] = None if match.group('tag') == '*' else match.group('tag').lower()
+                pos = match.end()
+            elif match.group('id'):
+                compound['ids'].append(_unescape(match.group('id')))
+                pos = match.end()
+            elif match.group('cls'):
+                compound['classes'].append(_unescape(match.group('cls')))
+                pos = match.end()
+            elif match.group('attr'):
+                end = css_parse.find_unnested(selector, pos + 1, ']')
+                attr = _ATTR_RE.match(selector[pos + 1:end])
+                if attr is None:
+                    return None
+                value = next((v for v in attr.group(3, 4, 5) if v is not None), None)
+                compound['attrs'].append((attr.group(1).lower(), attr.group(2), value, bool(attr.group(6))))
+                pos = end + 1
+            else:
+                pseudo = match.group('pseudo').lower()
+                pos = match.end()
+                if pos < n and selector[pos] == '(':
+                    pos = css_parse.find_unnested(selector, pos + 1, ')') + 1
+                if pseudo == ':root':
+                    compound['root'] = True
+                # 其他伪类和伪元素按"可能匹配"处理
+        if pos == start:
+            return None
+        parts.append((combinator, compound))
+        match = _COMBINATOR_RE.match(selector, pos)
+        if match is None or pos >= n:
+            break
+        combinator = match.group(1) or ' '
+        pos = match.end()
+    if pos < n:
+        return None
+    return parts
+
+
+def _attr_matches(node, name, op, expected, ignore_case):
+    value = node.attrs.get(name)
+    if value is None:
+        return False
+    if op is None:
+        return True
+    if ignore_case:
+        value, expected = value.lower(), expected.lower()
+    if op == '=':
+        return value == expected
+    if op == '~=':
+        return expected in value.split()
+    if op == '|=':
+        return value == expected or value.startswith(expected + '-')
+    if op == '^=':
+        return bool(expected) and value.startswith(expected)
+    if op == '$=':
+        return bool(expected) and value.endswith(expected)
+    return bool(expected) and expected in value
+
+
+def _compound_matches(compound, node):
+    if compound['tag'] is not None and compound['tag'] != node.tag:
+        return False
+    if compound['root'] and node.tag != 'html':
+        return False
+    if any(node.id != id_ for id_ in compound['ids']):
+        return False
+    if any(cls not in node.classes for cls in compound['classes']):
+        return False
+    return all(_attr_matches(node, *attr) for attr in compound['attrs'])
+
+
+def matches(parts, node, index=None):
+    """node是否匹配解析后的选择器（从右向左匹配）"""
+    if index is None:
+        index = len(parts) - 1
+    combinator, compound = parts[index]
+    if not _compound_matches(compound, node):
+        return False
+    if index == 0:
+        return True
+    if combinator == '>':
+        return node.parent is not None and matches(parts, node.parent, index - 1)
+    if combinator == ' ':
+        return any(matches(parts, ancestor, index - 1) for ancestor in node.ancestors())
+    siblings = node.previous_siblings()
+    if combinator == '+':
+        return bool(siblings) and matches(parts, siblings[0], index - 1)
+    return any(matches(parts, sibling, index - 1) for sibling in siblings)
+
+
+class ElementIndex:
+    """按id/class/标签索引元素，只对可能匹配最右侧复合选择器的元素做完整匹配"""
+
+    def __init__(self, elements):
+        self.elements = list(elements)
+        self.by_id = {}
+        self.by_class = {}
+        self.by_tag = {}
+        for node in self.elements:
+            if node.id:
+                self.by_id.setdefault(node.id, []).append(node)
+            for cls in node.classes:
+                self.by_class.setdefault(cls, []).append(node)
+            self.by_tag.setdefault(node.tag, []).append(node)
+
+    def candidates(self, compound):
+        if compound['ids']:
+            return self.by_id.get(compound['ids'][0], [])
+        if compound['classes']:
+            return self.by_class.get(compound['classes'][0], [])
+        if compound['tag']:
+            return self.by_tag.get(compound['tag'], [])
+        return self.elements
+
+    def select(self, selector):
+        """返回匹配选择器的元素；选择器无法解析时返回None"""
+        parts = parse_selector(selector)
+        if parts is None:
+            return None
+        return [node for node in self.candidates(parts[-1][1]) if matches(parts, node)]
+
+    def any_match(self, selector):
+        """是否有元素匹配；无法解析的选择器视为匹配"""
+        parts = parse_selector(selector)
+        if parts is None:
+            return True
+        return any(matches(parts, node) for node in self.candidates(parts[-1][1]))
+
+
+def fold_elements(elements, selectors=FOLD_SELECTORS):
+    """首屏元素: 匹配的根元素及其祖先和后代，返回 (元素列表, 未找到的选择器)"""
+    index = ElementIndex(elements)
+    critical = {}
+    missing = []
+    for selector in selectors:
+        roots = index.select(selector) or []
+        if not roots:
+            missing.append(selector)
+        for root in roots:
+            for node in [root, *root.ancestors(), *root.descendants()]:
+                if node.tag != '#document':
+                    critical[id(node)] = node
+    ordered = [node for node in elements if id(node) in critical]
+    return ordered, missing
+
+
+# ---- 关键规则 ----
+
+def _animation_names(declarations):
+    names = set()
+    for declaration in declarations:
+        if declaration.prop in ('animation', 'animation-name', '-webkit-animation', '-webkit-animation-name'):
+            names.update(re.findall(r'[\w-]+', declaration.value))
+    return names
+
+
+def select_rules(nodes, index, animations):
+    """挑出可能匹配首屏元素的规则（保留条件@规则的嵌套结构）"""
+    selected = []
+    for node in nodes:
+        if isinstance(node, css_parse.Rule):
+            selectors = [s for s in node.selectors if index.any_match(s)]
+            if selectors and node.declarations:
+                selected.append(css_parse.Rule(selectors, node.declarations, node.line))
+                animations.update(_animation_names(node.declarations))
+        elif isinstance(node, css_parse.AtBlock):
+            children = select_rules(node.children, index, animations)
+            if children:
+                selected.append(css_parse.AtBlock(node.name, node.prelude, children, node.line))
+        elif node.name in ('font-face', None):
+            # 字体和无法分析的内容（例如漏写 } 的规则）原样保留
+            selected.append(node)
+        elif node.name and node.name.endswith('keyframes'):
+            selected.append(node)  # 是否引用稍后按动画名过滤
+    return selected
+
+
+def _filter_keyframes(nodes, animations):
+    kept = []
+    for node in nodes:
+        if isinstance(node, css_parse.AtBlock):
+            node.children = _filter_keyframes(node.children, animations)
+            if not node.children:
+                continue
+        elif isinstance(node, css_parse.Raw) and node.name and node.name.endswith('keyframes'):
+            match = KEYFRAMES_NAME_RE.match(node.text)
+            if not match or match.group(1) not in animations:
+                continue
+        kept.append(node)
+    return kept
+
+
+def rebase_urls(css, sheet_url):
+    """把样式表中的相对url改为相对于页面的路径"""
+    base = os.path.dirname(urlparse(sheet_url).path)
+    if not base:
+        return css
+
+    def replace(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if urlparse(url).scheme or url.startswith(('/', '#', 'data:')):
+            return match.group(0)
+        return f'url({quote}{os.path.normpath(os.path.join(base, url))}{quote})'
+
+    return URL_RE.sub(replace, css)
+
+
+def _sheet_css(nodes, url, media=None):
+    """输出样式表节点: url改为相对于页面，link的media属性变成@media包裹"""
+    css = build_assets.minify_css(rebase_urls(css_parse.serialize(nodes), url)).strip()
+    media = (media or '').strip()
+    if media and media.lower() != 'all':
+        css = f'@media {media}{{{css}}}'
+    return css
+
+
+def extract_critical(html_path='index.html', root=None, selectors=FOLD_SELECTORS):
+    """提取关键CSS，返回 {'css', 'sheets', 'elements', 'missing'}"""
+    if root is None:
+        root = os.path.dirname(html_path) or '.'
+    graph = asset_graph.build_asset_graph(html_path, root)
+    _, elements = build_dom(html_path)
+    fold, missing = fold_elements(elements, selectors)
+    index = ElementIndex(fold)
+
+    parts = []
+    sheets = []
+    for resource in graph['resources']:
+        if resource['kind'] != 'stylesheet' or not resource['blocking'] \
+                or not resource['local'] or not resource['exists']:
+            continue
+        nodes = css_parse.parse(site_cache.read_text(resource['local']))
+        animations = set()
+        selected = _filter_keyframes(select_rules(nodes, index, animations), animations)
+        parts.append(_sheet_css(selected, resource['url'], resource['attrs'].get('media')))
+        sheets.append(resource)
+    return {
+        'css': ''.join(parts),
+        'sheets': sheets,
+        'elements': len(fold),
+        'missing': missing,
+    }
+
+
+# ---- 改写页面 ----
+
+def _async_link(element):
+    attrs = {name: value for name, value in element.attrs.items() if name not in ('rel', 'onload', 'as')}
+    extra = ''.join(f' {name}="{html.escape(value or "", quote=True)}"'
+                    for name, value in attrs.items() if name != 'href')
+    href = html.escape(element.get('href'), quote=True)
+    return (f'<link rel="preload" href="{href}" as="style"{extra} '
+            f'onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{href}"{extra}></noscript>')
+
+
+def inline_critical(html_path='index.html', out_path=None, root=None, selectors=FOLD_SELECTORS):
+    """生成内联关键CSS的页面，返回报告"""
+    if out_path is None:
+        out_path = os.path.join(build_assets.DIST_DIR, os.path.basename(html_path))
+    doc = site_cache.load(html_path)
+    text = doc.text
+    found = html_scan.scan_file(html_path, STYLESHEET_QUERIES)
+    if found['critical'] is not None:
+        raise ValueError(f'{html_path} 已经内联过关键CSS')
+
+    critical = extract_critical(html_path, root, selectors)
+    hrefs = {resource['url'] for resource in critical['sheets']}
+    edits = []
+    first = None
+    for element in found['links']:
+        rels = set(element.get('rel', '').lower().split())
+        if 'stylesheet' not in rels or element.get('href') not in hrefs:
+            continue
+        start, end = html_scan.element_span(text, doc.line_starts, element)
+        edits.append((start, end, _async_link(element)))
+        if first is None:
+            first = start
+    if first is None:
+        raise ValueError(f'{html_path} 中没有可以异步加载的本地样式表')
+
+    line_start = text.rfind('\n', 0, first) + 1
+    indent = text[line_start:first] if not text[line_start:first].strip() else ''
+    style = f'<style id="{CRITICAL_STYLE_ID}">{critical["css"]}</style>\n{indent}'
+    edits.append((first, first, style))
+
+    page = text
+    for start, end, replacement in sorted(edits, key=lambda e: (e[0], e[1] - e[0]), reverse=True):
+        page = page[:start] + replacement + page[end:]
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write(page)
+
+    full_bytes = sum(resource['bytes'] or 0 for resource in critical['sheets'])
+    critical_bytes = len(critical['css'].encode('utf-8'))
+    return {
+        'html': out_path,
+        'critical_bytes': critical_bytes,
+        'full_bytes': full_bytes,
+        'over_budget': critical_bytes > CRITICAL_BUDGET,
+        'async_stylesheets': sorted(hrefs),
+        'media': {r['url']: r['attrs'].get('media') for r in critical['sheets']},
+        'fold_elements': critical['elements'],
+        'missing_roots': critical['missing'],
+    }
+
+
+# ---- 验证 ----
+
+def _rule_keys(nodes, context=()):
+    keys = set()
+    for rule, rule_context in css_parse.iter_rules(nodes, context):
+        for selector in rule.selectors:
+            for declaration in rule.declarations:
+                keys.add((rule_context, selector, declaration.key()))
+    return keys
+
+
+def stylesheet_links(path):
+    """页面中的样式表链接，返回 (异步预加载的href, <noscript>回退的href, 仍阻塞渲染的href)"""
+    _, elements = build_dom(path)
+    preloaded, fallback, blocking = set(), set(), set()
+    for node in elements:
+        if node.tag != 'link':
+            continue
+        rels = set(node.attrs.get('rel', '').lower().split())
+        href = node.attrs.get('href')
+        if 'preload' in rels and node.attrs.get('as', '').lower() == 'style' \
+                and 'stylesheet' in node.attrs.get('onload', ''):
+            preloaded.add(href)
+        elif 'stylesheet' in rels:
+            in_noscript = any(ancestor.tag == 'noscript' for ancestor in node.ancestors())
+            (fallback if in_noscript else blocking).add(href)
+    return preloaded, fallback, blocking
+
+
+def verify(report, html_path='index.html', root=None):
+    """检查生成的页面: 关键CSS内联在<head>且可解析、规则都来自完整样式表，
+    原样式表改为异步预加载、有<noscript>回退且不再阻塞渲染"""
+    if root is None:
+        root = os.path.dirname(html_path) or '.'
+    results = []
+
+    found = html_scan.scan_file(report['html'], STYLESHEET_QUERIES)
+    style = found['critical']
+    results.append(('关键CSS已内联到<head>', style is not None and style.in_head))
+
+    full = set()
+    for href in report['async_stylesheets']:
+        local = os.path.join(root, urlparse(href).path.lstrip('/'))
+        full |= _rule_keys(css_parse.parse(_sheet_css(css_parse.parse(site_cache.read_text(local)),
+                                                      href, report['media'].get(href))))
+    inlined = None
+    if style is not None:
+        with open(report['html'], encoding='utf-8') as f:
+            page = f.read()
+        start, end = html_scan.element_span(page, site_cache.load(report['html']).line_starts, style)
+        body = page[start:end]
+        try:
+            inlined = _rule_keys(css_parse.parse(body[body.index('>') + 1:body.rindex('</')]))
+        except css_parse.CSSParseError:
+            inlined = None
+    results.append(('内联的关键CSS可以解析', inlined is not None))
+    results.append(('内联规则都来自完整样式表', inlined is not None and inlined <= full))
+
+    hrefs = set(report['async_stylesheets'])
+    preloaded, fallback, blocking = stylesheet_links(report['html'])
+    results.append(('样式表改为异步预加载（preload + onload）', hrefs <= preloaded))
+    results.append(('异步样式表都有<noscript>回退', hrefs <= fallback))
+    results.append(('不再有阻塞渲染的同名样式表', not hrefs & blocking))
+    return results
+
+
+def print_report(report, checks):
+    """打印结果"""
+    print("🎨 首屏关键CSS内联")
+    print("=" * 60)
+    ratio = report['critical_bytes'] / report['full_bytes'] if report['full_bytes'] else 0
+    print(f"✅ 关键CSS: {report['critical_bytes']} 字节（完整样式表 {report['full_bytes']} 字节的 {ratio:.0%}）")
+    print(f"🧱 首屏元素: {report['fold_elements']} 个")
+    if report['over_budget']:
+        print(f"⚠️ 关键CSS超过 {CRITICAL_BUDGET} 字节，首次渲染可能需要额外的网络往返")
+    for selector in report['missing_roots']:
+        print(f"⚠️ 页面中没有找到首屏元素 {selector}")
+    print("⏳ 改为异步加载:")
+    for href in report['async_stylesheets']:
+        print(f"  • {href}")
+
+    print("\n🔍 验证:")
+    for name, passed in checks:
+        icon = '⏭️' if passed is None else ('✅' if passed else '❌')
+        print(f"  {icon} {name}")
+    print(f"\n📄 已生成 {report['html']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='提取首屏关键CSS内联到<head>，其余样式表异步加载')
+    parser.add_argument('html', nargs='?', default='index.html', help='页面文件')
+    parser.add_argument('--out', default=None, help='输出页面（默认 dist/<页面文件名>）')
+    parser.add_argument('--root', default=None, help='站点根目录（默认为页面所在目录）')
+    parser.add_argument('--fold', action='append', help='首屏元素选择器（可重复，默认使用内置列表）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.html):
+        print(f"❌ {args.html} 不存在")
+        return 1
+    try:
+        report = inline_critical(args.html, args.out, args.root, args.fold or FOLD_SELECTORS)
+    except (ValueError, css_parse.CSSParseError) as e:
+        print(f"❌ {e}")
+        return 1
+    checks = verify(report, args.html, args.root)
+
+    if args.json:
+        report['checks'] = [{'name': name, 'passed': passed} for name, passed in checks]
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(report, checks)
+    return 1 if any(passed is False for _, passed in checks) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+CSS冗余规则清理
+按 index.html 的加载顺序解析全部本地样式表，把它们当作一个层叠整体分析:
+
+    重复声明    同一规则块内完全相同的声明只保留最后一个（值不同的视为回退写法，保留）
+    被覆盖声明  逐个选择器比较: 后面出现的相同选择器在相同条件（或顶层）下声明了同一属性，
+                且 !important 不弱于前者时，前面的声明无效；规则的所有选择器都被覆盖时才删除
+    合并规则块  相邻且声明完全相同的规则合并选择器，相邻且选择器相同的规则合并声明
+    未使用选择器  引用的class/id/标签在 index.html 和脚本字符串中都没有出现，
+                  默认只报告，--prune-unused 时删除
+
+@keyframes、@font-face 等内容原样保留；@layer 中的规则不参与覆盖分析
+
+用法（在站点根目录下运行）:
+    python3 css_optimize.py
+    python3 css_optimize.py --prune-unused --out dist --json
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+import asset_graph
+import build_assets
+import css_parse
+import html_scan
+import js_tokens
+import site_cache
+
+# 值或选择器中带厂商前缀时，不能确定浏览器都支持，不作为覆盖依据
+VENDOR_RE = re.compile(r'(?:^|[^\w-])-(?:webkit|moz|ms|o)-', re.IGNORECASE)
+
+# 总是存在的元素/选择器（不依赖页面内容）
+ALWAYS_USED_TAGS = {'html', 'body', 'head'}
+
+WORD_RE = re.compile(r'[\w-]+')
+
+PAGE_QUERIES = [
+    html_scan.Query('elements', find_all=True),
+    html_scan.Query('inline_scripts', tag='script', text=asset_graph.ANY_TEXT, find_all=True),
+]
+
+
+# ---- 输入 ----
+
+def load_stylesheets(html_path='index.html', root=None):
+    """按页面中的顺序返回本地样式表 [{'url', 'local', 'media', 'text', 'nodes'}]"""
+    graph = asset_graph.build_asset_graph(html_path, root)
+    sheets = []
+    for resource in graph['resources']:
+        if resource['kind'] != 'stylesheet' or not resource['local'] or not resource['exists']:
+            continue
+        text = site_cache.read_text(resource['local'])
+        media = resource['attrs'].get('media', 'all').strip().lower() or 'all'
+        sheets.append({
+            'url': resource['url'],
+            'local': resource['local'],
+            'media': media,
+            'text': text,
+            'nodes': css_parse.parse(text),
+        })
+    return graph, sheets
+
+
+def used_tokens(html_path, graph):
+    """页面中出现的标签、class、id，以及脚本字符串中出现的单词"""
+    found = html_scan.scan_file(html_path, PAGE_QUERIES)
+    tokens = {'tags': set(ALWAYS_USED_TAGS), 'classes': set(), 'ids': set(), 'words': set()}
+    for element in found['elements']:
+        tokens['tags'].add(element.tag)
+        tokens['classes'].update(element.get('class', '').split())
+        if element.get('id'):
+            tokens['ids'].add(element.get('id'))
+
+    sources = [element.text or '' for element in found['inline_scripts'] if not element.get('src')]
+    for resource in graph['resources']:
+        if resource['kind'] == 'script' and resource['local'] and resource['exists']:
+            sources.append(site_cache.read_text(resource['local']))
+    for source in sources:
+        try:
+            for token in js_tokens.tokenize(source):
+                if token.type in (js_tokens.STRING, js_tokens.TEMPLATE):
+                    tokens['words'].update(WORD_RE.findall(token.value))
+        except js_tokens.JSSyntaxError:
+            tokens['words'].update(WORD_RE.findall(source))
+    return tokens
+
+
+def is_selector_used(selector, tokens):
+    """选择器引用的所有class/id/标签是否都可能出现在页面上"""
+    parts = css_parse.selector_parts(selector)
+    for name in parts['classes']:
+        if name not in tokens['classes'] and name not in tokens['words']:
+            return False
+    for name in parts['ids']:
+        if name not in tokens['ids'] and name not in tokens['words']:
+            return False
+    for name in parts['tags']:
+        if name not in tokens['tags'] and name not in tokens['words']:
+            return False
+    return True
+
+
+# ---- 优化 ----
+
+def dedupe_declarations(rule):
+    """删除规则块内完全相同的重复声明（保留最后一个），返回删除数"""
+    seen = set()
+    kept = []
+    for declaration in reversed(rule.declarations):
+        key = declaration.key()
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(declaration)
+    removed = len(rule.declarations) - len(kept)
+    rule.declarations = kept[::-1]
+    return removed
+
+
+def _overriding_props(rule):
+    """规则中可以作为覆盖依据的属性: {属性: 是否!important}"""
+    if any(VENDOR_RE.search(selector) for selector in rule.selectors):
+        return {}
+    counts = {}
+    for declaration in rule.declarations:
+        counts[declaration.prop] = counts.get(declaration.prop, 0) + 1
+    props = {}
+    for declaration in rule.declarations:
+        # 同一属性写了多次说明是回退写法，后面的值不一定被支持
+        if counts[declaration.prop] == 1 and not VENDOR_RE.search(declaration.value):
+            props[declaration.prop] = declaration.important
+    return props
+
+
+def remove_overridden(sheets):
+    """删除被后续相同选择器覆盖的声明，返回 [{'file', 'line', 'selector', 'declaration'}]"""
+    entries = []
+    for sheet in sheets:
+        base = () if sheet['media'] == 'all' else (('media', sheet['media']),)
+        for rule, context in css_parse.iter_rules(sheet['nodes'], base):
+            entries.append((sheet, rule, context))
+
+    removed = []
+    later = {}  # (选择器, 属性) -> [(上下文, 是否!important)]
+    for sheet, rule, context in reversed(entries):
+        if any(name == 'layer' for name, _ in context):
+            continue
+        kept = []
+        for declaration in rule.declarations:
+            overridden = all(
+                any((other == () or other == context) and (important or not declaration.important)
+                    for other, important in later.get((selector, declaration.prop), ()))
+                for selector in rule.selectors
+            )
+            if overridden:
+                removed.append({
+                    'file': sheet['url'],
+                    'line': rule.line,
+                    'selector': ','.join(rule.selectors),
+                    'declaration': declaration.css(),
+                })
+            else:
+                kept.append(declaration)
+        for prop, important in _overriding_props(rule).items():
+            for selector in rule.selectors:
+                later.setdefault((selector, prop), []).append((context, important))
+        rule.declarations = kept
+    return removed
+
+
+def merge_adjacent(nodes):
+    """合并相邻的相同规则块，删除空规则，返回合并次数"""
+    merged = 0
+    result = []
+    for node in nodes:
+        if isinstance(node, css_parse.AtBlock):
+            merged += merge_adjacent(node.children)
+            if not node.children:
+                continue
+        if isinstance(node, css_parse.Rule):
+            if not node.declarations or not node.selectors:
+                continue
+            prev = result[-1] if result else None
+            if isinstance(prev, css_parse.Rule) and not any(
+                    VENDOR_RE.search(s) for s in prev.selectors + node.selectors):
+                if prev.selectors == node.selectors:
+                    prev.declarations = prev.declarations + node.declarations
+                    dedupe_declarations(prev)
+                    merged += 1
+                    continue
+                if [d.key() for d in prev.declarations] == [d.key() for d in node.declarations]:
+                    prev.selectors = prev.selectors + [s for s in node.selectors if s not in prev.selectors]
+                    merged += 1
+                    continue
+        result.append(node)
+    nodes[:] = result
+    return merged
+
+
+def find_unused(sheets, tokens, prune=False):
+    """找出未使用的选择器；prune为True时从规则中删除，返回 [{'file', 'line', 'selector'}]"""
+    unused = []
+    for sheet in sheets:
+        for rule, _ in css_parse.iter_rules(sheet['nodes']):
+            kept = []
+            for selector in rule.selectors:
+                if is_selector_used(selector, tokens):
+                    kept.append(selector)
+                else:
+                    unused.append({'file': sheet['url'], 'line': rule.line, 'selector': selector})
+            if prune:
+                rule.selectors = kept
+    return unused
+
+
+def _suspicious(sheet):
+    """原样保留的非@规则通常是漏写了 } 导致后续规则被吞掉"""
+    return [{'file': sheet['url'], 'line': node.line,
+             'message': '规则中包含嵌套的块（可能缺少 }），其中的规则不参与分析'}
+            for node in sheet['nodes'] if isinstance(node, css_parse.Raw) and not node.name]
+
+
+def optimize(html_path='index.html', out_dir=build_assets.DIST_DIR, root=None, prune_unused=False):
+    """分析并优化页面的所有样式表，写出优化后的副本，返回报告"""
+    if root is None:
+        root = os.path.dirname(html_path) or '.'
+    graph, sheets = load_stylesheets(html_path, root)
+    tokens = used_tokens(html_path, graph)
+
+    duplicates = 0
+    for sheet in sheets:
+        for rule, _ in css_parse.iter_rules(sheet['nodes']):
+            duplicates += dedupe_declarations(rule)
+    overridden = remove_overridden(sheets)
+    unused = find_unused(sheets, tokens, prune=prune_unused)
+
+    files = []
+    for sheet in sheets:
+        merged = merge_adjacent(sheet['nodes'])
+        optimized = build_assets.minify_css(css_parse.serialize(sheet['nodes']))
+        target = os.path.join(out_dir, os.path.relpath(sheet['local'], root))
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(optimized)
+        files.append({
+            'url': sheet['url'],
+            'output': target,
+            'bytes_original': len(sheet['text'].encode('utf-8')),
+            'bytes_minified': len(build_assets.minify_css(sheet['text']).encode('utf-8')),
+            'bytes_optimized': len(optimized.encode('utf-8')),
+            'merged_rules': merged,
+        })
+
+    return {
+        'files': files,
+        'duplicate_declarations': duplicates,
+        'overridden': overridden,
+        'unused': unused,
+        'pruned': prune_unused,
+        'warnings': [w for sheet in sheets for w in _suspicious(sheet)],
+    }
+
+
+def print_report(report, verbose=False):
+    """打印优化报告"""
+    print("🧹 CSS冗余规则清理")
+    print("=" * 60)
+    for item in report['files']:
+        saved = item['bytes_original'] - item['bytes_optimized']
+        print(f"✅ {item['url']}: {item['bytes_original']} → {item['bytes_optimized']} 字节"
+              f"（仅压缩 {item['bytes_minified']}，共节省 {saved} 字节）")
+
+    print(f"\n🔁 删除重复声明 {report['duplicate_declarations']} 条")
+    print(f"🪦 删除被覆盖的声明 {len(report['overridden'])} 条")
+    for item in report['overridden'] if verbose else report['overridden'][:10]:
+        print(f"  • {item['file']}:{item['line']} {item['selector']} {{{item['declaration']}}}")
+    if not verbose and len(report['overridden']) > 10:
+        print(f"  … 另有 {len(report['overridden']) - 10} 条（-v 查看全部）")
+    print(f"🧩 合并相邻规则块 {sum(item['merged_rules'] for item in report['files'])} 次")
+
+    action = '已删除' if report['pruned'] else '未删除，使用 --prune-unused 删除'
+    print(f"👻 未使用的选择器 {len(report['unused'])} 个（{action}）")
+    for item in report['unused'] if verbose else report['unused'][:10]:
+        print(f"  • {item['file']}:{item['line']} {item['selector']}")
+    if not verbose and len(report['unused']) > 10:
+        print(f"  … 另有 {len(report['unused']) - 10} 个（-v 查看全部）")
+
+    for warning in report['warnings']:
+        print(f"⚠️ {warning['file']}:{warning['line']} {warning['message']}")
+
+    original = sum(item['bytes_original'] for item in report['files'])
+    minified = sum(item['bytes_minified'] for item in report['files'])
+    optimized = sum(item['bytes_optimized'] for item in report['files'])
+    print("=" * 60)
+    print(f"📋 合计: {original} → {optimized} 字节，比仅压缩再少 {minified - optimized} 字节")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='删除重复、被覆盖和未使用的CSS规则')
+    parser.add_argument('html', nargs='?', default='index.html', help='页面文件')
+    parser.add_argument('--out', default=build_assets.DIST_DIR, help='输出目录')
+    parser.add_argument('--root', default=None, help='站点根目录（默认为页面所在目录）')
+    parser.add_argument('--prune-unused', action='store_true', help='删除未使用的选择器')
+    parser.add_argument('-v', '--verbose', action='store_true', help='列出全部条目')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.html):
+        print(f"❌ {args.html} 不存在")
+        return 1
+
+    try:
+        report = optimize(args.html, args.out, args.root, args.prune_unused)
+    except css_parse.CSSParseError as e:
+        print(f"❌ 样式表解析失败: {e}")
+        return 1
+
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(report, args.verbose)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+简单的CSS解析器
+把样式表解析为规则树: 普通规则（选择器列表 + 声明列表）、可嵌套的条件规则
+（@media/@supports/@container/@layer）以及整体保留原文的其他内容
+（@keyframes、@font-face、@import、原生嵌套规则等），并能重新输出为紧凑的CSS
+"""
+
+import bisect
+import re
+
+# 内容是规则列表、需要递归解析的@规则
+GROUP_AT_RULES = {'media', 'supports', 'container', 'layer', 'document'}
+
+_WS = ' \t\r\n\f'
+_IMPORTANT_RE = re.compile(r'!\s*important\s*$', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+class Rule:
+    """普通样式规则"""
+
+    def __init__(self, selectors, declarations, line):
+        self.selectors = selectors        # 规范化后的选择器列表
+        self.declarations = declarations  # [Declaration]
+        self.line = line
+
+    def __repr__(self):
+        return f'<Rule {",".join(self.selectors)} line={self.line}>'
+
+
+class AtBlock:
+    """包含规则列表的条件@规则"""
+
+    def __init__(self, name, prelude, children, line):
+        self.name = name
+        self.prelude = prelude
+        self.children = children
+        self.line = line
+
+    def __repr__(self):
+        return f'<@{self.name} {self.prelude} line={self.line}>'
+
+
+class Raw:
+    """不做分析、原样保留的内容（@keyframes、@font-face、@import等）"""
+
+    def __init__(self, text, line, name=None):
+        self.text = text
+        self.line = line
+        self.name = name  # @规则名，不是@规则时为None
+
+    def __repr__(self):
+        return f'<Raw {self.name or ""} line={self.line}>'
+
+
+class Declaration:
+    """单条声明"""
+
+    def __init__(self, prop, value, important=False):
+        self.prop = prop
+        self.value = value
+        self.important = important
+
+    def key(self):
+        return (self.prop, self.value, self.important)
+
+    def css(self):
+        return f'{self.prop}:{self.value}' + ('!important' if self.important else '')
+
+    def __repr__(self):
+        return f'<Declaration {self.css()}>'
+
+
+class CSSParseError(ValueError):
+    """样式表结构不完整（例如括号不匹配）"""
+
+
+_special_patterns = {}
+
+
+def _special_re(stops):
+    pattern = _special_patterns.get(stops)
+    if pattern is None:
+        pattern = re.compile('[\\\\"\'/()\\[\\]%s]' % re.escape(stops))
+        _special_patterns[stops] = pattern
+    return pattern
+
+
+def find_unnested(text, pos, stops):
+    """从pos开始前进到第一个不在字符串/注释/括号中的stops字符，返回其位置（找不到返回len(text)）"""
+    special = _special_re(stops)
+    depth = 0
+    n = len(text)
+    while pos < n:
+        match = special.search(text, pos)
+        if match is None:
+            return n
+        pos = match.start()
+        ch = text[pos]
+        if ch == '\\':
+            pos += 2
+            continue
+        if ch in '"\'':
+            end = pos + 1
+            while end < n and text[end] != ch and text[end] != '\n':
+                end += 2 if text[end] == '\\' else 1
+            pos = end + 1
+            continue
+        if text.startswith('/*', pos):
+            end = text.find('*/', pos + 2)
+            pos = n if end == -1 else end + 2
+            continue
+        if depth == 0 and ch in stops:
+            return pos
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth = max(0, depth - 1)
+        pos += 1
+    return n
+
+
+def _matching_brace(text, open_pos):
+    """返回与text[open_pos]处'{'匹配的'}'位置"""
+    depth = 0
+    pos = open_pos
+    while True:
+        pos = find_unnested(text, pos, '{}')
+        if pos >= len(text):
+            raise CSSParseError(f'第{text.count(chr(10), 0, open_pos) + 1}行的 {{ 没有闭合')
+        if text[pos] == '{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+        pos += 1
+
+
+_COMMENT_OR_STRING_RE = re.compile(r'/\*.*?(?:\*/|$)|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|\\.', re.DOTALL)
+
+
+def strip_comments(text):
+    """去掉注释（字符串中的不受影响）"""
+    if '/*' not in text:
+        return text
+    return _COMMENT_OR_STRING_RE.sub(lambda m: ' ' if m.group().startswith('/*') else m.group(), text)
+
+
+def normalize(text):
+    """去掉注释并把连续空白压缩为一个空格"""
+    return _SPACE_RE.sub(' ', strip_comments(text)).strip()
+
+
+def split_top_level(text, separator):
+    """按不在字符串/括号中的分隔符切分"""
+    parts = []
+    pos = 0
+    while True:
+        end = find_unnested(text, pos, separator)
+        parts.append(text[pos:end])
+        if end >= len(text):
+            return parts
+        pos = end + 1
+
+
+def parse_declarations(body):
+    """解析声明块内容"""
+    declarations = []
+    for part in split_top_level(body, ';'):
+        part = normalize(part)
+        if not part:
+            continue
+        prop, sep, value = part.partition(':')
+        if not sep:
+            continue
+        prop = prop.strip()
+        if not prop.startswith('--'):
+            prop = prop.lower()
+        value = value.strip()
+        important = bool(_IMPORTANT_RE.search(value))
+        if important:
+            value = _IMPORTANT_RE.sub('', value).strip()
+        declarations.append(Declaration(prop, value, important))
+    return declarations
+
+
+def parse(text):
+    """解析样式表，返回节点列表"""
+    line_starts = [0] + [m.end() for m in re.finditer('\n', text)]
+    nodes, _ = _parse_list(text, 0, False, line_starts)
+    return nodes
+
+
+def _parse_list(text, pos, nested, line_starts):
+    nodes = []
+    n = len(text)
+    while True:
+        # 跳过空白和注释
+        while pos < n:
+            if text[pos] in _WS:
+                pos += 1
+            elif text.startswith('/*', pos):
+                end = text.find('*/', pos + 2)
+                pos = n if end == -1 else end + 2
+            else:
+                break
+        if pos >= n:
+            if nested:
+                raise CSSParseError('条件规则没有闭合')
+            return nodes, pos
+        if text[pos] == '}':
+            if nested:
+                return nodes, pos + 1
+            pos += 1  # 多余的 }，浏览器同样会忽略
+            continue
+
+        start = pos
+        end = find_unnested(text, pos, '{;}')
+        prelude = text[start:end]
+        line = bisect.bisect_right(line_starts, start)
+
+        if end >= n or text[end] in ';}':
+            # 没有块的语句（@import、@charset等）；普通选择器后的 ; 或 } 属于无效内容
+            if prelude.lstrip().startswith('@'):
+                stop = min(end + 1, n) if end < n and text[end] == ';' else end
+                nodes.append(Raw(text[start:stop].strip(), line, _at_name(prelude)))
+                pos = stop
+            else:
+                pos = end + 1 if end < n and text[end] == ';' else end
+            continue
+
+        name = _at_name(prelude) if prelude.lstrip().startswith('@') else None
+        if name in GROUP_AT_RULES:
+            children, pos = _parse_list(text, end + 1, True, line_starts)
+            nodes.append(AtBlock(name, normalize(prelude.lstrip()[len(name) + 1:]), children, line))
+            continue
+        close = _matching_brace(text, end)
+        if name is not None:
+            nodes.append(Raw(text[start:close + 1].strip(), line, name))
+        else:
+            body = text[end + 1:close]
+            if find_unnested(body, 0, '{') < len(body):
+                # 原生CSS嵌套，不做分析
+                nodes.append(Raw(text[start:close + 1].strip(), line))
+            else:
+                selectors = [normalize(s) for s in split_top_level(prelude, ',')]
+                nodes.append(Rule([s for s in selectors if s], parse_declarations(body), line))
+        pos = close + 1
+
+
+def _at_name(prelude):
+    match = re.match(r'\s*@([\w-]+)', prelude)
+    return match.group(1).lower() if match else ''
+
+
+def serialize(nodes, minify_raw=None):
+    """把节点列表输出为紧凑的CSS；minify_raw用于压缩原样保留的内容"""
+    out = []
+    for node in nodes:
+        if isinstance(node, Rule):
+            if node.selectors and node.declarations:
+                out.append(','.join(node.selectors) + '{' + ';'.join(d.css() for d in node.declarations) + '}')
+        elif isinstance(node, AtBlock):
+            inner = serialize(node.children, minify_raw)
+            if inner:
+                prelude = f' {node.prelude}' if node.prelude else ''
+                out.append(f'@{node.name}{prelude}{{{inner}}}')
+        else:
+            out.append(minify_raw(node.text).strip() if minify_raw else node.text)
+    return ''.join(out)
+
+
+def iter_rules(nodes, context=()):
+    """依次返回 (规则, 上下文)；上下文是外层条件规则的 (名称, 条件) 元组"""
+    for node in nodes:
+        if isinstance(node, Rule):
+            yield node, context
+        elif isinstance(node, AtBlock):
+            yield from iter_rules(node.children, context + ((node.name, node.prelude),))
+
+
+# ---- 选择器 ----
+
+_FUNCTIONAL_PSEUDO_RE = re.compile(r':{1,2}[\w-]+\(')
+_SIMPLE_RE = re.compile(r'([.#]?)((?:[\w-]|\\.|[^\x00-\x7f])+)|(\[)|(::?)|(\*)|(.)')
+
+
+def _unescape(name):
+    return re.sub(r'\\(.)', r'\1', name)
+
+
+def selector_parts(selector):
+    """提取选择器引用的类型、class和id（忽略伪类参数和属性选择器）
+
+    返回 {'tags': set, 'classes': set, 'ids': set}
+    """
+    parts = {'tags': set(), 'classes': set(), 'ids': set()}
+    pos = 0
+    n = len(selector)
+    while pos < n:
+        match = _FUNCTIONAL_PSEUDO_RE.match(selector, pos)
+        if match:
+            # :not()/:is()/:nth-child()等的参数不计入（否定或可选条件）
+            pos = find_unnested(selector, match.end(), ')') + 1
+            continue
+        match = _SIMPLE_RE.match(selector, pos)
+        prefix, name, bracket, colon = match.group(1), match.group(2), match.group(3), match.group(4)
+        if bracket:
+            pos = find_unnested(selector, pos + 1, ']') + 1
+            continue
+        if colon:
+            # 伪类/伪元素名
+            end = pos + len(colon)
+            while end < n and (selector[end].isalnum() or selector[end] in '-_'):
+                end += 1
+            pos = end
+            continue
+        if name:
+            if prefix == '.':
+                parts['classes'].add(_unescape(name))
+            elif prefix == '#':
+                parts['ids'].add(_unescape(name))
+            elif not name[0].isdigit():
+                parts['tags'].add(name.lower())
+        pos = match.end()
+    return parts
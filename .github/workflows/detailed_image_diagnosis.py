@@ -5,17 +5,55 @@
 
 import os
 import re
-from bs4 import BeautifulSoup
+
+import html_scan
+import js_index
+import site_cache
+from pattern_rules import RuleSet
+
+# index.html中的脚本标签
+SCRIPT_RULES = RuleSet([
+    (r'<script src="js/notifications\.js"></script>', 'notifications.js'),
+    (r'<script src="js/user\.js"></script>', 'user.js'),
+    (r'<script src="js/main\.js"></script>', 'main.js'),
+    (r'<script>', '内联脚本'),
+])
+
+# index.html中的初始化代码
+INIT_RULES = RuleSet([
+    (r'new PhotoEditor\(\)', r'new PhotoEditor\(\)'),
+    (r'window\.photoEditor', r'window\.photoEditor'),
+    (r'DOMContentLoaded', r'DOMContentLoaded'),
+], re.DOTALL)
+
+# main.js中的调试日志
+DEBUG_RULES = RuleSet([
+    ('console\.log.*🔄.*开始加载图片', 'loadImage调试日志'),
+    ('console\.log.*📖.*文件读取成功', '文件读取成功日志'),
+    ('console\.log.*🖼️.*图片加载成功', '图片加载成功日志'),
+    ('console\.log.*✏️.*正在绘制图片', '图片绘制日志'),
+    ('console\.log.*✅.*图片绘制完成', '图片完成日志'),
+])
+
+# main.js中的文件验证逻辑
+VALIDATION_RULES = RuleSet([
+    (r'file\.type\.startsWith.*image/', '文件类型验证'),
+    (r'file\.size.*10.*1024.*1024', '文件大小限制'),
+    ('notificationManager.show', '用户通知'),
+])
+
+# main.js中的PhotoEditor方法（按结构索引查找定义）
+EDITOR_METHODS = [
+    ('loadImage', 'loadImage方法'),
+    ('handleFileSelect', 'handleFileSelect方法'),
+    ('setupDragAndDrop', 'setupDragAndDrop方法'),
+    ('preventDefaults', 'preventDefaults方法'),
+]
 
 def check_html_structure():
     """检查HTML结构和元素"""
     print("🔍 检查HTML结构...")
     
-    with open('/workspace/index.html', 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
     # 检查关键元素
     required_elements = {
         'mainCanvas': 'Canvas元素',
@@ -23,11 +61,15 @@ def check_html_structure():
         'dropZone': '拖拽区域元素'
     }
     
+    found = html_scan.scan_file('/workspace/index.html', [
+        html_scan.Query(element_id, id=element_id) for element_id in required_elements
+    ])
+    
     missing_elements = []
     found_elements = []
     
     for element_id, description in required_elements.items():
-        element = soup.find(id=element_id)
+        element = found[element_id]
         if element:
             found_elements.append(f"✅ {description} ({element_id})")
         else:
@@ -45,32 +87,18 @@ def check_script_loading():
     """检查脚本加载顺序"""
     print("\n🔍 检查脚本加载...")
     
-    with open('/workspace/index.html', 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    html_content = site_cache.read_text('/workspace/index.html')
     
     # 检查脚本标签
-    script_patterns = [
-        (r'<script src="js/notifications\.js"></script>', 'notifications.js'),
-        (r'<script src="js/user\.js"></script>', 'user.js'),
-        (r'<script src="js/main\.js"></script>', 'main.js'),
-        (r'<script>', '内联脚本')
-    ]
-    
-    for pattern, script_name in script_patterns:
-        if re.search(pattern, html_content):
+    for _, script_name, offset in SCRIPT_RULES.matches(html_content):
+        if offset is not None:
             print(f"  ✅ {script_name} 已加载")
         else:
             print(f"  ❌ {script_name} 未找到")
     
     # 检查初始化代码
-    init_patterns = [
-        r'new PhotoEditor\(\)',
-        r'window\.photoEditor',
-        r'DOMContentLoaded'
-    ]
-    
-    for pattern in init_patterns:
-        if re.search(pattern, html_content, re.DOTALL):
+    for pattern, _, offset in INIT_RULES.matches(html_content):
+        if offset is not None:
             print(f"  ✅ 找到初始化代码: {pattern}")
         else:
             print(f"  ❌ 未找到初始化代码: {pattern}")
@@ -79,20 +107,11 @@ def check_debugging_features():
     """检查调试功能"""
     print("\n🔍 检查调试功能...")
     
-    with open('/workspace/js/main.js', 'r', encoding='utf-8') as f:
-        js_content = f.read()
+    js_content = site_cache.read_text('/workspace/js/main.js')
     
     # 检查调试日志
-    debug_checks = [
-        ('console\.log.*🔄.*开始加载图片', 'loadImage调试日志'),
-        ('console\.log.*📖.*文件读取成功', '文件读取成功日志'),
-        ('console\.log.*🖼️.*图片加载成功', '图片加载成功日志'),
-        ('console\.log.*✏️.*正在绘制图片', '图片绘制日志'),
-        ('console\.log.*✅.*图片绘制完成', '图片完成日志')
-    ]
-    
-    for pattern, description in debug_checks:
-        if re.search(pattern, js_content):
+    for _, description, offset in DEBUG_RULES.matches(js_content):
+        if offset is not None:
             print(f"  ✅ {description}")
         else:
             print(f"  ❌ {description}")
@@ -101,17 +120,10 @@ def check_file_validation():
     """检查文件验证逻辑"""
     print("\n🔍 检查文件验证...")
     
-    with open('/workspace/js/main.js', 'r', encoding='utf-8') as f:
-        js_content = f.read()
-    
-    validation_checks = [
-        (r'file\.type\.startsWith.*image/', '文件类型验证'),
-        (r'file\.size.*10.*1024.*1024', '文件大小限制'),
-        ('notificationManager.show', '用户通知')
-    ]
+    js_content = site_cache.read_text('/workspace/js/main.js')
     
-    for pattern, description in validation_checks:
-        if re.search(pattern, js_content):
+    for _, description, offset in VALIDATION_RULES.matches(js_content):
+        if offset is not None:
             print(f"  ✅ {description}")
         else:
             print(f"  ❌ {description}")
@@ -120,18 +132,10 @@ def check_photoeditor_methods():
     """检查PhotoEditor方法"""
     print("\n🔍 检查PhotoEditor方法...")
     
-    with open('/workspace/js/main.js', 'r', encoding='utf-8') as f:
-        js_content = f.read()
-    
-    method_checks = [
-        ('loadImage(', 'loadImage方法'),
-        ('handleFileSelect(', 'handleFileSelect方法'),
-        ('setupDragAndDrop(', 'setupDragAndDrop方法'),
-        ('preventDefaults(', 'preventDefaults方法')
-    ]
+    index = js_index.load('/workspace/js/main.js')
     
-    for method, description in method_checks:
-        if method in js_content:
+    for name, description in EDITOR_METHODS:
+        if index.defines(name):
             print(f"  ✅ {description}")
         else:
             print(f"  ❌ {description}")
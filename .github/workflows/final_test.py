@@ -3,12 +3,13 @@
 最终测试图片导入功能
 """
 
-import os
 import subprocess
 import time
 import requests
 from pathlib import Path
 
+import site_cache
+
 def test_server():
     """测试服务器是否运行"""
     print("🌐 测试服务器状态...")
@@ -39,7 +40,7 @@ def test_files():
     
     missing_files = []
     for file_path in required_files:
-        if os.path.exists(file_path):
+        if site_cache.exists(file_path):
             print(f"  ✅ {file_path}")
         else:
             print(f"  ❌ {file_path}")
@@ -51,8 +52,7 @@ def check_js_initialization():
     """检查JavaScript初始化代码"""
     print("\n🔍 检查初始化代码...")
     
-    with open('js/main.js', 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = site_cache.read_text('js/main.js')
     
     checks = [
         ('window.photoEditor = new PhotoEditor()', 'PhotoEditor实例化'),
@@ -116,7 +116,7 @@ def main():
     if server_ok:
         print("✅ 服务器运行正常")
     else:
-        print("❌ 服务器未运行 - 请运行: python3 -m http.server 8000")
+        print("❌ 服务器未运行 - 请运行: python3 static_server.py")
     
     if files_ok:
         print("✅ 所有必要文件存在")
@@ -3,207 +3,14 @@
 修复图片导入问题的诊断和修复脚本
 """
 
+import argparse
 import os
-import re
 
-def check_files():
-    """检查文件是否存在"""
-    files = ['index.html', 'js/main.js', 'js/canvas.js']
-    for file in files:
-        if os.path.exists(file):
-            print(f"✅ 文件存在: {file}")
-        else:
-            print(f"❌ 文件缺失: {file}")
-            return False
-    return True
+import js_index
+import patch_engine
 
-def analyze_main_js():
-    """分析main.js中的图片导入逻辑"""
-    with open('js/main.js', 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    issues = []
-    
-    # 检查PhotoEditor类是否正确实现
-    if 'class PhotoEditor' not in content:
-        issues.append("❌ PhotoEditor类未找到")
-    else:
-        print("✅ PhotoEditor类存在")
-    
-    # 检查init方法
-    if 'init()' in content:
-        print("✅ init方法存在")
-    else:
-        issues.append("❌ init方法未找到")
-    
-    # 检查loadImage方法
-    if 'loadImage(file)' in content:
-        print("✅ loadImage方法存在")
-    else:
-        issues.append("❌ loadImage方法未找到")
-    
-    # 检查canvas初始化
-    if 'this.canvas.width = 800' in content and 'this.canvas.height = 600' in content:
-        print("✅ Canvas初始化正常")
-    else:
-        issues.append("❌ Canvas初始化可能有问题")
-    
-    # 检查事件监听器
-    if "addEventListener('change'" in content:
-        print("✅ 文件输入事件监听器存在")
-    else:
-        issues.append("❌ 文件输入事件监听器缺失")
-    
-    # 检查拖拽事件
-    if 'setupDragAndDrop' in content:
-        print("✅ 拖拽功能存在")
-    else:
-        issues.append("❌ 拖拽功能缺失")
-    
-    return issues
-
-def analyze_index_html():
-    """分析index.html中的相关元素"""
-    with open('index.html', 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    issues = []
-    
-    # 检查Canvas元素
-    if 'id="mainCanvas"' in content:
-        print("✅ mainCanvas元素存在")
-    else:
-        issues.append("❌ mainCanvas元素缺失")
-    
-    # 检查文件输入元素
-    if 'id="fileInput"' in content:
-        print("✅ fileInput元素存在")
-    else:
-        issues.append("❌ fileInput元素缺失")
-    
-    # 检查拖拽区域
-    if 'id="dropZone"' in content:
-        print("✅ dropZone元素存在")
-    else:
-        issues.append("❌ dropZone元素缺失")
-    
-    # 检查脚本加载顺序
-    script_order = ['main.js', 'canvas.js', 'tools.js']
-    script_positions = []
-    for script in script_order:
-        if f'src="js/{script}"' in content:
-            pos = content.find(f'src="js/{script}"')
-            script_positions.append((script, pos))
-            print(f"✅ {script} 脚本已加载")
-        else:
-            issues.append(f"❌ {script} 脚本未加载")
-    
-    # 检查window.photoEditor实例化
-    if 'window.photoEditor = new PhotoEditor()' in content:
-        print("✅ PhotoEditor实例化存在")
-    else:
-        issues.append("❌ PhotoEditor实例化缺失")
-    
-    return issues
-
-def fix_load_image_method():
-    """修复loadImage方法，添加更详细的错误处理和调试信息"""
-    
-    # 读取当前main.js
-    with open('js/main.js', 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 查找loadImage方法并替换为修复版本
-    old_load_image = '''    loadImage(file) {
-        // Show loading indicator
-        this.showNotification('正在加载图片...', 'info');
-        
-        const reader = new FileReader();
-        reader.onload = (e) => {
-            const img = new Image();
-            
-            img.onload = () => {
-                try {
-                    // Set maximum canvas size
-                    const maxWidth = 1200;
-                    const maxHeight = 800;
-                    
-                    // Calculate new dimensions
-                    let newWidth = img.width;
-                    let newHeight = img.height;
-                    
-                    // Scale down if too large
-                    if (newWidth > maxWidth || newHeight > maxHeight) {
-                        const scale = Math.min(maxWidth / newWidth, maxHeight / newHeight);
-                        newWidth = Math.floor(newWidth * scale);
-                        newHeight = Math.floor(newHeight * scale);
-                    }
-                    
-                    // Ensure minimum dimensions
-                    newWidth = Math.max(newWidth, 100);
-                    newHeight = Math.max(newHeight, 100);
-                    
-                    // Resize canvas and context
-                    this.canvas.width = newWidth;
-                    this.canvas.height = newHeight;
-                    
-                    // Clear canvas completely
-                    this.ctx.save();
-                    this.ctx.globalCompositeOperation = 'source-over';
-                    this.ctx.clearRect(0, 0, newWidth, newHeight);
-                    this.ctx.fillStyle = '#ffffff';
-                    this.ctx.fillRect(0, 0, newWidth, newHeight);
-                    
-                    // Draw image
-                    this.ctx.drawImage(img, 0, 0, newWidth, newHeight);
-                    this.ctx.restore();
-                    
-                    // Update current layer
-                    if (this.layers[this.currentLayer]) {
-                        const layer = this.layers[this.currentLayer];
-                        layer.canvas.width = newWidth;
-                        layer.canvas.height = newHeight;
-                        const layerCtx = layer.canvas.getContext('2d');
-                        layerCtx.clearRect(0, 0, newWidth, newHeight);
-                        layerCtx.drawImage(img, 0, 0, newWidth, newHeight);
-                    }
-                    
-                    this.currentFile = file;
-                    this.hideDropZone();
-                    this.addToHistory();
-                    this.render();
-                    this.updateCanvasSize();
-                    
-                    // Hide loading indicator and show success
-                    this.hideNotification();
-                    notificationManager.show('图片加载成功!', 'success');
-                    
-                } catch (error) {
-                    console.error('Error loading image:', error);
-                    this.hideNotification();
-                    notificationManager.show('图片加载失败: ' + error.message, 'error');
-                }
-            };
-            
-            img.onerror = () => {
-                console.error('Error loading image');
-                this.hideNotification();
-                notificationManager.show('图片格式不支持或文件损坏', 'error');
-            };
-            
-            img.crossOrigin = 'anonymous';
-            img.src = e.target.result;
-        };
-        
-        reader.onerror = () => {
-            console.error('Error reading file');
-            this.hideNotification();
-            notificationManager.show('文件读取失败', 'error');
-        };
-        
-        reader.readAsDataURL(file);'''
-    
-    new_load_image = '''    loadImage(file) {
+# 修复后的loadImage方法（按方法定义定位，整体替换）
+NEW_LOAD_IMAGE = '''    loadImage(file) {
         // 调试信息
         console.log('开始加载图片:', file.name, '类型:', file.type, '大小:', file.size);
         
@@ -326,25 +133,16 @@ def fix_load_image_method():
         console.log('开始读取文件');
         reader.readAsDataURL(file);
     }'''
-    
-    if old_load_image in content:
-        content = content.replace(old_load_image, new_load_image)
-        with open('js/main.js', 'w', encoding='utf-8') as f:
-            f.write(content)
-        print("✅ loadImage方法已更新")
-        return True
-    else:
-        print("❌ 找不到loadImage方法进行替换")
-        return False
 
-def add_debug_mode():
-    """添加调试模式到页面"""
-    
-    with open('index.html', 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 在DOMContentLoaded事件中添加调试信息
-    debug_script = '''
+LOAD_IMAGE_PATCH = patch_engine.Patch(
+    'load-image-diagnostics', 1, 'js/main.js', 'replace', NEW_LOAD_IMAGE,
+    anchor=patch_engine.js_method('loadImage'),
+    already_present='开始加载图片',
+    description='loadImage添加文件验证、错误处理和调试日志',
+)
+
+# 在DOMContentLoaded事件中添加调试信息
+DEBUG_SCRIPT = '''
             // Debug: Check if photoEditor is properly initialized
             setTimeout(() => {
                 if (window.photoEditor) {
@@ -381,20 +179,144 @@ def add_debug_mode():
                 
             }, 1000);
     '''
+
+DEBUG_MODE_PATCH = patch_engine.Patch(
+    'debug-mode', 1, 'index.html', 'insert_after', DEBUG_SCRIPT,
+    anchor='photoEditor.init();', comment='js',
+    already_present='// Debug: Check if photoEditor is properly initialized',
+    description='页面加载后检查PhotoEditor、文件输入和拖拽区域',
+)
+
+def check_files():
+    """检查文件是否存在"""
+    files = ['index.html', 'js/main.js', 'js/canvas.js']
+    for file in files:
+        if os.path.exists(file):
+            print(f"✅ 文件存在: {file}")
+        else:
+            print(f"❌ 文件缺失: {file}")
+            return False
+    return True
+
+def analyze_main_js():
+    """分析main.js中的图片导入逻辑"""
+    index = js_index.load('js/main.js')
     
-    # 找到合适的位置插入调试脚本
-    if 'photoEditor.init();' in content:
-        content = content.replace('photoEditor.init();', 'photoEditor.init();' + debug_script)
-        
-        with open('index.html', 'w', encoding='utf-8') as f:
-            f.write(content)
-        print("✅ 调试脚本已添加")
-        return True
+    issues = []
+    
+    # 检查PhotoEditor类是否正确实现
+    if not index.has_class('PhotoEditor'):
+        issues.append("❌ PhotoEditor类未找到")
     else:
+        print("✅ PhotoEditor类存在")
+    
+    # 检查init方法
+    if index.has_method('init', 'PhotoEditor'):
+        print("✅ init方法存在")
+    else:
+        issues.append("❌ init方法未找到")
+    
+    # 检查loadImage方法
+    if index.has_method('loadImage', 'PhotoEditor', params=['file']):
+        print("✅ loadImage方法存在")
+    else:
+        issues.append("❌ loadImage方法未找到")
+    
+    # 检查canvas初始化
+    if index.assigns('this.canvas.width', '800') and index.assigns('this.canvas.height', '600'):
+        print("✅ Canvas初始化正常")
+    else:
+        issues.append("❌ Canvas初始化可能有问题")
+    
+    # 检查事件监听器
+    if index.listeners('change'):
+        print("✅ 文件输入事件监听器存在")
+    else:
+        issues.append("❌ 文件输入事件监听器缺失")
+    
+    # 检查拖拽事件
+    if index.defines('setupDragAndDrop'):
+        print("✅ 拖拽功能存在")
+    else:
+        issues.append("❌ 拖拽功能缺失")
+    
+    return issues
+
+def analyze_index_html():
+    """分析index.html中的相关元素"""
+    with open('index.html', 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    issues = []
+    
+    # 检查Canvas元素
+    if 'id="mainCanvas"' in content:
+        print("✅ mainCanvas元素存在")
+    else:
+        issues.append("❌ mainCanvas元素缺失")
+    
+    # 检查文件输入元素
+    if 'id="fileInput"' in content:
+        print("✅ fileInput元素存在")
+    else:
+        issues.append("❌ fileInput元素缺失")
+    
+    # 检查拖拽区域
+    if 'id="dropZone"' in content:
+        print("✅ dropZone元素存在")
+    else:
+        issues.append("❌ dropZone元素缺失")
+    
+    # 检查脚本加载顺序
+    script_order = ['main.js', 'canvas.js', 'tools.js']
+    script_positions = []
+    for script in script_order:
+        if f'src="js/{script}"' in content:
+            pos = content.find(f'src="js/{script}"')
+            script_positions.append((script, pos))
+            print(f"✅ {script} 脚本已加载")
+        else:
+            issues.append(f"❌ {script} 脚本未加载")
+    
+    # 检查window.photoEditor实例化
+    if 'window.photoEditor = new PhotoEditor()' in content:
+        print("✅ PhotoEditor实例化存在")
+    else:
+        issues.append("❌ PhotoEditor实例化缺失")
+    
+    return issues
+
+def fix_load_image_method(dry_run=False):
+    """修复loadImage方法，添加更详细的错误处理和调试信息"""
+    try:
+        result = patch_engine.apply(LOAD_IMAGE_PATCH, dry_run)
+    except patch_engine.PatchError as e:
+        print(f"❌ {e}")
+        return False
+    patch_engine.print_result(result, dry_run)
+    if result['status'] == 'missing-anchor':
+        print("❌ 找不到loadImage方法进行替换")
+        return False
+    return result['status'] != 'missing-file'
+
+def add_debug_mode(dry_run=False):
+    """添加调试模式到页面"""
+    try:
+        result = patch_engine.apply(DEBUG_MODE_PATCH, dry_run)
+    except patch_engine.PatchError as e:
+        print(f"❌ {e}")
+        return False
+    patch_engine.print_result(result, dry_run)
+    if result['status'] == 'missing-anchor':
         print("❌ 找不到插入调试脚本的位置")
         return False
+    return result['status'] != 'missing-file'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='诊断并修复图片导入问题')
+    parser.add_argument('--dry-run', action='store_true', help='只显示补丁差异，不修改文件')
+    args = parser.parse_args(argv)
 
-def main():
     print("🔧 图片导入问题诊断和修复")
     print("=" * 50)
     
@@ -413,14 +335,14 @@ def main():
     
     # 4. 修复loadImage方法
     print("\n4. 修复loadImage方法...")
-    if fix_load_image_method():
+    if fix_load_image_method(args.dry_run):
         print("✅ loadImage方法修复成功")
     else:
         print("❌ loadImage方法修复失败")
     
     # 5. 添加调试模式
     print("\n5. 添加调试信息...")
-    if add_debug_mode():
+    if add_debug_mode(args.dry_run):
         print("✅ 调试信息添加成功")
     else:
         print("❌ 调试信息添加失败")
@@ -4,17 +4,15 @@
 专门解决在不同缩放比例下内容被截断的问题
 """
 
-import re
+import argparse
+import sys
 
-def fix_zoom_display_issues():
-    """修复缩放显示问题的CSS代码"""
-    
-    # 读取现有CSS文件
-    with open('/workspace/styles/main.css', 'r', encoding='utf-8') as f:
-        css_content = f.read()
-    
-    # 创建改进的CSS样式
-    zoom_fixes = """
+import patch_engine
+
+MAIN_CSS = '/workspace/styles/main.css'
+
+# 缩放显示修复CSS
+ZOOM_FIXES_CSS = """
 /* ===== ZOOM DISPLAY FIXES ===== */
 /* 修复缩放显示不全问题 */
 
@@ -275,17 +273,27 @@ body, html {
 }
 
 /* ===== END ZOOM DISPLAY FIXES ===== */
-
 """
+
+# 旧版脚本每次运行都会追加一份没有补丁标记的修复内容；
+# 补丁块内保留同样的起止标记（test_zoom_fixes.check_css_fixes 依赖它）
+ZOOM_FIXES_PATCH = patch_engine.Patch(
+    'zoom-display-fixes', 2, MAIN_CSS, 'append', ZOOM_FIXES_CSS,
+    legacy=('/* ===== ZOOM DISPLAY FIXES ===== */', '/* ===== END ZOOM DISPLAY FIXES ===== */'),
+    description='修复不同缩放比例下内容被截断的问题',
+)
+
+def fix_zoom_display_issues(dry_run=False):
+    """修复缩放显示问题的CSS代码（重复运行不会重复追加）"""
     
-    # 将修复代码添加到CSS文件末尾
-    updated_css = css_content + zoom_fixes
-    
-    # 写入更新的CSS文件
-    with open('/workspace/styles/main.css', 'w', encoding='utf-8') as f:
-        f.write(updated_css)
-    
-    print("✅ 缩放显示修复CSS已添加到 styles/main.css")
+    try:
+        result = patch_engine.apply(ZOOM_FIXES_PATCH, dry_run)
+    except patch_engine.PatchError as e:
+        print(f"❌ {e}")
+        return False
+    patch_engine.print_result(result, dry_run)
+    if result['status'] in ('missing-file', 'missing-anchor'):
+        return False
     
     # 创建一个改进的HTML头部来优化缩放
     html_head_improvements = """
@@ -326,5 +334,11 @@ body, html {
     
     return True
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='修复不同缩放比例下内容被截断的问题')
+    parser.add_argument('--dry-run', action='store_true', help='只显示补丁差异，不修改文件')
+    args = parser.parse_args(argv)
+    return 0 if fix_zoom_display_issues(args.dry_run) else 1
+
 if __name__ == "__main__":
-    fix_zoom_display_issues()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
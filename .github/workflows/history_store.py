@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+撤销/重做历史存储的参考设计
+每一步只保存发生变化的块与上一步的XOR差分（zlib压缩），每隔K步保存一个关键帧
+（整幅图像压缩）。XOR差分是对称的，撤销和重做都是把同一份差分异或回当前图像，
+耗时只与这一步改动的块数有关，与历史长度无关。总占用超过上限时整段淘汰最早的
+关键帧及其后的差分
+
+基准测试在模拟的编辑序列（画笔、矩形、整幅滤镜、裁剪、旋转）上比较每一步的内存
+占用与整幅快照方式，并逐步撤销/重做验证结果与快照一致
+
+用法:
+    python3 history_store.py
+    python3 history_store.py --size 1920x1080 --steps 200 --limit-mb 64
+    python3 history_store.py --json
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from smoke_test import percentile
+
+TILE_SIZE = 128
+
+# 每隔多少步保存一个关键帧
+KEYFRAME_INTERVAL = 16
+
+# 历史记录的默认内存上限
+MEMORY_LIMIT = 256 << 20
+
+ZLIB_LEVEL = 1
+
+
+def _grid(shape, tile_size):
+    """块的起始行/列"""
+    return np.arange(0, shape[0], tile_size), np.arange(0, shape[1], tile_size)
+
+
+def changed_tiles(old, new, tile_size=TILE_SIZE):
+    """返回内容不同的块坐标 [(tx, ty)]（整幅比较后按块归约，没有逐块的Python循环）"""
+    mask = (old != new).any(axis=2)
+    rows, cols = _grid(old.shape, tile_size)
+    grid = np.logical_or.reduceat(np.logical_or.reduceat(mask, rows, axis=0), cols, axis=1)
+    ty, tx = np.nonzero(grid)
+    return list(zip(tx.tolist(), ty.tolist()))
+
+
+def _tile_view(image, tx, ty, tile_size):
+    return image[ty * tile_size:(ty + 1) * tile_size, tx * tile_size:(tx + 1) * tile_size]
+
+
+class Step:
+    """一步历史: 与上一步的XOR差分和/或关键帧"""
+
+    __slots__ = ('label', 'shape', 'delta', 'keyframe', 'bytes')
+
+    def __init__(self, label, shape, delta=None, keyframe=None):
+        self.label = label
+        self.shape = shape
+        self.delta = delta        # {(tx, ty): 压缩后的XOR数据}，尺寸变化或第一步时为None
+        self.keyframe = keyframe  # 压缩后的整幅图像，非关键帧为None
+        self.bytes = self._size()
+
+    def _size(self):
+        total = 0
+        if self.delta:
+            total += sum(len(data) for data in self.delta.values())
+        if self.keyframe is not None:
+            total += len(self.keyframe)
+        return total
+
+
+class HistoryStore:
+    """差分压缩的撤销/重做历史
+
+    image 是当前图像（uint8 RGBA），undo/redo会原地修改它或整个替换
+    """
+
+    def __init__(self, image, tile_size=TILE_SIZE, keyframe_interval=KEYFRAME_INTERVAL,
+                 memory_limit=MEMORY_LIMIT, label='打开图片'):
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.memory_limit = memory_limit
+        self.image = np.array(image, dtype=np.uint8, copy=True)
+        self.steps = [Step(label, self.image.shape, keyframe=self._compress_image(self.image))]
+        self.position = 0  # 当前状态在steps中的下标
+        self.bytes = self.steps[0].bytes
+        self.evicted = 0   # 已淘汰的步数
+
+    # ---- 编码 ----
+
+    @staticmethod
+    def _compress_image(image):
+        return zlib.compress(image.tobytes(), ZLIB_LEVEL)
+
+    @staticmethod
+    def _decompress_image(data, shape):
+        return np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(shape).copy()
+
+    def _apply_delta(self, delta):
+        """把XOR差分异或到当前图像上（撤销和重做相同）"""
+        for (tx, ty), data in delta.items():
+            view = _tile_view(self.image, tx, ty, self.tile_size)
+            view ^= np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(view.shape)
+
+    # ---- 记录 ----
+
+    def commit(self, image, label=''):
+        """记录新状态；若之前撤销过，丢弃可重做的部分"""
+        image = np.asarray(image, dtype=np.uint8)
+        delta = None
+        if image.shape == self.image.shape:
+            delta = {}
+            for tx, ty in changed_tiles(self.image, image, self.tile_size):
+                old = _tile_view(self.image, tx, ty, self.tile_size)
+                new = _tile_view(image, tx, ty, self.tile_size)
+                delta[(tx, ty)] = zlib.compress((old ^ new).tobytes(), ZLIB_LEVEL)
+            if not delta:
+                return False
+        for step in self.steps[self.position + 1:]:
+            self.bytes -= step.bytes
+        del self.steps[self.position + 1:]
+
+        keyframe = None
+        if delta is None or len(self.steps) - self._keyframe_before(self.position) >= self.keyframe_interval:
+            keyframe = self._compress_image(image)
+
+        step = Step(label, image.shape, delta, keyframe)
+        self.steps.append(step)
+        self.bytes += step.bytes
+        self.position += 1
+        if delta is None:
+            self.image = np.array(image, dtype=np.uint8, copy=True)
+        else:
+            self.image[...] = image
+        self._evict()
+        return True
+
+    def _evict(self):
+        """超过上限时整段淘汰最早的关键帧及其差分，当前状态所在的段不会被淘汰"""
+        while self.bytes > self.memory_limit:
+            following = next((i for i in range(1, len(self.steps)) if self.steps[i].keyframe is not None), None)
+            if following is None or following > self.position:
+                return
+            for step in self.steps[:following]:
+                self.bytes -= step.bytes
+            del self.steps[:following]
+            self.position -= following
+            self.evicted += following
+            # 新的第一步不能再撤销，它的差分也不再需要
+            first = self.steps[0]
+            if first.delta:
+                self.bytes -= first.bytes
+                first.delta = None
+                first.bytes = first._size()
+                self.bytes += first.bytes
+
+    # ---- 撤销/重做 ----
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.steps) - 1
+
+    def _keyframe_before(self, index):
+        """index及之前最近的关键帧（最多往回keyframe_interval步）"""
+        while self.steps[index].keyframe is None:
+            index -= 1
+        return index
+
+    def _restore(self, index):
+        """从index之前最近的关键帧开始向前重放差分"""
+        start = self._keyframe_before(index)
+        self.image = self._decompress_image(self.steps[start].keyframe, self.steps[start].shape)
+        for step in self.steps[start + 1:index + 1]:
+            self._apply_delta(step.delta)
+        self.position = index
+
+    def undo(self):
+        if not self.can_undo():
+            return False
+        step = self.steps[self.position]
+        if step.delta is not None:
+            self._apply_delta(step.delta)
+            self.position -= 1
+        else:
+            # 尺寸变化的一步没有差分，从上一个关键帧重建
+            self._restore(self.position - 1)
+        return True
+
+    def redo(self):
+        if not self.can_redo():
+            return False
+        step = self.steps[self.position + 1]
+        if step.delta is not None:
+            self._apply_delta(step.delta)
+            self.position += 1
+        else:
+            self.image = self._decompress_image(step.keyframe, step.shape)
+            self.position += 1
+        return True
+
+    def goto(self, index):
+        """跳到任意一步: 距离较近时逐步撤销/重做，否则从关键帧重建"""
+        if not 0 <= index < len(self.steps):
+            raise IndexError(f'没有第{index}步')
+        keyframe = self._keyframe_before(index)
+        if abs(index - self.position) <= index - keyframe:
+            while self.position > index:
+                self.undo()
+            while self.position < index:
+                self.redo()
+        else:
+            self._restore(index)
+
+    def stats(self):
+        return {
+            'steps': len(self.steps),
+            'position': self.position,
+            'keyframes': sum(1 for step in self.steps if step.keyframe is not None),
+            'bytes': self.bytes,
+            'evicted': self.evicted,
+        }
+
+
+# ---- 基准测试 ----
+
+# 编辑序列中各操作的权重
+TRACE_WEIGHTS = {
+    'brush': 60,
+    'rect': 15,
+    'filter': 15,
+    'crop': 5,
+    'rotate': 5,
+}
+
+
+def make_photo(width, height, seed=0):
+    """带噪声的渐变，压缩率接近真实照片"""
+    rng = np.random.default_rng(seed)
+    image = np.empty((height, width, 4), dtype=np.uint8)
+    image[..., 0] = np.linspace(30, 220, width, dtype=np.float32)[None, :]
+    image[..., 1] = np.linspace(200, 40, height, dtype=np.float32)[:, None]
+    image[..., 2] = 120
+    image[..., :3] += rng.integers(0, 24, (height, width, 3), dtype=np.uint8)
+    image[..., 3] = 255
+    return image
+
+
+def edit(image, operation, rng):
+    """对图像做一次编辑，返回新图像"""
+    height, width = image.shape[:2]
+    out = image.copy()
+    if operation == 'brush':
+        # 沿随机路径盖若干个圆形笔触
+        radius = int(rng.integers(6, 30))
+        x, y = rng.integers(0, width), rng.integers(0, height)
+        color = rng.integers(0, 256, 3)
+        for _ in range(int(rng.integers(5, 25))):
+            x = int(np.clip(x + rng.integers(-radius, radius + 1), 0, width - 1))
+            y = int(np.clip(y + rng.integers(-radius, radius + 1), 0, height - 1))
+            y0, y1 = max(0, y - radius), min(height, y + radius + 1)
+            x0, x1 = max(0, x - radius), min(width, x + radius + 1)
+            yy, xx = np.ogrid[y0:y1, x0:x1]
+            disk = (yy - y) ** 2 + (xx - x) ** 2 <= radius * radius
+            out[y0:y1, x0:x1, :3][disk] = color
+    elif operation == 'rect':
+        w, h = int(rng.integers(20, max(21, width // 4))), int(rng.integers(20, max(21, height // 4)))
+        x, y = int(rng.integers(0, max(1, width - w))), int(rng.integers(0, max(1, height - h)))
+        out[y:y + h, x:x + w, :3] = rng.integers(0, 256, 3)
+    elif operation == 'filter':
+        # 整幅亮度调整，所有块都会变化
+        factor = rng.uniform(0.9, 1.1)
+        out[..., :3] = np.clip(out[..., :3] * factor, 0, 255).astype(np.uint8)
+    elif operation == 'crop':
+        dx, dy = int(rng.integers(1, max(2, width // 20))), int(rng.integers(1, max(2, height // 20)))
+        out = out[dy:height - dy, dx:width - dx].copy()
+    elif operation == 'rotate':
+        out = np.ascontiguousarray(np.rot90(out))
+    return out
+
+
+def _digest(image):
+    return hashlib.sha1(image.tobytes()).hexdigest(), image.shape
+
+
+def make_trace(steps, seed=0):
+    rng = np.random.default_rng(seed)
+    names = list(TRACE_WEIGHTS)
+    weights = np.array([TRACE_WEIGHTS[name] for name in names], dtype=np.float64)
+    return [names[i] for i in rng.choice(len(names), size=steps, p=weights / weights.sum())]
+
+
+def run_benchmark(width, height, steps, tile_size=TILE_SIZE, keyframe_interval=KEYFRAME_INTERVAL,
+                  memory_limit=MEMORY_LIMIT, seed=0):
+    """按编辑序列记录历史，逐步撤销/重做并与整幅快照比对"""
+    rng = np.random.default_rng(seed)
+    image = make_photo(width, height, seed)
+    # 只保存每一步的摘要用于比对，快照方式的占用按字节数累计
+    digests = [_digest(image)]
+    snapshot_bytes = image.nbytes
+    store = HistoryStore(image, tile_size, keyframe_interval, memory_limit)
+    commit_times = []
+    per_step = []
+    trace = make_trace(steps, seed)
+    for operation in trace:
+        image = edit(image, operation, rng)
+        digests.append(_digest(image))
+        snapshot_bytes += image.nbytes
+        start = time.perf_counter()
+        store.commit(image, operation)
+        commit_times.append(time.perf_counter() - start)
+        per_step.append({'operation': operation, 'store_bytes': store.bytes,
+                         'snapshot_bytes': snapshot_bytes})
+
+    # 快照列表中当前可达的第一步
+    first = store.evicted
+    undo_times, redo_times = [], []
+    mismatches = 0
+    while store.can_undo():
+        start = time.perf_counter()
+        store.undo()
+        undo_times.append(time.perf_counter() - start)
+        if _digest(store.image) != digests[first + store.position]:
+            mismatches += 1
+    while store.can_redo():
+        start = time.perf_counter()
+        store.redo()
+        redo_times.append(time.perf_counter() - start)
+        if _digest(store.image) != digests[first + store.position]:
+            mismatches += 1
+
+    def ms(values, pct):
+        return round(percentile(values, pct) * 1000, 3) if values else None
+
+    naive = per_step[-1]['snapshot_bytes']
+    return {
+        'size': [width, height],
+        'steps': steps,
+        'trace': {name: trace.count(name) for name in TRACE_WEIGHTS},
+        'tile_size': tile_size,
+        'keyframe_interval': keyframe_interval,
+        'memory_limit': memory_limit,
+        'snapshot_bytes': naive,
+        'store': store.stats(),
+        'bytes_per_step': {'snapshot': naive // (steps + 1), 'store': store.bytes // len(store.steps)},
+        'commit_ms': {'p50': ms(commit_times, 50), 'p95': ms(commit_times, 95)},
+        'undo_ms': {'p50': ms(undo_times, 50), 'p95': ms(undo_times, 95)},
+        'redo_ms': {'p50': ms(redo_times, 50), 'p95': ms(redo_times, 95)},
+        'mismatches': mismatches,
+        'per_step': per_step,
+    }
+
+
+def print_report(result):
+    """打印结果"""
+    width, height = result['size']
+    store = result['store']
+    print("🕘 历史记录存储基准测试")
+    print("=" * 60)
+    trace = '，'.join(f'{name} {count}' for name, count in result['trace'].items())
+    print(f"图片 {width}x{height}，{result['steps']} 步（{trace}）")
+    print(f"块 {result['tile_size']}px，每 {result['keyframe_interval']} 步一个关键帧，"
+          f"上限 {result['memory_limit'] / (1 << 20):.0f} MB")
+    print(f"\n📦 整幅快照: {result['snapshot_bytes'] / (1 << 20):.1f} MB"
+          f"（每步 {result['bytes_per_step']['snapshot'] / 1024:.0f} KB）")
+    print(f"📦 差分存储: {store['bytes'] / (1 << 20):.1f} MB"
+          f"（每步 {result['bytes_per_step']['store'] / 1024:.0f} KB，{store['keyframes']} 个关键帧）")
+    if store['evicted']:
+        print(f"🧹 超出上限淘汰了最早的 {store['evicted']} 步，可撤销 {store['steps'] - 1} 步")
+    for name in ('commit_ms', 'undo_ms', 'redo_ms'):
+        print(f"⏱️ {name[:-3]}: p50 {result[name]['p50']} ms，p95 {result[name]['p95']} ms")
+    if result['mismatches']:
+        print(f"❌ 撤销/重做后有 {result['mismatches']} 步与快照不一致")
+    else:
+        print("✅ 撤销/重做的每一步都与快照一致")
+
+
+def _parse_size(value):
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='差分压缩的撤销/重做历史基准测试')
+    parser.add_argument('--size', type=_parse_size, default=(1920, 1080), help='图片尺寸')
+    parser.add_argument('--steps', type=int, default=100, help='编辑步数')
+    parser.add_argument('--tile', type=int, default=TILE_SIZE, help='块大小（像素）')
+    parser.add_argument('--keyframe', type=int, default=KEYFRAME_INTERVAL, help='关键帧间隔（步）')
+    parser.add_argument('--limit-mb', type=float, default=MEMORY_LIMIT / (1 << 20), help='历史内存上限（MB）')
+    parser.add_argument('--seed', type=int, default=0, help='编辑序列的随机种子')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    if np is None:
+        print("⚠️ 未安装NumPy，跳过历史记录测试（pip install numpy）")
+        return 0
+
+    result = run_benchmark(*args.size, args.steps, args.tile, args.keyframe,
+                           int(args.limit_mb * (1 << 20)), args.seed)
+    if args.json:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(result)
+    return 1 if result['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
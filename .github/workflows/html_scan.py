@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+流式HTML元素查询
+基于 html.parser.HTMLParser 事件，一次前向扫描同时回答所有已注册的元素查询
+（id、标签+class、meta name、script src等），全部查询都有答案后立即停止，
+不构建完整的文档树
+"""
+
+import re
+from html.parser import HTMLParser
+
+import site_cache
+
+# 按空白分隔、需要按单个值匹配的多值属性（与BeautifulSoup一致）
+MULTI_VALUED_ATTRS = ('class', 'rel')
+
+CHUNK_SIZE = 8192
+
+# 内容按原始文本解析的元素
+RAW_TEXT_TAGS = ('script', 'style')
+
+
+class Query:
+    """元素查询
+
+    tag     标签名，None表示任意标签
+    id      元素id
+    class_  元素需要包含的class
+    attrs   属性条件: {属性名: True（存在）| 字符串（等于）| 可调用对象（返回是否匹配）}
+    text    元素文本需要包含的字符串或正则（如 <style> 的内容）
+    find_all  收集所有匹配元素，而不是只找第一个
+    """
+
+    def __init__(self, name, tag=None, id=None, class_=None, attrs=None, text=None, find_all=False):
+        self.name = name
+        self.tag = tag
+        self.attrs = dict(attrs or {})
+        if id is not None:
+            self.attrs['id'] = id
+        if class_ is not None:
+            self.attrs['class'] = class_
+        self.text = re.compile(re.escape(text)) if isinstance(text, str) else text
+        self.find_all = find_all
+
+    def matches_start(self, tag, attrs):
+        if self.tag is not None and tag != self.tag:
+            return False
+        for attr_name, expected in self.attrs.items():
+            value = attrs.get(attr_name)
+            if expected is True:
+                if value is None:
+                    return False
+            elif value is None:
+                return False
+            elif callable(expected):
+                if not expected(value):
+                    return False
+            elif attr_name in MULTI_VALUED_ATTRS:
+                if expected not in value.split():
+                    return False
+            elif value != expected:
+                return False
+        return True
+
+
+class Element:
+    """匹配到的元素"""
+
+    def __init__(self, tag, attrs, line, in_head, index=0, col=0, start_tag=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.line = line
+        self.col = col  # 开始标签在行内的偏移（从0开始）
+        self.in_head = in_head
+        self.index = index  # 在文档所有开始标签中的序号
+        self.start_tag = start_tag  # 开始标签的原始文本
+        self.text = None
+
+    def get(self, name, default=None):
+        return self.attrs.get(name, default)
+
+    def __repr__(self):
+        return f'<Element {self.tag} {self.attrs!r} line={self.line}>'
+
+
+class _Done(Exception):
+    """所有查询都已有答案"""
+
+
+class QueryParser(HTMLParser):
+    """一次扫描回答多个Query的解析器"""
+
+    def __init__(self, queries):
+        super().__init__(convert_charrefs=True)
+        self.queries = list(queries)
+        self.results = {q.name: ([] if q.find_all else None) for q in self.queries}
+        self._open = {q.name for q in self.queries}
+        self._capturing = []  # [query, element, tag, depth, parts]
+        self.in_head = False
+        self.tag_count = 0
+        self.consumed = 0
+        self.stopped_early = False
+
+    # ---- 事件处理 ----
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'head':
+            self.in_head = True
+        elif tag == 'body':
+            self.in_head = False
+
+        self.tag_count += 1
+        for capture in self._capturing:
+            if capture[2] == tag:
+                capture[3] += 1
+
+        if not self._open:
+            return
+        attr_map = {name: (value if value is not None else '') for name, value in attrs}
+        for query in self.queries:
+            if query.name not in self._open or not query.matches_start(tag, attr_map):
+                continue
+            line, col = self.getpos()
+            element = Element(tag, attr_map, line, self.in_head, self.tag_count,
+                              col, self.get_starttag_text())
+            if query.text is not None:
+                self._capturing.append([query, element, tag, 0, []])
+            else:
+                self._found(query, element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self._close_captures(tag)
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.in_head = False
+        self._close_captures(tag)
+
+    def handle_data(self, data):
+        for capture in self._capturing:
+            capture[4].append(data)
+
+    # ---- 内部 ----
+
+    def _close_captures(self, tag):
+        remaining = []
+        finished = []
+        for capture in self._capturing:
+            if capture[2] != tag:
+                remaining.append(capture)
+            elif capture[3] > 0:
+                capture[3] -= 1
+                remaining.append(capture)
+            else:
+                finished.append(capture)
+        self._capturing = remaining
+        for query, element, _, _, parts in finished:
+            element.text = ''.join(parts)
+            if query.name in self._open and query.text.search(element.text):
+                self._found(query, element)
+
+    def _found(self, query, element):
+        if query.find_all:
+            self.results[query.name].append(element)
+            return
+        self.results[query.name] = element
+        self._open.discard(query.name)
+        # find_all查询需要扫描完整文档，不会从_open中移除
+        if not self._open:
+            raise _Done()
+
+    def run(self, chunks):
+        """依次输入文本块，所有查询完成后提前停止；返回结果字典"""
+        try:
+            for chunk in chunks:
+                self.consumed += len(chunk)
+                self.feed(chunk)
+            self.close()
+        except _Done:
+            self.stopped_early = True
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+        return self.results
+
+
+def element_span(text, line_starts, element):
+    """元素在源码中的 (开始, 结束) 偏移；<script>/<style>包括内容和结束标签
+
+    line_starts是每行起始偏移的列表（site_cache.Document.line_starts）
+    """
+    start = line_starts[element.line - 1] + element.col
+    end = start + len(element.start_tag)
+    if element.tag in RAW_TEXT_TAGS:
+        close = text.lower().find(f'</{element.tag}', end)
+        if close != -1:
+            end = text.find('>', close) + 1
+    return start, end
+
+
+def scan_chunks(chunks, queries):
+    """对文本块序列（例如HTTP响应流）执行查询"""
+    return QueryParser(queries).run(chunks)
+
+
+def scan_text(text, queries):
+    """对完整HTML文本执行查询"""
+    return scan_chunks((text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)), queries)
+
+
+def scan_file(path, queries):
+    """流式读取文件并执行查询"""
+    return scan_chunks(site_cache.iter_chunks(path, CHUNK_SIZE), queries)
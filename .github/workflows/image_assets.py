@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+图片衍生资源生成
+收集index.html（图标、og:image/twitter:image）、site.webmanifest和sitemap.xml
+引用的所有位图，从 favicon.svg 和 images/src/ 下的原图生成对应尺寸的文件，
+预览图额外生成WebP/AVIF（本机有编码器时）。用进程池并行处理，按内容哈希跳过
+已是最新的输出，并把实际生成的字节数写入报告
+
+原图放在 images/src/ 下，文件名与引用的图片相同（扩展名可以不同），例如
+images/photo-editor-preview.jpg 对应 images/src/photo-editor-preview.png
+
+用法（在站点根目录下运行）:
+    python3 image_assets.py
+    python3 image_assets.py --force --workers 4
+    python3 image_assets.py --json
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import html_scan
+from result_cache import file_hash
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+CACHE_FILE = os.path.join('.cache', 'image_assets.json')
+REPORT_FILE = 'image-assets.json'
+
+# 生成逻辑变化时递增，让旧的缓存记录失效
+PIPELINE_VERSION = 1
+
+ICON_SOURCE = 'favicon.svg'
+SOURCE_DIR = os.path.join('images', 'src')
+SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.webp')
+
+# favicon.ico 中包含的尺寸
+ICO_SIZES = [16, 32, 48]
+
+# 没有声明尺寸的图片按此上限等比缩小（不放大）
+MAX_DIMENSION = 1600
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+
+IMAGE_NS = '{http://www.google.com/schemas/sitemap-image/1.1}'
+
+SIZES_RE = re.compile(r'(\d+)x(\d+)', re.IGNORECASE)
+
+IMAGE_QUERIES = [
+    html_scan.Query('icons', tag='link', attrs={
+        'rel': lambda rel: bool(set(rel.lower().split()) & {'icon', 'apple-touch-icon'}),
+        'href': True,
+    }, find_all=True),
+    html_scan.Query('manifest', tag='link', attrs={'rel': 'manifest', 'href': True}),
+    html_scan.Query('meta', tag='meta', attrs={'content': True}, find_all=True),
+]
+
+# 社交分享图片及其尺寸声明
+SHARE_IMAGE_META = {
+    'og:image': ('og:image:width', 'og:image:height'),
+    'twitter:image': (None, None),
+}
+
+
+# ---- 收集引用的图片 ----
+
+def _local_path(url, root):
+    """同站URL对应的本地路径（绝对URL只取路径部分，假定是本站资源）"""
+    path = urlparse(url).path.lstrip('/')
+    return os.path.normpath(os.path.join(root, path)) if path else None
+
+
+def _parse_sizes(value):
+    match = SIZES_RE.search(value or '')
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _add_target(targets, root, url, kind, size, referrer):
+    path = _local_path(url, root)
+    if path is None or path.lower().endswith('.svg'):
+        return
+    target = targets.get(path)
+    if target is None:
+        target = targets[path] = {'path': path, 'url': url, 'kind': kind, 'size': size, 'referrers': []}
+    elif size and not target['size']:
+        target['size'] = size
+    if referrer not in target['referrers']:
+        target['referrers'].append(referrer)
+
+
+def collect_targets(html_path='index.html', sitemap_path='sitemap.xml', root='.'):
+    """收集页面、manifest和sitemap引用的全部位图，返回按路径排序的目标列表
+
+    html_path 和 sitemap_path 都相对于站点根目录
+    """
+    targets = {}
+    page = os.path.join(root, html_path)
+    found = html_scan.scan_file(page, IMAGE_QUERIES) if os.path.exists(page) else {
+        'icons': [], 'manifest': None, 'meta': []}
+
+    for element in found['icons']:
+        href = element.get('href')
+        kind = 'ico' if href.lower().endswith('.ico') else 'icon'
+        size = _parse_sizes(element.get('sizes'))
+        _add_target(targets, root, href, kind, size, f'{html_path}:{element.line}')
+
+    meta = {}
+    for element in found['meta']:
+        key = element.get('property') or element.get('name')
+        if key:
+            meta.setdefault(key, element)
+    for key, (width_key, height_key) in SHARE_IMAGE_META.items():
+        element = meta.get(key)
+        if element is None:
+            continue
+        size = None
+        if width_key in meta and height_key in meta:
+            try:
+                size = (int(meta[width_key].get('content')), int(meta[height_key].get('content')))
+            except ValueError:
+                size = None
+        _add_target(targets, root, element.get('content'), 'image', size, f'{html_path}:{element.line}')
+
+    if found['manifest'] is not None:
+        manifest_path = _local_path(found['manifest'].get('href'), root)
+        if manifest_path and os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            for icon in manifest.get('icons', []) + manifest.get('screenshots', []):
+                if icon.get('src'):
+                    kind = 'icon' if icon in manifest.get('icons', []) else 'image'
+                    _add_target(targets, root, icon['src'], kind, _parse_sizes(icon.get('sizes')), manifest_path)
+
+    sitemap = os.path.join(root, sitemap_path)
+    if os.path.exists(sitemap):
+        for _, element in ET.iterparse(sitemap, events=('end',)):
+            if element.tag == IMAGE_NS + 'image':
+                loc = element.find(IMAGE_NS + 'loc')
+                if loc is not None and loc.text:
+                    _add_target(targets, root, loc.text.strip(), 'image', None, sitemap)
+                element.clear()
+
+    return [targets[path] for path in sorted(targets)]
+
+
+def find_source(target, root='.'):
+    """目标对应的原图: 图标都来自favicon.svg，其他图片来自images/src/下的同名文件"""
+    if target['kind'] in ('icon', 'ico'):
+        source = os.path.join(root, ICON_SOURCE)
+        return source if os.path.exists(source) else None
+    stem = os.path.splitext(os.path.basename(target['path']))[0]
+    directory = os.path.join(root, SOURCE_DIR)
+    for ext in SOURCE_EXTENSIONS:
+        for candidate in (stem + ext, stem + ext.upper()):
+            path = os.path.join(directory, candidate)
+            if os.path.exists(path):
+                return path
+    return None
+
+
+# ---- 编码器 ----
+
+def _has_feature(name):
+    try:
+        return bool(features.check(name))
+    except (ValueError, AttributeError):
+        return False
+
+
+def available_formats():
+    """本机Pillow支持写入的现代格式"""
+    if Image is None:
+        return []
+    formats = []
+    if _has_feature('webp'):
+        formats.append('webp')
+    if _has_feature('avif'):
+        formats.append('avif')
+    else:
+        try:
+            import pillow_avif  # noqa: F401  旧版Pillow通过插件支持AVIF
+            formats.append('avif')
+        except ImportError:
+            pass
+    return formats
+
+
+def svg_rasterizer():
+    """可用的SVG栅格化工具: cairosvg模块、rsvg-convert或inkscape，都没有时返回None"""
+    try:
+        import cairosvg  # noqa: F401
+        return 'cairosvg'
+    except ImportError:
+        pass
+    for tool in ('rsvg-convert', 'inkscape'):
+        if shutil.which(tool):
+            return tool
+    return None
+
+
+def rasterize_svg(path, size, tool):
+    """按目标尺寸直接渲染SVG（比渲染大图再缩小更清晰），返回PIL图像"""
+    width, height = size
+    if tool == 'cairosvg':
+        import cairosvg
+        data = cairosvg.svg2png(url=path, output_width=width, output_height=height)
+    elif tool == 'rsvg-convert':
+        data = subprocess.run(['rsvg-convert', '-w', str(width), '-h', str(height), path],
+                              capture_output=True, check=True).stdout
+    else:
+        data = subprocess.run(['inkscape', '--export-type=png', '--export-filename=-',
+                               '-w', str(width), '-h', str(height), path],
+                              capture_output=True, check=True).stdout
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image.convert('RGBA')
+
+
+# ---- 生成 ----
+
+def plan_outputs(target, formats):
+    """目标需要生成的文件: [(路径, 格式)]；预览图额外生成现代格式"""
+    ext = os.path.splitext(target['path'])[1].lower()
+    if target['kind'] == 'ico':
+        return [(target['path'], 'ico')]
+    base = {'.png': 'png', '.jpg': 'jpeg', '.jpeg': 'jpeg', '.webp': 'webp', '.avif': 'avif'}.get(ext)
+    if base is None:
+        return []
+    outputs = [(target['path'], base)]
+    if target['kind'] == 'image':
+        stem = os.path.splitext(target['path'])[0]
+        outputs += [(f'{stem}.{fmt}', fmt) for fmt in formats if fmt != base]
+    return outputs
+
+
+def _fit(image, size):
+    """声明了尺寸时居中裁剪到该尺寸；否则按MAX_DIMENSION等比缩小"""
+    if size:
+        width, height = size
+        scale = max(width / image.width, height / image.height)
+        resized = image.resize((max(width, round(image.width * scale)), max(height, round(image.height * scale))),
+                               Image.LANCZOS)
+        left = (resized.width - width) // 2
+        top = (resized.height - height) // 2
+        return resized.crop((left, top, left + width, top + height))
+    if max(image.size) <= MAX_DIMENSION:
+        return image
+    image = image.copy()
+    image.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.LANCZOS)
+    return image
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.convert('RGBA').split()[-1])
+            image = background
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    elif fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+    elif fmt == 'avif':
+        image.save(buffer, 'AVIF', quality=AVIF_QUALITY)
+    elif fmt == 'ico':
+        image.save(buffer, 'ICO', sizes=[(s, s) for s in ICO_SIZES])
+    return buffer.getvalue()
+
+
+def _write_bytes(path, data):
+    """原子写入，避免中断时留下损坏的图片"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp创建的文件权限是0600，改为普通文件的默认权限以便静态服务器读取
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def render_target(job):
+    """在工作进程中生成一个目标的全部输出，返回每个输出的尺寸和字节数"""
+    target, source, outputs, tool = job['target'], job['source'], job['outputs'], job['svg_tool']
+    size = target['size']
+    if source.lower().endswith('.svg'):
+        if target['kind'] == 'ico':
+            size = (max(ICO_SIZES), max(ICO_SIZES))
+        elif size is None:
+            raise ValueError(f'{target["path"]} 没有声明尺寸，无法确定SVG渲染大小')
+        image = rasterize_svg(source, size, tool)
+    else:
+        with Image.open(source) as original:
+            original.load()
+            image = original.convert('RGBA' if original.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        image = _fit(image, size)
+
+    results = []
+    for path, fmt in outputs:
+        data = _encode(image, fmt)
+        _write_bytes(path, data)
+        results.append({
+            'path': path,
+            'format': fmt,
+            'width': image.width,
+            'height': image.height,
+            'bytes': len(data),
+            'hash': hashlib.sha256(data).hexdigest(),
+        })
+    return results
+
+
+# ---- 缓存 ----
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return cache if cache.get('version') == PIPELINE_VERSION else {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    cache['version'] = PIPELINE_VERSION
+    _write_bytes(path, (json.dumps(cache, ensure_ascii=False, indent=2) + '\n').encode('utf-8'))
+
+
+def _job_key(target, source, outputs):
+    spec = json.dumps([PIPELINE_VERSION, target['size'], outputs, ICO_SIZES, MAX_DIMENSION,
+                       JPEG_QUALITY, WEBP_QUALITY, AVIF_QUALITY])
+    return hashlib.sha256((file_hash(source) + spec).encode('utf-8')).hexdigest()
+
+
+def _up_to_date(entry, key):
+    """原图、参数都没变，且输出文件仍是上次生成的内容"""
+    if entry is None or entry['key'] != key:
+        return False
+    return all(file_hash(output['path']) == output['hash'] for output in entry['outputs'])
+
+
+# ---- 主流程 ----
+
+def generate(html_path='index.html', sitemap_path='sitemap.xml', root='.', workers=None, force=False):
+    """生成全部图片，返回报告"""
+    targets = collect_targets(html_path, sitemap_path, root)
+    formats = available_formats()
+    tool = svg_rasterizer()
+    cache = load_cache(os.path.join(root, CACHE_FILE))
+    entries = cache.setdefault('targets', {})
+
+    report = {'formats': formats, 'svg_rasterizer': tool, 'targets': []}
+    jobs = {}
+    for target in targets:
+        item = dict(target, source=find_source(target, root), source_bytes=None,
+                    status=None, error=None, outputs=[])
+        report['targets'].append(item)
+        if item['source'] is None:
+            item['status'] = 'missing-source'
+            continue
+        item['source_bytes'] = os.path.getsize(item['source'])
+        outputs = plan_outputs(target, formats)
+        if not outputs:
+            item['status'] = 'unsupported'
+            continue
+        if item['source'].lower().endswith('.svg') and tool is None:
+            item['status'] = 'no-rasterizer'
+            continue
+        key = _job_key(target, item['source'], outputs)
+        entry = entries.get(target['path'])
+        if not force and _up_to_date(entry, key):
+            item['status'] = 'unchanged'
+            item['outputs'] = entry['outputs']
+            continue
+        jobs[target['path']] = (item, key, {'target': target, 'source': item['source'],
+                                            'outputs': outputs, 'svg_tool': tool})
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(render_target, job): path for path, (_, _, job) in jobs.items()}
+            for future in as_completed(futures):
+                item, key, _ = jobs[futures[future]]
+                try:
+                    item['outputs'] = future.result()
+                except Exception as e:
+                    item['status'] = 'failed'
+                    item['error'] = f'{type(e).__name__}: {e}'
+                    entries.pop(item['path'], None)
+                    continue
+                item['status'] = 'generated'
+                entries[item['path']] = {'key': key, 'outputs': item['outputs']}
+
+    save_cache(cache, os.path.join(root, CACHE_FILE))
+    return report
+
+
+STATUS_MESSAGES = {
+    'generated': '✅ 已生成',
+    'unchanged': '⏭️ 已是最新',
+    'missing-source': '❌ 找不到原图',
+    'no-rasterizer': '⚠️ 没有SVG栅格化工具（cairosvg、rsvg-convert或inkscape）',
+    'unsupported': '⚠️ 不支持的图片格式',
+    'failed': '💥 生成失败',
+}
+
+
+def print_report(report):
+    """打印结果"""
+    print("🖼️ 图片衍生资源")
+    print("=" * 60)
+    formats = ', '.join(report['formats']) or '无'
+    print(f"🔧 现代格式编码器: {formats}；SVG栅格化: {report['svg_rasterizer'] or '无'}")
+
+    for item in report['targets']:
+        size = 'x'.join(map(str, item['size'])) if item['size'] else '原始比例'
+        print(f"\n{STATUS_MESSAGES[item['status']]} {item['url']} ({size})")
+        if item['source']:
+            print(f"  原图: {item['source']} ({item['source_bytes']} 字节)")
+        else:
+            expected = ICON_SOURCE if item['kind'] in ('icon', 'ico') else os.path.join(SOURCE_DIR, '<同名文件>')
+            print(f"  需要原图: {expected}")
+        for output in item['outputs']:
+            print(f"  • {output['path']}  {output['width']}x{output['height']}  {output['bytes']} 字节")
+        if item['error']:
+            print(f"  {item['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成页面、manifest和sitemap引用的图标与图片')
+    parser.add_argument('--html', default='index.html', help='页面文件（相对于站点根目录）')
+    parser.add_argument('--sitemap', default='sitemap.xml', help='sitemap文件（相对于站点根目录）')
+    parser.add_argument('--root', default='.', help='站点根目录')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='进程数（默认CPU核数）')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，全部重新生成')
+    parser.add_argument('--report', default=REPORT_FILE, help='报告文件（相对于站点根目录）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    if Image is None:
+        print("⚠️ 未安装Pillow，跳过图片生成（pip install Pillow）")
+        for target in collect_targets(args.html, args.sitemap, args.root):
+            state = '✅' if os.path.exists(target['path']) else '❌'
+            print(f"  {state} {target['url']}")
+        return 0
+
+    report = generate(args.html, args.sitemap, args.root, args.workers, args.force)
+    with open(os.path.join(args.root, args.report), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(report)
+
+    failed = any(item['status'] in ('missing-source', 'failed', 'no-rasterizer') for item in report['targets'])
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+滤镜参考实现
+用NumPy对整幅图像做向量化处理，实现编辑器的亮度、对比度、饱和度、灰度、
+怀旧（sepia）、模糊和锐化。颜色类滤镜使用CSS Filter Effects规范中的矩阵
+（与canvas的 ctx.filter 一致），模糊按规范用三次盒式模糊近似高斯（σ < 2时用
+精确的高斯核），卷积都拆分为水平、垂直两次一维运算
+
+附带金样图比对: golden/filters/cases.json 列出输入图、滤镜和浏览器导出的PNG，
+逐个计算最大像素差和PSNR
+
+cases.json 格式:
+    [{"name": "brightness", "input": "input.png", "filter": "brightness(1.2)",
+      "expected": "brightness.png", "max_diff": 2, "min_psnr": 40}]
+
+浏览器导出方法: ctx.filter = '<filter>'; ctx.drawImage(img, 0, 0); canvas.toBlob(...)
+
+用法（在站点根目录下运行）:
+    python3 image_filters.py                     # 运行金样图比对
+    python3 image_filters.py --manifest path/to/cases.json
+    python3 image_filters.py --bench --size 1920x1080
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+GOLDEN_MANIFEST = os.path.join('golden', 'filters', 'cases.json')
+
+# 金样图比对的默认容差（各浏览器的舍入方式略有不同）
+DEFAULT_MAX_DIFF = 3
+DEFAULT_MIN_PSNR = 40.0
+
+# 锐化（反锐化掩模）使用的模糊半径
+SHARPEN_RADIUS = 1.0
+
+# 基准测试使用的滤镜
+BENCH_FILTERS = [
+    'brightness(1.2)',
+    'contrast(1.3)',
+    'saturate(1.5)',
+    'grayscale(1)',
+    'sepia(0.8)',
+    'blur(1px)',
+    'blur(8px)',
+    'sharpen(1)',
+]
+
+FILTER_RE = re.compile(r'([a-z-]+)\(\s*([^)]*?)\s*\)', re.IGNORECASE)
+
+
+# ---- 参数解析 ----
+
+def _parse_amount(name, value):
+    """解析滤镜参数: 百分比、px或纯数字"""
+    value = value.strip().lower()
+    if not value:
+        return 0.0 if name == 'blur' else 1.0
+    if value.endswith('%'):
+        return float(value[:-1]) / 100
+    if value.endswith('px'):
+        return float(value[:-2])
+    return float(value)
+
+
+def parse_filter(text):
+    """把CSS filter字符串解析为 [(名称, 参数)]，名称统一为小写"""
+    filters = []
+    pos = 0
+    text = text.strip()
+    if text in ('', 'none'):
+        return filters
+    for match in FILTER_RE.finditer(text):
+        if text[pos:match.start()].strip():
+            raise ValueError(f'无法解析的滤镜: {text[pos:match.start()].strip()}')
+        name = match.group(1).lower()
+        if name not in FILTERS:
+            raise ValueError(f'不支持的滤镜: {name}')
+        filters.append((name, _parse_amount(name, match.group(2))))
+        pos = match.end()
+    if text[pos:].strip():
+        raise ValueError(f'无法解析的滤镜: {text[pos:].strip()}')
+    return filters
+
+
+# ---- 颜色类滤镜 ----
+
+def _linear(rgb, slope, intercept=0.0):
+    rgb *= slope
+    if intercept:
+        rgb += intercept
+    return rgb
+
+
+def brightness(rgb, amount):
+    """brightness(): 各通道乘以amount"""
+    return _linear(rgb, amount)
+
+
+def contrast(rgb, amount):
+    """contrast(): 以0.5为中心拉伸"""
+    return _linear(rgb, amount, 0.5 - 0.5 * amount)
+
+
+def _color_matrix(rgb, matrix):
+    """对 (H, W, 3) 的颜色应用3×3矩阵"""
+    return rgb @ np.asarray(matrix, dtype=np.float32).T
+
+
+def saturate(rgb, amount):
+    """saturate(): 规范中的饱和度矩阵，amount=0为灰度"""
+    s = amount
+    return _color_matrix(rgb, [
+        [0.213 + 0.787 * s, 0.715 - 0.715 * s, 0.072 - 0.072 * s],
+        [0.213 - 0.213 * s, 0.715 + 0.285 * s, 0.072 - 0.072 * s],
+        [0.213 - 0.213 * s, 0.715 - 0.715 * s, 0.072 + 0.928 * s],
+    ])
+
+
+def grayscale(rgb, amount):
+    """grayscale(): amount在0到1之间"""
+    a = 1 - min(max(amount, 0.0), 1.0)
+    return _color_matrix(rgb, [
+        [0.2126 + 0.7874 * a, 0.7152 - 0.7152 * a, 0.0722 - 0.0722 * a],
+        [0.2126 - 0.2126 * a, 0.7152 + 0.2848 * a, 0.0722 - 0.0722 * a],
+        [0.2126 - 0.2126 * a, 0.7152 - 0.7152 * a, 0.0722 + 0.9278 * a],
+    ])
+
+
+def sepia(rgb, amount):
+    """sepia(): amount在0到1之间"""
+    a = 1 - min(max(amount, 0.0), 1.0)
+    return _color_matrix(rgb, [
+        [0.393 + 0.607 * a, 0.769 - 0.769 * a, 0.189 - 0.189 * a],
+        [0.349 - 0.349 * a, 0.686 + 0.314 * a, 0.168 - 0.168 * a],
+        [0.272 - 0.272 * a, 0.534 - 0.534 * a, 0.131 + 0.869 * a],
+    ])
+
+
+# ---- 卷积类滤镜 ----
+
+def _box_blur_axis(pixels, axis, before, after, edge):
+    """沿axis做盒式模糊，窗口为 [x - before, x + after]，用累加和实现（与窗口大小无关）"""
+    size = before + after + 1
+    pad = [(0, 0)] * pixels.ndim
+    pad[axis] = (before + 1, after)
+    if edge == 'clamp':
+        padded = np.pad(pixels, pad, mode='edge')
+        # 第一个元素只用于累加和差分，置零
+        index = [slice(None)] * pixels.ndim
+        index[axis] = slice(0, 1)
+        padded[tuple(index)] = 0
+    else:
+        padded = np.pad(pixels, pad)
+    total = np.cumsum(padded, axis=axis, dtype=np.float64)
+    n = pixels.shape[axis]
+    upper = [slice(None)] * pixels.ndim
+    lower = [slice(None)] * pixels.ndim
+    upper[axis] = slice(size, size + n)
+    lower[axis] = slice(0, n)
+    return ((total[tuple(upper)] - total[tuple(lower)]) / size).astype(np.float32)
+
+
+def _gaussian_axis(pixels, axis, sigma, edge):
+    """σ较小时的精确高斯核卷积（按核的抽头循环，而不是按像素）"""
+    radius = max(1, int(math.ceil(sigma * 3)))
+    taps = np.arange(-radius, radius + 1, dtype=np.float64)
+    kernel = np.exp(-taps * taps / (2 * sigma * sigma))
+    kernel /= kernel.sum()
+    pad = [(0, 0)] * pixels.ndim
+    pad[axis] = (radius, radius)
+    padded = np.pad(pixels, pad, mode='edge' if edge == 'clamp' else 'constant')
+    out = np.zeros_like(pixels)
+    n = pixels.shape[axis]
+    index = [slice(None)] * pixels.ndim
+    for i, weight in enumerate(kernel):
+        index[axis] = slice(i, i + n)
+        out += np.float32(weight) * padded[tuple(index)]
+    return out
+
+
+def _blur_axis(pixels, axis, sigma, edge):
+    if sigma < 2.0:
+        return _gaussian_axis(pixels, axis, sigma, edge)
+    # 规范: 三次盒式模糊，d = floor(σ·3·√(2π)/4 + 0.5)
+    d = int(math.floor(sigma * 3 * math.sqrt(2 * math.pi) / 4 + 0.5))
+    if d % 2:
+        half = d // 2
+        for _ in range(3):
+            pixels = _box_blur_axis(pixels, axis, half, half, edge)
+        return pixels
+    # d为偶数: 两次大小为d的盒（中心分别偏左、偏右半个像素），再一次大小为d+1的居中盒
+    half = d // 2
+    pixels = _box_blur_axis(pixels, axis, half, half - 1, edge)
+    pixels = _box_blur_axis(pixels, axis, half - 1, half, edge)
+    return _box_blur_axis(pixels, axis, half, half, edge)
+
+
+def gaussian_blur(rgba, sigma, edge='transparent'):
+    """对预乘alpha的RGBA做可分离的高斯模糊
+
+    edge='transparent' 与CSS一致（画布外视为透明），'clamp' 则重复边缘像素
+    """
+    if sigma <= 0:
+        return rgba
+    premultiplied = rgba.copy()
+    premultiplied[:, :, :3] *= premultiplied[:, :, 3:4]
+    blurred = _blur_axis(_blur_axis(premultiplied, 1, sigma, edge), 0, sigma, edge)
+    alpha = blurred[:, :, 3:4]
+    np.divide(blurred[:, :, :3], alpha, out=blurred[:, :, :3], where=alpha > 0)
+    return blurred
+
+
+def sharpen(rgba, amount, radius=SHARPEN_RADIUS):
+    """反锐化掩模: 原图 + amount × (原图 - 模糊图)，模糊时重复边缘避免暗边"""
+    if amount <= 0:
+        return rgba
+    blurred = gaussian_blur(rgba, radius, edge='clamp')
+    out = rgba.copy()
+    out[:, :, :3] += amount * (rgba[:, :, :3] - blurred[:, :, :3])
+    return out
+
+
+# 名称: (类型, 函数)；color类只作用于RGB，rgba类作用于整个RGBA
+FILTERS = {
+    'brightness': ('color', brightness),
+    'contrast': ('color', contrast),
+    'saturate': ('color', saturate),
+    'grayscale': ('color', grayscale),
+    'sepia': ('color', sepia),
+    'blur': ('rgba', gaussian_blur),
+    'sharpen': ('rgba', sharpen),
+}
+
+# 编辑器菜单名称到CSS函数名
+FILTERS['saturation'] = FILTERS['saturate']
+
+
+def apply_filters(pixels, filters):
+    """依次应用滤镜，输入输出都是 (H, W, 4) 的uint8 RGBA
+
+    filters 可以是CSS filter字符串或 [(名称, 参数)] 列表
+    """
+    if isinstance(filters, str):
+        filters = parse_filter(filters)
+    rgba = pixels.astype(np.float32)
+    rgba *= np.float32(1 / 255)
+    for name, amount in filters:
+        kind, func = FILTERS[name]
+        if kind == 'color':
+            rgba[:, :, :3] = func(rgba[:, :, :3], amount)
+        else:
+            rgba = func(rgba, amount)
+        # 规范要求每个滤镜的结果都限制在[0, 1]
+        np.clip(rgba, 0, 1, out=rgba)
+    rgba *= 255
+    rgba += 0.5
+    return rgba.astype(np.uint8)
+
+
+# ---- 金样图比对 ----
+
+def load_png(path):
+    with Image.open(path) as image:
+        return np.asarray(image.convert('RGBA'))
+
+
+def compare(actual, expected):
+    """返回 (最大像素差, PSNR)；完全相同时PSNR为None"""
+    diff = actual.astype(np.int16) - expected.astype(np.int16)
+    max_diff = int(np.abs(diff).max()) if diff.size else 0
+    mse = float(np.mean(diff.astype(np.float32) ** 2))
+    return max_diff, (None if mse == 0 else round(10 * math.log10(255 * 255 / mse), 2))
+
+
+def run_golden(manifest=GOLDEN_MANIFEST):
+    """运行cases.json中的全部用例，返回逐个结果"""
+    with open(manifest, encoding='utf-8') as f:
+        cases = json.load(f)
+    base = os.path.dirname(manifest)
+    results = []
+    for case in cases:
+        result = {'name': case['name'], 'filter': case['filter'], 'passed': False,
+                  'max_diff': None, 'psnr': None, 'ms': None, 'error': None}
+        results.append(result)
+        try:
+            source = load_png(os.path.join(base, case['input']))
+            expected = load_png(os.path.join(base, case['expected']))
+            start = time.perf_counter()
+            actual = apply_filters(source, case['filter'])
+            result['ms'] = round((time.perf_counter() - start) * 1000, 3)
+        except (OSError, ValueError) as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+            continue
+        if actual.shape != expected.shape:
+            result['error'] = f'尺寸不一致: {actual.shape[1]}x{actual.shape[0]} / {expected.shape[1]}x{expected.shape[0]}'
+            continue
+        result['max_diff'], result['psnr'] = compare(actual, expected)
+        result['passed'] = (result['max_diff'] <= case.get('max_diff', DEFAULT_MAX_DIFF)
+                            and (result['psnr'] is None or result['psnr'] >= case.get('min_psnr', DEFAULT_MIN_PSNR)))
+    return results
+
+
+def print_golden(results):
+    """打印比对结果"""
+    print("🎨 滤镜金样图比对")
+    print("=" * 60)
+    for result in results:
+        icon = '✅' if result['passed'] else '❌'
+        if result['error']:
+            print(f"{icon} {result['name']} ({result['filter']}): {result['error']}")
+            continue
+        quality = '完全一致' if result['psnr'] is None else f"PSNR {result['psnr']:.1f} dB"
+        print(f"{icon} {result['name']} ({result['filter']}): 最大差 {result['max_diff']}，{quality}，{result['ms']:.1f} ms")
+    passed = sum(1 for r in results if r['passed'])
+    print(f"\n📊 {passed}/{len(results)} 个用例通过")
+
+
+# ---- 基准测试 ----
+
+def make_test_image(width, height, seed=0):
+    """带噪声的渐变测试图"""
+    rng = np.random.default_rng(seed)
+    pixels = np.empty((height, width, 4), dtype=np.uint8)
+    pixels[:, :, 0] = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    pixels[:, :, 1] = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    pixels[:, :, 2] = rng.integers(0, 256, (height, width), dtype=np.uint8)
+    pixels[:, :, 3] = 255
+    return pixels
+
+
+def run_bench(width, height, repeat=3, filters=BENCH_FILTERS):
+    """返回每个滤镜的中位耗时和吞吐量（百万像素/秒）"""
+    pixels = make_test_image(width, height)
+    megapixels = width * height / 1e6
+    results = []
+    for text in filters:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            apply_filters(pixels, text)
+            times.append(time.perf_counter() - start)
+        median = sorted(times)[len(times) // 2]
+        results.append({'filter': text, 'ms': round(median * 1000, 3),
+                        'mpx_per_s': round(megapixels / median, 2)})
+    return results
+
+
+def print_bench(results, width, height):
+    print(f"⏱️ 滤镜基准测试 {width}x{height}")
+    print("=" * 60)
+    name_width = max(len(r['filter']) for r in results)
+    for result in results:
+        print(f"  {result['filter'].ljust(name_width)}  {result['ms']:9.2f} ms  {result['mpx_per_s']:8.2f} MP/s")
+
+
+def _parse_size(value):
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='滤镜参考实现：金样图比对和基准测试')
+    parser.add_argument('--manifest', default=GOLDEN_MANIFEST, help='金样图用例文件')
+    parser.add_argument('--bench', action='store_true', help='运行基准测试而不是金样图比对')
+    parser.add_argument('--size', type=_parse_size, default=(1920, 1080), help='基准测试图片尺寸')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='基准测试每个滤镜的计时次数')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    if np is None:
+        print("⚠️ 未安装NumPy，跳过滤镜检查（pip install numpy）")
+        return 0
+
+    if args.bench:
+        results = run_bench(*args.size, repeat=args.repeat)
+        if args.json:
+            json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        else:
+            print_bench(results, *args.size)
+        return 0
+
+    if Image is None:
+        print("⚠️ 未安装Pillow，无法读取金样图（pip install Pillow）")
+        return 0
+    if not os.path.exists(args.manifest):
+        print(f"⚠️ 没有找到 {args.manifest}，请先从浏览器导出金样图（见本文件开头的说明）")
+        return 0
+
+    results = run_golden(args.manifest)
+    if args.json:
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_golden(results)
+    return 0 if all(r['passed'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+JavaScript结构索引
+用 js_tokens 把JS文件扫描一遍，建立符号表: 类、方法、函数、调用、事件监听、
+赋值和字符串字面量，都带行列号。检查脚本通过字典查找判断代码结构，
+不再对全文做子串搜索，也不受空白和换行格式的影响
+
+索引按文件内容哈希保存在 .cache/js_index.json，文件不变时直接复用
+
+用法（在站点根目录下运行）:
+    python3 js_index.py js/main.js
+    python3 js_index.py js/main.js --json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+
+import js_tokens
+import site_cache
+
+CACHE_FILE = os.path.join('.cache', 'js_index.json')
+
+# 索引结构变化时递增，让旧的缓存失效
+INDEX_VERSION = 2
+
+# 后面跟 ( 但不是函数调用的关键字
+NOT_CALLS = {
+    'if', 'for', 'while', 'switch', 'catch', 'function', 'return', 'typeof',
+    'with', 'do', 'else', 'new', 'await', 'yield', 'void', 'delete', 'in', 'of',
+    'super', 'import',
+}
+
+# 类体中方法名前可能出现的修饰词
+METHOD_MODIFIERS = {'static', 'async', 'get', 'set'}
+
+# 赋值右侧在深度0遇到这些符号时结束
+VALUE_TERMINATORS = {';', ','}
+
+# 行首或行尾出现这些符号时，表达式延续到下一行
+CONTINUATIONS = {
+    '.', '?.', '(', '[', '{', ',', '=', '+', '-', '*', '/', '%', '?', ':',
+    '&&', '||', '??', '=>', '==', '===', '!=', '!==', '<', '>', '<=', '>=',
+}
+
+
+class JSIndex:
+    """一个JS文件的符号表
+
+    tables中每个表都是 名称 -> 出现位置列表，位置为包含line/col的字典:
+      classes      类名
+      methods      '类名.方法名'，附带params
+      functions    函数声明名
+      calls        被调用的名称（obj.foo() 记为 foo），附带receiver
+      listeners    addEventListener的事件名，附带target
+      assignments  赋值目标（如 'this.canvas.width'），附带value
+      strings      字符串字面量内容
+    调用、监听和赋值附带所在的函数或方法名（in）
+    """
+
+    TABLES = ('classes', 'methods', 'functions', 'calls', 'listeners', 'assignments', 'strings')
+
+    def __init__(self, tables):
+        self.tables = tables
+        # 方法名 -> ['类名.方法名', ...]
+        self._members = {}
+        for qualified in tables['methods']:
+            self._members.setdefault(qualified.rsplit('.', 1)[1], []).append(qualified)
+
+    def has_class(self, name):
+        return name in self.tables['classes']
+
+    def method(self, name, cls=None):
+        """方法定义的位置；cls为None时在所有类中查找，未找到返回None"""
+        if cls is not None:
+            found = self.tables['methods'].get(f'{cls}.{name}')
+            return found[0] if found else None
+        for qualified in self._members.get(name, ()):
+            return self.tables['methods'][qualified][0]
+        return None
+
+    def has_method(self, name, cls=None, params=None):
+        """是否定义了该方法；给出params时还要求参数列表一致"""
+        found = self.method(name, cls)
+        return found is not None and (params is None or found['params'] == list(params))
+
+    def defines(self, name):
+        """是否有同名的方法或函数声明"""
+        return name in self._members or name in self.tables['functions']
+
+    def calls(self, name):
+        return self.tables['calls'].get(name, [])
+
+    def listeners(self, event):
+        return self.tables['listeners'].get(event, [])
+
+    def assignments(self, target):
+        return self.tables['assignments'].get(target, [])
+
+    def assigns(self, target, value):
+        """target是否被赋值为value（值按词法单元比较，忽略空白差异）"""
+        value = _normalize(value)
+        return any(a['value'] == value for a in self.assignments(target))
+
+    def strings_containing(self, fragment):
+        """包含fragment的字符串字面量及其位置: [(内容, 位置), ...]"""
+        return [(text, places[0]) for text, places in self.tables['strings'].items() if fragment in text]
+
+
+# ---- 构建索引 ----
+
+def _place(token, **extra):
+    return dict(line=token.line, col=token.col, **extra)
+
+
+def _normalize(text):
+    return re.sub(r'\s+', ' ', text.strip())
+
+
+def _receiver(tokens, i):
+    """tokens[i]之前的成员访问链，如 this.fileInput.addEventListener 中的 'this.fileInput'"""
+    parts = []
+    j = i - 1
+    while j >= 1 and tokens[j].value in ('.', '?.') and tokens[j - 1].type == js_tokens.NAME:
+        parts.append(tokens[j - 1].value)
+        j -= 2
+    return '.'.join(reversed(parts)), j + 1
+
+
+def _matching(tokens, index):
+    """tokens[index]处的 ( 对应的 ) 的下标"""
+    depth = 0
+    for j in range(index, len(tokens)):
+        if tokens[j].type != js_tokens.PUNCT:
+            continue
+        if tokens[j].value in ('(', '[', '{'):
+            depth += 1
+        elif tokens[j].value in (')', ']', '}'):
+            depth -= 1
+            if depth == 0:
+                return j
+    return None
+
+
+def _params(tokens, open_index, close_index):
+    """形参名（解构和默认值只取顶层的名称）"""
+    params = []
+    depth = 0
+    expect_name = True
+    for token in tokens[open_index + 1:close_index]:
+        if token.value in ('(', '[', '{'):
+            depth += 1
+        elif token.value in (')', ']', '}'):
+            depth -= 1
+        elif depth == 0 and token.value == ',':
+            expect_name = True
+        elif depth == 0 and expect_name and token.type == js_tokens.NAME:
+            params.append(token.value)
+            expect_name = False
+    return params
+
+
+def _statement_ends(prev, token):
+    """换行处的自动分号: 前一行不以运算符结尾，下一行也不以运算符开头"""
+    return token.line > prev.line and prev.value not in CONTINUATIONS and token.value not in CONTINUATIONS
+
+
+def _value_text(source, tokens, start):
+    """赋值右侧的源码（到语句结束为止）"""
+    depth = 0
+    end = start
+    for j in range(start, len(tokens)):
+        token = tokens[j]
+        if token.value in ('(', '[', '{'):
+            depth += 1
+        elif token.value in (')', ']', '}'):
+            if depth == 0:
+                break
+            depth -= 1
+        elif depth == 0 and j > start and (token.value in VALUE_TERMINATORS
+                                           or _statement_ends(tokens[j - 1], token)):
+            break
+        end = j
+    last = tokens[end]
+    return _normalize(source[tokens[start].offset:last.offset + len(last.value)])
+
+
+def build_index(source):
+    """扫描源码，返回JSIndex"""
+    tokens = js_tokens.significant_tokens(source)
+    tables = {name: {} for name in JSIndex.TABLES}
+
+    def add(table, name, entry):
+        tables[table].setdefault(name, []).append(entry)
+
+    # 花括号栈: (类型, 名称)，类型为 'class'、'function' 或 'block'
+    scopes = []
+    # 函数体 { 的下标 -> 作用域（参数中的解构 { 不算）
+    body_scopes = {}
+    pending_class = None
+
+    def current_function():
+        for kind, name in reversed(scopes):
+            if kind == 'function':
+                return name
+        return None
+
+    for i, token in enumerate(tokens):
+        value = token.value
+        prev = tokens[i - 1] if i else None
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+
+        if token.type == js_tokens.PUNCT:
+            if value == '{':
+                if i in body_scopes:
+                    scopes.append(body_scopes.pop(i))
+                elif pending_class is not None:
+                    scopes.append(pending_class)
+                    pending_class = None
+                else:
+                    scopes.append(('block', None))
+            elif value == '}' and scopes:
+                scopes.pop()
+            continue
+
+        if token.type in (js_tokens.STRING, js_tokens.TEMPLATE):
+            add('strings', value[1:-1], _place(token))
+            continue
+
+        if token.type != js_tokens.NAME:
+            continue
+
+        in_class = bool(scopes) and scopes[-1][0] == 'class'
+        is_member = prev is not None and prev.value in ('.', '?.')
+
+        if value == 'class' and not is_member and following is not None and following.type == js_tokens.NAME \
+                and following.value != 'extends':
+            add('classes', following.value, _place(following))
+            pending_class = ('class', following.value)
+            continue
+
+        if value == 'function' and following is not None and following.type == js_tokens.NAME:
+            close = _matching(tokens, i + 2) if i + 2 < len(tokens) and tokens[i + 2].value == '(' else None
+            if close is not None:
+                add('functions', following.value, _place(following, params=_params(tokens, i + 2, close)))
+                body_scopes[close + 1] = ('function', following.value)
+            continue
+
+        if following is None or following.value != '(':
+            # 赋值: a.b.c = ...（== 和 => 是单独的词法单元，不会误判）
+            if following is not None and following.value in ('=', '.') and not is_member:
+                target = value
+                j = i + 1
+                while j + 1 < len(tokens) and tokens[j].value == '.' and tokens[j + 1].type == js_tokens.NAME:
+                    target += '.' + tokens[j + 1].value
+                    j += 2
+                if j + 1 < len(tokens) and tokens[j].value == '=':
+                    add('assignments', target, _place(token, value=_value_text(source, tokens, j + 1),
+                                                      **{'in': current_function()}))
+            continue
+
+        # NAME后面跟 (
+        close = _matching(tokens, i + 1)
+        if in_class and not is_member and close is not None and close + 1 < len(tokens) \
+                and tokens[close + 1].value == '{' and (prev is None or prev.value in ('{', '}', ';', '*')
+                                                       or prev.value in METHOD_MODIFIERS
+                                                       or _statement_ends(prev, token)):
+            # 前一行是不带分号的类字段（ready = true）时，换行处的自动分号同样结束了上一条成员
+            qualified = f'{scopes[-1][1]}.{value}'
+            add('methods', qualified, _place(token, params=_params(tokens, i + 1, close)))
+            body_scopes[close + 1] = ('function', qualified)
+            continue
+
+        if value in NOT_CALLS and not is_member:
+            continue
+        receiver, _ = _receiver(tokens, i)
+        entry = _place(token, receiver=receiver, **{'in': current_function()})
+        add('calls', value, entry)
+        if value == 'addEventListener' and following is not None and i + 2 < len(tokens) \
+                and tokens[i + 2].type == js_tokens.STRING:
+            add('listeners', tokens[i + 2].value[1:-1],
+                _place(token, target=receiver, **{'in': current_function()}))
+
+    return JSIndex(tables)
+
+
+# ---- 缓存 ----
+
+_lock = threading.Lock()
+# 绝对路径 -> (site_cache.Document, JSIndex)
+_loaded = {}
+_store = None
+
+
+def _load_store(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            store = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return store if store.get('version') == INDEX_VERSION else {}
+
+
+def _save_store(store, path):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    store['version'] = INDEX_VERSION
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.js_index.')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(store, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load(path, cache_path=CACHE_FILE):
+    """返回path的JSIndex；进程内按文档缓存，跨进程按内容哈希复用 .cache 中的索引"""
+    global _store
+    doc = site_cache.load(path)
+    with _lock:
+        loaded = _loaded.get(doc.path)
+        if loaded is not None and loaded[0] is doc:
+            return loaded[1]
+        if _store is None:
+            _store = _load_store(cache_path)
+        files = _store.setdefault('files', {})
+        digest = hashlib.sha256(doc.text.encode('utf-8')).hexdigest()
+        entry = files.get(doc.path)
+        if entry is not None and entry['hash'] == digest:
+            index = JSIndex(entry['tables'])
+        else:
+            index = build_index(doc.text)
+            files[doc.path] = {'hash': digest, 'tables': index.tables}
+            _save_store(_store, cache_path)
+        _loaded[doc.path] = (doc, index)
+        return index
+
+
+def print_summary(path, index):
+    """打印符号表概要"""
+    tables = index.tables
+    print(f"📇 {path}")
+    for cls, places in tables['classes'].items():
+        print(f"  🏷️ class {cls} (第{places[0]['line']}行)")
+        for qualified, method_places in tables['methods'].items():
+            if qualified.startswith(cls + '.'):
+                place = method_places[0]
+                print(f"     • {qualified.split('.', 1)[1]}({', '.join(place['params'])}) 第{place['line']}行")
+    for name, places in tables['functions'].items():
+        print(f"  🔧 function {name}({', '.join(places[0]['params'])}) 第{places[0]['line']}行")
+    for event, places in tables['listeners'].items():
+        targets = ', '.join(sorted({p['target'] or '(global)' for p in places}))
+        print(f"  👂 {event}: {targets}")
+    print(f"  📊 调用 {sum(map(len, tables['calls'].values()))} 处，"
+          f"赋值 {sum(map(len, tables['assignments'].values()))} 处，"
+          f"字符串 {len(tables['strings'])} 个")
+
+
+# 格式自检: (说明, 源码, [(类, 方法, 参数)])，同一个类在不同写法下都必须识别出这些方法
+FORMATTING_CASES = [
+    ('字段带分号', 'class PhotoEditor {\n  ready = true;\n  loadImage(file) {\n  }\n}',
+     [('PhotoEditor', 'loadImage', ['file'])]),
+    ('字段不带分号', 'class PhotoEditor {\n  ready = true\n  loadImage(file) {\n  }\n}',
+     [('PhotoEditor', 'loadImage', ['file'])]),
+    ('静态字段后的构造函数', 'class PhotoEditor {\n  static count = 0\n  constructor() {\n  }\n'
+     '  init() { this.loadImage(null) }\n}',
+     [('PhotoEditor', 'constructor', []), ('PhotoEditor', 'init', [])]),
+    ('方法写在一行', 'class PhotoEditor { init() {} loadImage(file) { return file } }',
+     [('PhotoEditor', 'init', []), ('PhotoEditor', 'loadImage', ['file'])]),
+]
+
+
+def check_index_formatting():
+    """确认索引在不同代码格式下都能识别出类方法（不会把方法定义当成调用）"""
+    print("\n🧩 检查JS结构索引对代码格式的适应性...")
+    passed = True
+    for description, source, expected in FORMATTING_CASES:
+        index = build_index(source)
+        missing = [f'{cls}.{name}({", ".join(params)})' for cls, name, params in expected
+                   if not index.has_method(name, cls, params=params)]
+        if missing:
+            print(f"  ❌ {description}: 未识别 {', '.join(missing)}")
+            passed = False
+        else:
+            print(f"  ✅ {description}")
+    return passed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='建立并显示JS文件的结构索引')
+    parser.add_argument('files', nargs='*', default=['js/main.js'], help='JS文件')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出完整符号表')
+    args = parser.parse_args(argv)
+
+    status = 0
+    for path in args.files:
+        if not site_cache.exists(path):
+            print(f"❌ {path} 文件不存在")
+            status = 1
+            continue
+        try:
+            index = load(path)
+        except js_tokens.JSSyntaxError as e:
+            print(f"❌ {path}: {e}")
+            status = 1
+            continue
+        if args.json:
+            json.dump({path: index.tables}, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        else:
+            print_summary(path, index)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
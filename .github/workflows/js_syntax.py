@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+页面脚本的语法检查
+检查 index.html 中所有 <script>（外部文件和内联脚本）: 启动一个常驻的Node进程，
+通过stdin/stdout逐行传递JSON请求，用 vm.Script 编译而不执行，所有文件只需一次
+Node启动。结果按内容哈希缓存在 .cache/js_syntax.json，内容不变时不再启动Node
+
+另外用 js_tokens 做两项检查: 普通脚本共享全局作用域，多个文件在顶层重复声明
+同名的 class/let/const 会在运行时报错；遗留的 debugger 语句
+
+用法（在站点根目录下运行）:
+    python3 js_syntax.py
+    python3 js_syntax.py --no-cache --json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from urllib.parse import urlparse
+
+import html_scan
+import js_tokens
+import site_cache
+from asset_graph import ANY_TEXT
+
+CACHE_FILE = os.path.join('.cache', 'js_syntax.json')
+
+# 检查逻辑变化时递增，让旧的缓存失效
+CHECKER_VERSION = 1
+
+SCRIPT_QUERIES = [
+    html_scan.Query('scripts', tag='script', text=ANY_TEXT, find_all=True),
+]
+
+# 这些type的<script>不是JavaScript
+JS_TYPES = ('', 'text/javascript', 'application/javascript', 'module')
+
+# 常驻Node进程: 每行一个请求 {"id", "filename", "source", "module"}，
+# 每行一个结果 {"id", "ok", "message", "line", "column"}
+WORKER_SOURCE = r'''
+const vm = require('vm');
+const readline = require('readline');
+
+// SyntaxError的stack形如 "文件名:行号\n源码行\n    ^^^\n\n消息"
+function locate(error, filename) {
+    const lines = String(error.stack || '').split('\n');
+    const head = lines[0] || '';
+    const match = head.startsWith(filename) ? /^:(\d+)$/.exec(head.slice(filename.length)) : null;
+    if (!match) {
+        return [null, null];
+    }
+    const caret = (lines[2] || '').indexOf('^');
+    return [Number(match[1]), caret >= 0 ? caret + 1 : null];
+}
+
+const rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', (line) => {
+    const request = JSON.parse(line);
+    const result = {id: request.id, ok: true, message: null, line: null, column: null};
+    try {
+        if (request.module && vm.SourceTextModule) {
+            new vm.SourceTextModule(request.source, {identifier: request.filename});
+        } else {
+            new vm.Script(request.source, {filename: request.filename});
+        }
+    } catch (error) {
+        result.ok = false;
+        result.message = `${error.name}: ${error.message}`;
+        [result.line, result.column] = locate(error, request.filename);
+    }
+    process.stdout.write(JSON.stringify(result) + '\n');
+});
+'''
+
+
+class NodeWorker:
+    """常驻的Node语法检查进程"""
+
+    def __init__(self, node='node'):
+        self.process = subprocess.Popen(
+            [node, '--experimental-vm-modules', '--no-warnings', '-e', WORKER_SOURCE],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', bufsize=1,
+        )
+        self._next_id = 0
+
+    def check(self, filename, source, module=False):
+        """编译一段源码，返回 {'ok', 'message', 'line', 'column'}"""
+        self._next_id += 1
+        request = {'id': self._next_id, 'filename': filename, 'source': source, 'module': module}
+        self.process.stdin.write(json.dumps(request, ensure_ascii=False) + '\n')
+        self.process.stdin.flush()
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError('Node进程意外退出')
+        result = json.loads(line)
+        result.pop('id', None)
+        return result
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---- 收集脚本 ----
+
+def discover_scripts(html_path='index.html', root=None):
+    """返回页面中所有JavaScript脚本
+
+    每项为 {'name', 'path', 'line', 'offset', 'module', 'external', 'source'}；
+    外部文件的source在检查时再读取，站外脚本标记为external；
+    内联脚本的offset用来把脚本内的行号换算成HTML中的行号
+    """
+    if root is None:
+        root = os.path.dirname(html_path) or '.'
+    scripts = []
+    for element in html_scan.scan_file(html_path, SCRIPT_QUERIES)['scripts']:
+        script_type = element.get('type', '').strip().lower()
+        if script_type not in JS_TYPES:
+            continue
+        src = element.get('src')
+        entry = {'line': element.line, 'offset': 0, 'module': script_type == 'module', 'external': False}
+        if src:
+            parsed = urlparse(src)
+            entry['name'] = src
+            if parsed.scheme or parsed.netloc:
+                entry.update(path=None, external=True, source=None)
+            else:
+                entry.update(path=os.path.join(root, parsed.path.lstrip('/')), source=None)
+        else:
+            # 内联脚本的文本从<script>标签所在行开始
+            entry.update(name=f'{html_path}#L{element.line}', path=html_path,
+                         offset=element.line - 1, source=element.text or '')
+        scripts.append(entry)
+    return scripts
+
+
+# ---- 缓存 ----
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return cache if cache.get('version') == CHECKER_VERSION else {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    cache['version'] = CHECKER_VERSION
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.js_syntax.')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _content_key(source, module):
+    return hashlib.sha256(f'{int(module)}:{source}'.encode('utf-8')).hexdigest()
+
+
+# ---- 词法检查 ----
+
+def top_level_declarations(source):
+    """顶层的 class/let/const 声明: [(名称, 行号)]"""
+    declarations = []
+    depth = 0
+    tokens = js_tokens.significant_tokens(source)
+    for i, token in enumerate(tokens):
+        if token.type == js_tokens.PUNCT:
+            if token.value in ('{', '(', '['):
+                depth += 1
+            elif token.value in ('}', ')', ']'):
+                depth -= 1
+            continue
+        if depth or token.type != js_tokens.NAME or token.value not in ('class', 'let', 'const'):
+            continue
+        prev = tokens[i - 1] if i else None
+        if prev is not None and prev.type == js_tokens.PUNCT and prev.value == '.':
+            continue
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if following is not None and following.type == js_tokens.NAME:
+            declarations.append((following.value, token.line))
+    return declarations
+
+
+def debugger_statements(source):
+    """遗留的debugger语句行号"""
+    return [t.line for t in js_tokens.significant_tokens(source)
+            if t.type == js_tokens.NAME and t.value == 'debugger']
+
+
+def lint(scripts):
+    """跨脚本的全局重复声明和debugger语句
+
+    返回警告列表，kind为'redeclared'（运行时错误）或'debugger'
+    """
+    warnings = []
+    declared = {}
+    for script in scripts:
+        if script['source'] is None or script['module']:
+            # 模块有自己的作用域
+            continue
+        try:
+            declarations = top_level_declarations(script['source'])
+            debuggers = debugger_statements(script['source'])
+        except js_tokens.JSSyntaxError:
+            continue
+        for name, line in declarations:
+            line += script['offset']
+            if name in declared:
+                first_name, first_line = declared[name]
+                warnings.append({
+                    'kind': 'redeclared', 'script': script['name'], 'line': line,
+                    'message': f"全局声明 {name} 与 {first_name}:{first_line} 重复，运行时会抛出SyntaxError",
+                })
+            else:
+                declared[name] = (script['name'], line)
+        for line in debuggers:
+            warnings.append({'kind': 'debugger', 'script': script['name'],
+                             'line': line + script['offset'], 'message': '遗留的debugger语句'})
+    return warnings
+
+
+# ---- 主流程 ----
+
+def check_scripts(scripts, use_cache=True, node='node', cache_path=CACHE_FILE):
+    """检查脚本语法，结果写入每个脚本的'status'等字段
+
+    Node未安装时返回False（未缓存的脚本状态为'skipped'），否则返回True
+    """
+    cache = load_cache(cache_path) if use_cache else {}
+    entries = cache.setdefault('results', {})
+    pending = []
+    for script in scripts:
+        script.update(status=None, message=None, error_line=None, column=None, cached=False)
+        if script['external']:
+            script['status'] = 'external'
+            continue
+        if script['source'] is None:
+            if not site_cache.exists(script['path']):
+                script['status'] = 'missing'
+                continue
+            script['source'] = site_cache.read_text(script['path'])
+        key = _content_key(script['source'], script['module'])
+        script['key'] = key
+        cached = entries.get(key)
+        if cached is not None:
+            script.update(cached, cached=True)
+        else:
+            pending.append(script)
+
+    node_available = True
+    if pending:
+        try:
+            worker = NodeWorker(node)
+        except FileNotFoundError:
+            worker = None
+            node_available = False
+        if worker is None:
+            for script in pending:
+                script['status'] = 'skipped'
+        else:
+            with worker:
+                for script in pending:
+                    result = worker.check(script['name'], script['source'], script['module'])
+                    # 缓存中保存脚本内的行号，内联脚本在HTML中移动位置后仍然有效
+                    outcome = {
+                        'status': 'ok' if result['ok'] else 'error',
+                        'message': result['message'],
+                        'error_line': result['line'],
+                        'column': result['column'],
+                    }
+                    entries[script['key']] = outcome
+                    script.update(outcome)
+            save_cache(cache, cache_path)
+
+    for script in scripts:
+        if script['error_line'] is not None:
+            script['error_line'] += script['offset']
+    return node_available
+
+
+STATUS_ICONS = {
+    'ok': '✅',
+    'error': '❌',
+    'missing': '❌',
+    'skipped': '⚠️',
+    'external': '⏭️',
+}
+
+
+def print_report(scripts, warnings):
+    """打印结果"""
+    print("🔍 JavaScript语法检查")
+    print("=" * 60)
+    for script in scripts:
+        icon = STATUS_ICONS[script['status']]
+        if script['status'] == 'ok':
+            note = '（缓存）' if script['cached'] else ''
+            print(f"  {icon} {script['name']} 语法正确{note}")
+        elif script['status'] == 'error':
+            position = f":{script['error_line']}" if script['error_line'] else ''
+            print(f"  {icon} {script['name']}{position} {script['message']}")
+        elif script['status'] == 'missing':
+            print(f"  {icon} {script['name']} 文件不存在")
+        elif script['status'] == 'skipped':
+            print(f"  {icon} Node.js未安装，跳过{script['name']}语法检查")
+        else:
+            print(f"  {icon} {script['name']} 站外脚本，不检查")
+    for warning in warnings:
+        print(f"  ⚠️ {warning['script']}:{warning['line']} {warning['message']}")
+
+
+def has_errors(scripts, warnings):
+    """是否有会导致页面脚本无法运行的问题"""
+    return (any(s['status'] in ('error', 'missing') for s in scripts)
+            or any(w['kind'] == 'redeclared' for w in warnings))
+
+
+def run(html_path='index.html', use_cache=True):
+    """检查页面的全部脚本，返回 (脚本列表, 警告列表)"""
+    scripts = discover_scripts(html_path)
+    check_scripts(scripts, use_cache)
+    return scripts, lint(scripts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='检查index.html中所有脚本的语法')
+    parser.add_argument('--html', default='index.html', help='页面文件')
+    parser.add_argument('--no-cache', action='store_true', help='忽略缓存，全部重新检查')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    scripts, warnings = run(args.html, not args.no_cache)
+    if args.json:
+        for script in scripts:
+            script.pop('source', None)
+        json.dump({'scripts': scripts, 'warnings': warnings}, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(scripts, warnings)
+
+    return 1 if has_errors(scripts, warnings) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
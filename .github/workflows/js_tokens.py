@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+轻量级JavaScript词法分析器
+把源码切分为带行列号的词法单元，正确跳过字符串、模板字符串（含 ${} 嵌套）、
+注释和正则字面量，供压缩和结构索引等工具使用
+"""
+
+import re
+from collections import namedtuple
+
+Token = namedtuple('Token', 'type value line col offset')
+
+# 词法单元类型
+WS = 'ws'
+NEWLINE = 'newline'
+COMMENT = 'comment'
+STRING = 'string'
+TEMPLATE = 'template'
+REGEX = 'regex'
+NUMBER = 'number'
+NAME = 'name'
+PUNCT = 'punct'
+
+# 出现在这些关键字之后的 / 是正则字面量的开始
+REGEX_AFTER_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+
+PUNCTUATORS = sorted([
+    '>>>=', '...', '===', '!==', '**=', '<<=', '>>=', '>>>', '&&=', '||=', '??=',
+    '=>', '==', '!=', '<=', '>=', '&&', '||', '??', '?.', '++', '--', '+=', '-=',
+    '*=', '%=', '&=', '|=', '^=', '**', '<<', '>>',
+    '{', '}', '(', ')', '[', ']', ';', ',', '<', '>', '+', '-', '*', '%', '&',
+    '|', '^', '!', '~', '?', ':', '=', '.', '@', '#',
+], key=len, reverse=True)
+
+_NAME_RE = re.compile(r'[A-Za-z_$\u0080-￿][\w$\u0080-￿]*')
+_NUMBER_RE = re.compile(r'(?:0[xXoObB][\da-fA-F_]+|(?:\d[\d_]*\.?[\d_]*|\.\d[\d_]*)(?:[eE][+-]?\d+)?)n?')
+_WS_RE = re.compile(r'[ \t\f\v ﻿]+')
+
+
+class JSSyntaxError(ValueError):
+    """无法完成词法分析（例如未闭合的字符串）"""
+
+
+class Tokenizer:
+    """把JavaScript源码切分为Token序列"""
+
+    def __init__(self, source):
+        self.source = source
+        self.pos = 0
+        self.line = 1
+        self.line_start = 0
+        self.last_significant = None
+
+    def _token(self, type_, start, start_line, start_col):
+        value = self.source[start:self.pos]
+        # 多行单元（注释、模板字符串）需要更新行号
+        newlines = value.count('\n')
+        if newlines:
+            self.line += newlines
+            self.line_start = start + value.rindex('\n') + 1
+        token = Token(type_, value, start_line, start_col, start)
+        if type_ not in (WS, NEWLINE, COMMENT):
+            self.last_significant = token
+        return token
+
+    def _regex_allowed(self):
+        prev = self.last_significant
+        if prev is None:
+            return True
+        if prev.type == NAME:
+            return prev.value in REGEX_AFTER_KEYWORDS
+        if prev.type in (NUMBER, STRING, TEMPLATE, REGEX):
+            return False
+        return prev.value not in (')', ']', '}')
+
+    def _skip_string(self, quote):
+        source = self.source
+        pos = self.pos + 1
+        while pos < len(source):
+            ch = source[pos]
+            if ch == '\\':
+                pos += 2
+                continue
+            if ch == quote:
+                self.pos = pos + 1
+                return
+            if ch == '\n':
+                break
+            pos += 1
+        raise JSSyntaxError(f'第{self.line}行: 字符串未闭合')
+
+    def _skip_template(self):
+        source = self.source
+        pos = self.pos + 1
+        while pos < len(source):
+            ch = source[pos]
+            if ch == '\\':
+                pos += 2
+                continue
+            if ch == '`':
+                self.pos = pos + 1
+                return
+            if ch == '$' and source.startswith('${', pos):
+                pos = self._skip_template_expression(pos + 2)
+                continue
+            pos += 1
+        raise JSSyntaxError(f'第{self.line}行: 模板字符串未闭合')
+
+    def _skip_template_expression(self, pos):
+        """跳过 ${ ... } 中的表达式，返回 } 之后的位置"""
+        nested = Tokenizer(self.source)
+        nested.pos = pos
+        depth = 0
+        while nested.pos < len(self.source):
+            token = nested.next_token()
+            if token.type == PUNCT:
+                if token.value == '{':
+                    depth += 1
+                elif token.value == '}':
+                    if depth == 0:
+                        return nested.pos
+                    depth -= 1
+        raise JSSyntaxError(f'第{self.line}行: 模板表达式未闭合')
+
+    def _skip_regex(self):
+        source = self.source
+        pos = self.pos + 1
+        in_class = False
+        while pos < len(source):
+            ch = source[pos]
+            if ch == '\\':
+                pos += 2
+                continue
+            if ch == '\n':
+                break
+            if in_class:
+                if ch == ']':
+                    in_class = False
+            elif ch == '[':
+                in_class = True
+            elif ch == '/':
+                pos += 1
+                while pos < len(source) and (source[pos].isalnum() or source[pos] == '_'):
+                    pos += 1
+                self.pos = pos
+                return
+            pos += 1
+        raise JSSyntaxError(f'第{self.line}行: 正则表达式未闭合')
+
+    def next_token(self):
+        source = self.source
+        start = self.pos
+        start_line = self.line
+        start_col = start - self.line_start + 1
+        ch = source[start]
+
+        if ch == '\n' or ch == '\r':
+            self.pos = start + 1
+            token = Token(NEWLINE, source[start:self.pos], start_line, start_col, start)
+            if ch == '\n':
+                self.line += 1
+                self.line_start = self.pos
+            return token
+
+        match = _WS_RE.match(source, start)
+        if match:
+            self.pos = match.end()
+            return self._token(WS, start, start_line, start_col)
+
+        if source.startswith('//', start):
+            end = source.find('\n', start)
+            self.pos = len(source) if end == -1 else end
+            return self._token(COMMENT, start, start_line, start_col)
+
+        if source.startswith('/*', start):
+            end = source.find('*/', start + 2)
+            if end == -1:
+                raise JSSyntaxError(f'第{start_line}行: 注释未闭合')
+            self.pos = end + 2
+            return self._token(COMMENT, start, start_line, start_col)
+
+        if ch in '\'"':
+            self._skip_string(ch)
+            return self._token(STRING, start, start_line, start_col)
+
+        if ch == '`':
+            self._skip_template()
+            return self._token(TEMPLATE, start, start_line, start_col)
+
+        if ch == '/' and self._regex_allowed():
+            self._skip_regex()
+            return self._token(REGEX, start, start_line, start_col)
+
+        match = _NAME_RE.match(source, start)
+        if match:
+            self.pos = match.end()
+            return self._token(NAME, start, start_line, start_col)
+
+        if ch.isdigit() or (ch == '.' and source[start + 1:start + 2].isdigit()):
+            match = _NUMBER_RE.match(source, start)
+            self.pos = match.end() if match and match.end() > start else start + 1
+            return self._token(NUMBER, start, start_line, start_col)
+
+        if ch == '/':
+            self.pos = start + (2 if source.startswith('/=', start) else 1)
+            return self._token(PUNCT, start, start_line, start_col)
+
+        for punct in PUNCTUATORS:
+            if source.startswith(punct, start):
+                self.pos = start + len(punct)
+                return self._token(PUNCT, start, start_line, start_col)
+
+        # 无法识别的字符原样输出，交给JS引擎报错
+        self.pos = start + 1
+        return self._token(PUNCT, start, start_line, start_col)
+
+
+def tokenize(source):
+    """依次返回source中的所有Token（包括空白、换行和注释）"""
+    tokenizer = Tokenizer(source)
+    while tokenizer.pos < len(source):
+        yield tokenizer.next_token()
+
+
+def significant_tokens(source):
+    """只返回有意义的Token（跳过空白、换行和注释）"""
+    return [t for t in tokenize(source) if t.type not in (WS, NEWLINE, COMMENT)]
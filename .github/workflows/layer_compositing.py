@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+分块图层合成引擎原型
+图层像素存放在磁盘上的内存映射文件中，按固定大小的块合成: 每块单独记录是否需要
+重新合成，合成结果放进有字节上限的LRU缓存。合成在预乘alpha的float32上进行，
+支持canvas的 globalCompositeOperation 中的Porter-Duff运算和可分离混合模式
+
+基准测试比较 layers.js 式的整画布合成（每个图层一整块float32缓冲区）与分块合成
+在首次合成和局部修改后重新合成时的耗时与峰值内存
+
+用法:
+    python3 layer_compositing.py
+    python3 layer_compositing.py --size 4000x3000 --layers 12 --cache-mb 64
+    python3 layer_compositing.py --json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TILE_SIZE = 256
+
+# 合成结果缓存的默认上限
+CACHE_BYTES = 64 << 20
+
+
+# ---- 像素格式 ----
+
+def to_premultiplied(pixels):
+    """uint8 RGBA → 预乘alpha的float32"""
+    out = pixels.astype(np.float32)
+    out *= np.float32(1 / 255)
+    out[..., :3] *= out[..., 3:4]
+    return out
+
+
+def from_premultiplied(pixels):
+    """预乘alpha的float32 → uint8 RGBA"""
+    out = pixels.copy()
+    alpha = out[..., 3:4]
+    np.divide(out[..., :3], alpha, out=out[..., :3], where=alpha > 0)
+    np.clip(out, 0, 1, out=out)
+    out *= 255
+    out += 0.5
+    return out.astype(np.uint8)
+
+
+# ---- Porter-Duff ----
+
+def _one(sa, da):
+    return 1.0
+
+
+def _zero(sa, da):
+    return 0.0
+
+
+# 名称: (源系数Fa, 目标系数Fb)，结果 = Fa·源 + Fb·目标（预乘值，四个通道相同）
+PORTER_DUFF = {
+    'source-over': (_one, lambda sa, da: 1 - sa),
+    'destination-over': (lambda sa, da: 1 - da, _one),
+    'source-in': (lambda sa, da: da, _zero),
+    'destination-in': (_zero, lambda sa, da: sa),
+    'source-out': (lambda sa, da: 1 - da, _zero),
+    'destination-out': (_zero, lambda sa, da: 1 - sa),
+    'source-atop': (lambda sa, da: da, lambda sa, da: 1 - sa),
+    'destination-atop': (lambda sa, da: 1 - da, lambda sa, da: sa),
+    'xor': (lambda sa, da: 1 - da, lambda sa, da: 1 - sa),
+    'copy': (_one, _zero),
+    'lighter': (_one, _one),
+}
+
+
+def porter_duff(src, dst, operation):
+    """对预乘alpha的块做Porter-Duff运算"""
+    fa, fb = PORTER_DUFF[operation]
+    sa, da = src[..., 3:4], dst[..., 3:4]
+    out = src * fa(sa, da)
+    out += dst * fb(sa, da)
+    if operation == 'lighter':
+        np.minimum(out, 1, out=out)
+    return out
+
+
+# ---- 混合模式 ----
+
+def _hard_light(cb, cs):
+    return np.where(cs <= 0.5, cb * (2 * cs), cb + (2 * cs - 1) - cb * (2 * cs - 1))
+
+
+def _soft_light(cb, cs):
+    d = np.where(cb <= 0.25, ((16 * cb - 12) * cb + 4) * cb, np.sqrt(cb))
+    return np.where(cs <= 0.5, cb - (1 - 2 * cs) * cb * (1 - cb), cb + (2 * cs - 1) * (d - cb))
+
+
+def _color_dodge(cb, cs):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.minimum(1, cb / (1 - cs))
+    return np.where(cb <= 0, 0, np.where(cs >= 1, 1, out))
+
+
+def _color_burn(cb, cs):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = 1 - np.minimum(1, (1 - cb) / cs)
+    return np.where(cb >= 1, 1, np.where(cs <= 0, 0, out))
+
+
+# 可分离混合函数 B(背景色, 源色)，输入为非预乘的RGB
+BLEND_MODES = {
+    'multiply': lambda cb, cs: cb * cs,
+    'screen': lambda cb, cs: cb + cs - cb * cs,
+    'overlay': lambda cb, cs: _hard_light(cs, cb),
+    'darken': np.minimum,
+    'lighten': np.maximum,
+    'color-dodge': _color_dodge,
+    'color-burn': _color_burn,
+    'hard-light': _hard_light,
+    'soft-light': _soft_light,
+    'difference': lambda cb, cs: np.abs(cb - cs),
+    'exclusion': lambda cb, cs: cb + cs - 2 * cb * cs,
+}
+
+
+def _unpremultiply(rgb, alpha):
+    out = np.zeros_like(rgb)
+    np.divide(rgb, alpha, out=out, where=alpha > 0)
+    return out
+
+
+def blend(src, dst, mode):
+    """W3C Compositing规范的混合: co = cs·(1-αb) + cb·(1-αs) + αs·αb·B(Cb, Cs)"""
+    sa, da = src[..., 3:4], dst[..., 3:4]
+    mixed = BLEND_MODES[mode](_unpremultiply(dst[..., :3], da), _unpremultiply(src[..., :3], sa))
+    out = np.empty_like(dst)
+    out[..., :3] = src[..., :3] * (1 - da) + dst[..., :3] * (1 - sa) + sa * da * mixed
+    out[..., 3:4] = sa + da * (1 - sa)
+    return out
+
+
+def composite(src, dst, operation='source-over'):
+    """按canvas的globalCompositeOperation名称合成两个预乘alpha的块"""
+    if operation in PORTER_DUFF:
+        return porter_duff(src, dst, operation)
+    if operation == 'normal':
+        return porter_duff(src, dst, 'source-over')
+    return blend(src, dst, operation)
+
+
+# 源完全透明时不改变目标的运算，这些图层的空白块可以直接跳过
+IDENTITY_ON_EMPTY = ({'source-over', 'destination-over', 'source-atop', 'destination-out',
+                      'xor', 'lighter', 'normal'} | set(BLEND_MODES))
+
+
+# ---- 缓存 ----
+
+class TileCache:
+    """按字节数限制的LRU缓存"""
+
+    def __init__(self, budget_bytes=CACHE_BYTES):
+        self.budget = budget_bytes
+        self.bytes = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        tile = self.entries.get(key)
+        if tile is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return tile
+
+    def put(self, key, tile):
+        self.discard(key)
+        if tile.nbytes > self.budget:
+            return
+        self.entries[key] = tile
+        self.bytes += tile.nbytes
+        while self.bytes > self.budget:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def discard(self, key):
+        tile = self.entries.pop(key, None)
+        if tile is not None:
+            self.bytes -= tile.nbytes
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+
+# ---- 图层与合成器 ----
+
+class Layer:
+    """存放在内存映射文件中的图层（非预乘uint8 RGBA，与ImageData相同）"""
+
+    def __init__(self, compositor, name, path, operation='source-over', opacity=1.0, visible=True):
+        if operation not in PORTER_DUFF and operation not in BLEND_MODES and operation != 'normal':
+            raise ValueError(f'未知的合成方式: {operation}')
+        self.compositor = compositor
+        self.name = name
+        self.path = path
+        self.operation = operation
+        self.opacity = opacity
+        self.visible = visible
+        self.pixels = np.memmap(path, dtype=np.uint8, mode='w+',
+                                shape=(compositor.height, compositor.width, 4))
+        self.occupied = set()  # 写入过内容的块
+
+    def put(self, x, y, pixels):
+        """像putImageData一样写入一块区域（超出图层的部分丢弃）"""
+        height, width = pixels.shape[:2]
+        x0, y0 = max(0, x), max(0, y)
+        x1 = min(self.compositor.width, x + width)
+        y1 = min(self.compositor.height, y + height)
+        if x1 <= x0 or y1 <= y0:
+            return
+        self.pixels[y0:y1, x0:x1] = pixels[y0 - y:y1 - y, x0 - x:x1 - x]
+        tiles = self.compositor.tiles_in(x0, y0, x1 - x0, y1 - y0)
+        self.occupied.update(tiles)
+        self.compositor.invalidate(tiles)
+
+    def fill(self, color, x=0, y=0, width=None, height=None):
+        """用单一颜色填充矩形"""
+        width = self.compositor.width - x if width is None else width
+        height = self.compositor.height - y if height is None else height
+        block = np.empty((height, width, 4), dtype=np.uint8)
+        block[:] = color
+        self.put(x, y, block)
+
+    def tile(self, tx, ty):
+        size = self.compositor.tile_size
+        return self.pixels[ty * size:(ty + 1) * size, tx * size:(tx + 1) * size]
+
+
+class Compositor:
+    """分块合成一组图层；图层文件放在临时目录中，close()时删除"""
+
+    def __init__(self, width, height, tile_size=TILE_SIZE, cache_bytes=CACHE_BYTES, directory=None):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.columns = -(-width // tile_size)
+        self.rows = -(-height // tile_size)
+        self.layers = []
+        self.cache = TileCache(cache_bytes)
+        self.dirty = {(tx, ty) for ty in range(self.rows) for tx in range(self.columns)}
+        self.composited = 0
+        self.directory = tempfile.mkdtemp(prefix='layers-', dir=directory)
+        # 图层文件序号只增不减，删除图层后新图层不会复用仍在使用的文件
+        self._layer_ids = itertools.count()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for layer in self.layers:
+            layer.pixels = None
+        self.layers = []
+        self.cache.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def tiles_in(self, x, y, width, height):
+        """与矩形相交的块坐标"""
+        size = self.tile_size
+        tx0, ty0 = max(0, x // size), max(0, y // size)
+        tx1 = min(self.columns, -(-(x + width) // size))
+        ty1 = min(self.rows, -(-(y + height) // size))
+        return {(tx, ty) for ty in range(ty0, ty1) for tx in range(tx0, tx1)}
+
+    def invalidate(self, tiles):
+        for key in tiles:
+            self.dirty.add(key)
+            self.cache.discard(key)
+
+    def _invalidate_layer(self, layer):
+        # 空白块对“源透明即不变”的运算没有影响
+        if layer.operation in IDENTITY_ON_EMPTY:
+            self.invalidate(layer.occupied)
+        else:
+            self.invalidate(self.tiles_in(0, 0, self.width, self.height))
+
+    def add_layer(self, name, operation='source-over', opacity=1.0):
+        layer = Layer(self, name, os.path.join(self.directory, f'{next(self._layer_ids)}.rgba'), operation, opacity)
+        self.layers.append(layer)
+        self._invalidate_layer(layer)
+        return layer
+
+    def remove_layer(self, layer):
+        self.layers.remove(layer)
+        self._invalidate_layer(layer)
+        layer.pixels = None
+        os.unlink(layer.path)
+
+    def set_layer(self, layer, opacity=None, visible=None, operation=None):
+        """修改图层属性并标记受影响的块"""
+        self._invalidate_layer(layer)
+        if opacity is not None:
+            layer.opacity = opacity
+        if visible is not None:
+            layer.visible = visible
+        if operation is not None:
+            layer.operation = operation
+        self._invalidate_layer(layer)
+
+    def render_tile(self, tx, ty):
+        """返回合成后的uint8块（优先取缓存）"""
+        key = (tx, ty)
+        if key not in self.dirty:
+            tile = self.cache.get(key)
+            if tile is not None:
+                return tile
+        size = self.tile_size
+        height = min(size, self.height - ty * size)
+        width = min(size, self.width - tx * size)
+        result = np.zeros((height, width, 4), dtype=np.float32)
+        for layer in self.layers:
+            if not layer.visible or layer.opacity <= 0:
+                continue
+            if key not in layer.occupied and layer.operation in IDENTITY_ON_EMPTY:
+                continue
+            src = to_premultiplied(layer.tile(tx, ty))
+            if layer.opacity < 1:
+                src *= np.float32(layer.opacity)
+            result = composite(src, result, layer.operation)
+        tile = from_premultiplied(result)
+        self.cache.put(key, tile)
+        self.dirty.discard(key)
+        self.composited += 1
+        return tile
+
+    def render(self, x=0, y=0, width=None, height=None):
+        """合成一个区域（例如当前视口），只会重新计算其中需要更新的块"""
+        width = self.width - x if width is None else width
+        height = self.height - y if height is None else height
+        out = np.zeros((height, width, 4), dtype=np.uint8)
+        size = self.tile_size
+        for tx, ty in sorted(self.tiles_in(x, y, width, height)):
+            tile = self.render_tile(tx, ty)
+            left, top = tx * size, ty * size
+            x0, y0 = max(x, left), max(y, top)
+            x1 = min(x + width, left + tile.shape[1])
+            y1 = min(y + height, top + tile.shape[0])
+            out[y0 - y:y1 - y, x0 - x:x1 - x] = tile[y0 - top:y1 - top, x0 - left:x1 - left]
+        return out
+
+    def flatten(self, path):
+        """把整幅合成结果逐块写入内存映射文件（内存占用与图片大小无关）"""
+        out = np.memmap(path, dtype=np.uint8, mode='w+', shape=(self.height, self.width, 4))
+        size = self.tile_size
+        for ty in range(self.rows):
+            for tx in range(self.columns):
+                tile = self.render_tile(tx, ty)
+                out[ty * size:ty * size + tile.shape[0], tx * size:tx * size + tile.shape[1]] = tile
+        out.flush()
+        return out
+
+    def stats(self):
+        return {
+            'tiles': self.columns * self.rows,
+            'dirty': len(self.dirty),
+            'composited': self.composited,
+            'cache_bytes': self.cache.bytes,
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'cache_evictions': self.cache.evictions,
+        }
+
+
+# ---- 整画布合成（对照组） ----
+
+def composite_full(layers):
+    """layers.js式的合成: 每个图层整幅转为float32后依次合成"""
+    result = np.zeros(layers[0].pixels.shape, dtype=np.float32)
+    for layer in layers:
+        if not layer.visible or layer.opacity <= 0:
+            continue
+        src = to_premultiplied(layer.pixels)
+        if layer.opacity < 1:
+            src *= np.float32(layer.opacity)
+        result = composite(src, result, layer.operation)
+    return from_premultiplied(result)
+
+
+# ---- 基准测试 ----
+
+BENCH_OPERATIONS = ['source-over', 'multiply', 'screen', 'overlay', 'soft-light', 'lighter', 'difference']
+
+
+def build_scene(compositor, layers, seed=0):
+    """底层是整幅渐变“照片”，其余图层各有几个占画面约10%的半透明矩形"""
+    rng = np.random.default_rng(seed)
+    width, height = compositor.width, compositor.height
+    base = compositor.add_layer('background')
+    for top in range(0, height, compositor.tile_size):
+        rows = min(compositor.tile_size, height - top)
+        block = np.empty((rows, width, 4), dtype=np.uint8)
+        block[..., 0] = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+        block[..., 1] = (np.arange(top, top + rows) * 255 // max(height - 1, 1))[:, None]
+        block[..., 2] = 128
+        block[..., 3] = 255
+        base.put(0, top, block)
+    for i in range(1, layers):
+        layer = compositor.add_layer(f'layer {i}', BENCH_OPERATIONS[i % len(BENCH_OPERATIONS)], opacity=0.8)
+        for _ in range(3):
+            w = int(width * rng.uniform(0.1, 0.25))
+            h = int(height * rng.uniform(0.1, 0.25))
+            color = [*rng.integers(0, 256, 3), int(rng.integers(96, 256))]
+            layer.fill(color, int(rng.integers(0, width - w)), int(rng.integers(0, height - h)), w, h)
+
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, round(elapsed * 1000, 3), round(peak / (1 << 20), 2)
+
+
+def run_benchmark(width, height, layers, tile_size=TILE_SIZE, cache_bytes=CACHE_BYTES,
+                  viewport=(1200, 800), stroke=64):
+    """返回整画布与分块合成在首次合成和局部修改后的耗时/峰值内存"""
+    with Compositor(width, height, tile_size, cache_bytes) as compositor:
+        build_scene(compositor, layers)
+        view_w, view_h = min(viewport[0], width), min(viewport[1], height)
+
+        _, full_ms, full_peak = _measure(lambda: composite_full(compositor.layers))
+
+        flat_path = os.path.join(compositor.directory, 'flat.rgba')
+        _, tiled_ms, tiled_peak = _measure(lambda: compositor.flatten(flat_path))
+        first = compositor.stats()
+
+        # 在视口中央画一笔，然后只重新合成视口
+        brush = np.full((stroke, stroke, 4), (255, 0, 0, 255), dtype=np.uint8)
+        top = compositor.layers[-1]
+        before = compositor.composited
+        _, edit_ms, edit_peak = _measure(lambda: (
+            top.put(view_w // 2 - stroke // 2, view_h // 2 - stroke // 2, brush),
+            compositor.render(0, 0, view_w, view_h)))
+        edited = compositor.composited - before
+
+        _, full_edit_ms, full_edit_peak = _measure(lambda: composite_full(compositor.layers))
+        stats = compositor.stats()
+
+    layer_mb = width * height * 4 / (1 << 20)
+    return {
+        'size': [width, height],
+        'layers': layers,
+        'tile_size': tile_size,
+        'cache_mb': round(cache_bytes / (1 << 20), 2),
+        'layer_storage_mb': round(layer_mb * layers, 2),
+        'full': {'first_ms': full_ms, 'first_peak_mb': full_peak,
+                 'edit_ms': full_edit_ms, 'edit_peak_mb': full_edit_peak},
+        'tiled': {'first_ms': tiled_ms, 'first_peak_mb': tiled_peak,
+                  'first_tiles': first['composited'],
+                  'edit_ms': edit_ms, 'edit_peak_mb': edit_peak, 'edit_tiles': edited},
+        'cache': {k: stats[k] for k in ('cache_bytes', 'cache_hits', 'cache_misses', 'cache_evictions')},
+    }
+
+
+def print_report(result):
+    """打印结果"""
+    width, height = result['size']
+    print("🧱 图层合成基准测试")
+    print("=" * 60)
+    print(f"画布 {width}x{height}，{result['layers']} 个图层（磁盘上共 {result['layer_storage_mb']:.0f} MB），"
+          f"块大小 {result['tile_size']}，缓存上限 {result['cache_mb']:.0f} MB")
+    full, tiled = result['full'], result['tiled']
+    print(f"\n{'':10}{'首次合成':>14}{'峰值内存':>12}{'局部修改后':>14}{'峰值内存':>12}")
+    print(f"{'整画布':10}{full['first_ms']:>12.1f}ms{full['first_peak_mb']:>10.1f}MB"
+          f"{full['edit_ms']:>12.1f}ms{full['edit_peak_mb']:>10.1f}MB")
+    print(f"{'分块':10}{tiled['first_ms']:>12.1f}ms{tiled['first_peak_mb']:>10.1f}MB"
+          f"{tiled['edit_ms']:>12.1f}ms{tiled['edit_peak_mb']:>10.1f}MB")
+    print(f"\n🔁 局部修改后重新合成 {tiled['edit_tiles']} 个块（首次 {tiled['first_tiles']} 个）")
+    cache = result['cache']
+    print(f"📦 缓存: {cache['cache_bytes'] / (1 << 20):.1f} MB，命中 {cache['cache_hits']}，"
+          f"未命中 {cache['cache_misses']}，淘汰 {cache['cache_evictions']}")
+
+
+def _parse_size(value):
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='分块图层合成基准测试')
+    parser.add_argument('--size', type=_parse_size, default=(2400, 1600), help='画布尺寸')
+    parser.add_argument('--layers', type=int, default=8, help='图层数')
+    parser.add_argument('--tile', type=int, default=TILE_SIZE, help='块大小（像素）')
+    parser.add_argument('--cache-mb', type=float, default=CACHE_BYTES / (1 << 20), help='合成结果缓存上限（MB）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    if np is None:
+        print("⚠️ 未安装NumPy，跳过图层合成测试（pip install numpy）")
+        return 0
+
+    result = run_benchmark(*args.size, args.layers, args.tile, int(args.cache_mb * (1 << 20)))
+    if args.json:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(result)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
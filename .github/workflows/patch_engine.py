@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+幂等、可回滚的源码补丁
+每个补丁有名称和版本，写入的内容包在注释标记之间:
+
+    /* BEGIN PATCH zoom-display-fixes@2 */
+    ...
+    /* END PATCH zoom-display-fixes */
+
+再次运行时根据标记判断是否已应用（版本相同则跳过，版本不同则原地升级），
+不会重复追加内容。日志 .cache/patches.json 记录每个补丁替换掉的原文和文件写入后的
+stat签名: 文件自上次写入后没有变化时，不需要读取文件就能确认补丁已应用
+
+支持的操作:
+    replace       用补丁内容替换锚点（字符串，或返回 (开始, 结束) 的函数，例如 js_method）
+    insert_after  在锚点之后插入
+    append        追加到文件末尾
+
+用法:
+    python3 patch_engine.py --list
+    python3 patch_engine.py --rollback zoom-display-fixes [--dry-run]
+"""
+
+import argparse
+import difflib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+import js_tokens
+
+JOURNAL_FILE = os.path.join('.cache', 'patches.json')
+JOURNAL_VERSION = 1
+
+OPERATIONS = ('replace', 'insert_after', 'append')
+
+# 各类文件的注释语法: (开始, 结束)
+COMMENT_STYLES = {
+    'css': ('/* ', ' */'),
+    'js': ('// ', ''),
+    'html': ('<!-- ', ' -->'),
+}
+EXTENSION_STYLES = {'.css': 'css', '.js': 'js', '.html': 'html', '.htm': 'html'}
+
+
+class PatchError(Exception):
+    """补丁无法应用或回滚"""
+
+
+class Patch:
+    """一个命名、带版本的补丁
+
+    anchor          replace/insert_after的锚点: 字符串（必须在文件中唯一）或 函数(text) -> (开始, 结束)
+    comment         标记使用的注释语法，默认按扩展名选择（例如HTML中的内联脚本需要用'js'）
+    already_present 文件中没有标记但包含这个字符串时，视为旧版脚本已直接修改过，不再应用
+    legacy          (开始文本, 结束文本): 旧版脚本追加的无标记内容，应用时全部删除并在原位置换成补丁
+    """
+
+    def __init__(self, name, version, path, op, content, anchor=None, comment=None,
+                 already_present=None, legacy=None, description=''):
+        if op not in OPERATIONS:
+            raise ValueError(f'未知的补丁操作: {op}')
+        if op != 'append' and anchor is None:
+            raise ValueError(f'{op} 操作需要锚点')
+        self.name = name
+        self.version = str(version)
+        self.path = path
+        self.op = op
+        self.content = content.rstrip().lstrip('\n')
+        self.anchor = anchor
+        self.comment = comment or EXTENSION_STYLES.get(os.path.splitext(path)[1].lower(), 'js')
+        self.already_present = already_present
+        self.legacy = legacy
+        self.description = description
+
+    def block(self):
+        """带标记的补丁内容"""
+        start, end = COMMENT_STYLES[self.comment]
+        return (f'{start}BEGIN PATCH {self.name}@{self.version}{end}\n'
+                f'{self.content}\n'
+                f'{start}END PATCH {self.name}{end}')
+
+
+# ---- 锚点 ----
+
+def js_method(name):
+    """返回定位JS方法/函数定义（从所在行开头到结束的 }）的锚点函数"""
+
+    def find(text):
+        tokens = js_tokens.significant_tokens(text)
+        for i, token in enumerate(tokens):
+            if token.type != js_tokens.NAME or token.value != name:
+                continue
+            if i and tokens[i - 1].value == '.':
+                continue
+            if i + 1 >= len(tokens) or tokens[i + 1].value != '(':
+                continue
+            close = _matching(tokens, i + 1, '(', ')')
+            if close is None or close + 1 >= len(tokens) or tokens[close + 1].value != '{':
+                continue
+            end = _matching(tokens, close + 1, '{', '}')
+            if end is None:
+                return None
+            line_start = text.rfind('\n', 0, token.offset) + 1
+            prefix = text[line_start:token.offset]
+            start = line_start if re.fullmatch(r'\s*(?:(?:async|static|function|get|set)\s+)*', prefix) \
+                else token.offset
+            return start, tokens[end].offset + 1
+        return None
+
+    find.__name__ = f'js_method({name})'
+    return find
+
+
+def _matching(tokens, index, open_value, close_value):
+    depth = 0
+    for j in range(index, len(tokens)):
+        if tokens[j].type != js_tokens.PUNCT:
+            continue
+        if tokens[j].value == open_value:
+            depth += 1
+        elif tokens[j].value == close_value:
+            depth -= 1
+            if depth == 0:
+                return j
+    return None
+
+
+def _anchor_span(patch, text):
+    if callable(patch.anchor):
+        return patch.anchor(text)
+    start = text.find(patch.anchor)
+    if start == -1:
+        return None
+    if text.find(patch.anchor, start + 1) != -1:
+        raise PatchError(f'{patch.name}: 锚点在 {patch.path} 中出现多次')
+    return start, start + len(patch.anchor)
+
+
+def _block_re(name):
+    """匹配已应用的补丁块（不依赖注释语法）"""
+    openers = '|'.join(re.escape(start) for start, _ in COMMENT_STYLES.values())
+    closers = '|'.join(re.escape(end) for _, end in COMMENT_STYLES.values() if end)
+    escaped = re.escape(name)
+    return re.compile(r'(?:%s)BEGIN PATCH %s@(?P<version>\S+)(?:%s)?\n.*?\n[ \t]*(?:%s)END PATCH %s(?:%s)?(?=\n|$)'
+                      % (openers, escaped, closers, openers, escaped, closers), re.DOTALL)
+
+
+def _legacy_spans(patch, text):
+    spans = []
+    if not patch.legacy:
+        return spans
+    begin, end = patch.legacy
+    pos = 0
+    while True:
+        start = text.find(begin, pos)
+        if start == -1:
+            return spans
+        stop = text.find(end, start)
+        if stop == -1:
+            return spans
+        stop += len(end)
+        # 连同所在行的缩进和行尾换行一起删除
+        line_start = text.rfind('\n', 0, start) + 1
+        if not text[line_start:start].strip():
+            start = line_start
+        if text[stop:stop + 1] == '\n':
+            stop += 1
+        spans.append((start, stop))
+        pos = stop
+
+
+# ---- 日志和文件写入 ----
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_journal(path=JOURNAL_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            journal = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'version': JOURNAL_VERSION, 'patches': {}}
+    if journal.get('version') != JOURNAL_VERSION:
+        return {'version': JOURNAL_VERSION, 'patches': {}}
+    return journal
+
+
+def atomic_write(path, text):
+    """先写临时文件再重命名，保证不会留下写了一半的文件"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def save_journal(journal, path=JOURNAL_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    atomic_write(path, json.dumps(journal, ensure_ascii=False, indent=2) + '\n')
+
+
+def _write(path, text, journal):
+    atomic_write(path, text)
+    # 同一文件上其他补丁记录的签名也随之更新
+    signature = _stat_signature(path)
+    for entry in journal['patches'].values():
+        if entry['path'] == path:
+            entry['signature'] = signature
+
+
+def _diff(path, old, new):
+    return ''.join(difflib.unified_diff(old.splitlines(True), new.splitlines(True),
+                                        f'a/{path}', f'b/{path}'))
+
+
+# ---- 应用和回滚 ----
+
+def apply(patch, dry_run=False, journal_path=JOURNAL_FILE):
+    """应用补丁，返回 {'name', 'path', 'status', 'diff', 'message'}
+
+    status: applied | upgraded | unchanged | legacy | missing-anchor | missing-file
+    """
+    result = {'name': patch.name, 'path': patch.path, 'status': None, 'diff': '', 'message': ''}
+    journal = load_journal(journal_path)
+    entry = journal['patches'].get(patch.name)
+
+    if entry and entry['path'] == patch.path and entry['version'] == patch.version \
+            and entry.get('signature') and entry['signature'] == _stat_signature(patch.path):
+        result['status'] = 'unchanged'
+        return result
+
+    if not os.path.exists(patch.path):
+        result['status'] = 'missing-file'
+        result['message'] = f'{patch.path} 不存在'
+        return result
+    with open(patch.path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+
+    base = text
+    original = None
+    match = _block_re(patch.name).search(text)
+    if match:
+        if match.group('version') == patch.version:
+            result['status'] = 'unchanged'
+            new_text = text
+        else:
+            # 原地替换旧版本的补丁块，锚点原文仍保留在日志中
+            new_text = text[:match.start()] + patch.block() + text[match.end():]
+            result['status'] = 'upgraded'
+            result['message'] = f"{match.group('version')} → {patch.version}"
+            original = entry.get('original') if entry else None
+    elif patch.already_present and patch.already_present in text:
+        result['status'] = 'legacy'
+        result['message'] = '内容已由旧版脚本直接写入（无补丁标记），跳过'
+        return result
+    else:
+        spans = _legacy_spans(patch, text)
+        if spans:
+            # 去掉旧版脚本追加的全部副本，补丁放在第一个副本的位置
+            first = spans[0][0]
+            for start, stop in reversed(spans):
+                base = base[:start] + base[stop:]
+            new_text = base[:first] + patch.block() + '\n' + base[first:]
+            result['message'] = f'替换了 {len(spans)} 处旧版脚本追加的内容'
+        elif patch.op == 'append':
+            separator = '' if not text or text.endswith('\n') else '\n'
+            new_text = text + separator + patch.block() + '\n'
+        else:
+            span = _anchor_span(patch, text)
+            if span is None:
+                result['status'] = 'missing-anchor'
+                anchor = getattr(patch.anchor, '__name__', None) or repr(patch.anchor[:40])
+                result['message'] = f'在 {patch.path} 中找不到锚点 {anchor}'
+                return result
+            start, end = span
+            if patch.op == 'replace':
+                original = text[start:end]
+                new_text = text[:start] + patch.block() + text[end:]
+            else:
+                new_text = text[:end] + '\n' + patch.block() + text[end:]
+        result['status'] = 'applied'
+
+    result['diff'] = _diff(patch.path, text, new_text)
+    if dry_run:
+        return result
+
+    if new_text != text:
+        _write(patch.path, new_text, journal)
+    journal['patches'][patch.name] = {
+        'version': patch.version,
+        'path': patch.path,
+        'op': patch.op,
+        'original': original if original is not None else (entry or {}).get('original'),
+        'signature': _stat_signature(patch.path),
+        'applied_at': (entry or {}).get('applied_at') if result['status'] == 'unchanged'
+        else time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    save_journal(journal, journal_path)
+    return result
+
+
+def rollback(name, dry_run=False, journal_path=JOURNAL_FILE, path=None):
+    """撤销补丁: replace恢复原文，insert_after/append删除补丁块"""
+    journal = load_journal(journal_path)
+    entry = journal['patches'].get(name)
+    path = path or (entry and entry['path'])
+    result = {'name': name, 'path': path, 'status': None, 'diff': '', 'message': ''}
+    if not path or not os.path.exists(path):
+        result['status'] = 'missing-file'
+        result['message'] = '日志中没有这个补丁' if not path else f'{path} 不存在'
+        return result
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    match = _block_re(name).search(text)
+    if match is None:
+        result['status'] = 'not-applied'
+    else:
+        op = entry['op'] if entry else 'append'
+        start, end = match.span()
+        if op == 'replace':
+            if not entry or entry.get('original') is None:
+                raise PatchError(f'{name}: 日志中没有被替换的原文，无法回滚')
+            new_text = text[:start] + entry['original'] + text[end:]
+        else:
+            # 连同插入时添加的换行一起删除
+            if text[start - 1:start] == '\n':
+                start -= 1
+            elif text[end:end + 1] == '\n':
+                end += 1
+            new_text = text[:start] + text[end:]
+        result['status'] = 'rolled-back'
+        result['diff'] = _diff(path, text, new_text)
+        if not dry_run:
+            _write(path, new_text, journal)
+
+    if not dry_run and entry:
+        del journal['patches'][name]
+        save_journal(journal, journal_path)
+    return result
+
+
+STATUS_MESSAGES = {
+    'applied': '✅ 已应用',
+    'upgraded': '⬆️ 已升级',
+    'unchanged': '⏭️ 已是最新，跳过',
+    'legacy': '⏭️ 已存在',
+    'missing-anchor': '❌ 找不到锚点',
+    'missing-file': '❌ 文件缺失',
+    'rolled-back': '↩️ 已回滚',
+    'not-applied': '⏭️ 未应用，无需回滚',
+}
+
+
+def print_result(result, dry_run=False):
+    """打印应用/回滚结果；dry_run时同时打印差异"""
+    message = f"（{result['message']}）" if result['message'] else ''
+    prefix = '[预览] ' if dry_run else ''
+    print(f"{prefix}{STATUS_MESSAGES[result['status']]}: {result['name']} → {result['path']}{message}")
+    if dry_run and result['diff']:
+        print(result['diff'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='查看和回滚已应用的补丁')
+    parser.add_argument('--list', action='store_true', help='列出日志中的补丁')
+    parser.add_argument('--rollback', metavar='NAME', help='回滚指定补丁')
+    parser.add_argument('--dry-run', action='store_true', help='只显示差异，不写文件')
+    parser.add_argument('--journal', default=JOURNAL_FILE, help='日志文件路径')
+    args = parser.parse_args(argv)
+
+    if args.rollback:
+        try:
+            result = rollback(args.rollback, args.dry_run, args.journal)
+        except PatchError as e:
+            print(f"❌ {e}")
+            return 1
+        print_result(result, args.dry_run)
+        return 0 if result['status'] in ('rolled-back', 'not-applied') else 1
+
+    journal = load_journal(args.journal)
+    if not journal['patches']:
+        print("📭 没有已应用的补丁")
+        return 0
+    print("🩹 已应用的补丁:")
+    for name, entry in sorted(journal['patches'].items()):
+        current = entry['signature'] == _stat_signature(entry['path'])
+        state = '' if current else '（文件已被修改）'
+        print(f"  • {name}@{entry['version']} [{entry['op']}] {entry['path']} {entry['applied_at']}{state}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+文本资源预压缩
+为站点中的HTML、CSS、JS、JSON、XML、SVG等文本文件生成 .gz（gzip最高压缩级别，
+安装了zopfli时改用zopfli）和 .br（需要brotli）同名文件，由静态服务器按
+Accept-Encoding直接发送，不再在请求时压缩
+
+- 多进程并行压缩
+- 按源文件内容哈希缓存在 .cache/precompress.json，内容没变的文件直接跳过
+- 压缩后不比原文件小的变体会被删除（服务器改发原文件）
+- 报告每个文件的原始字节数和压缩后字节数
+
+check_precompressed() 供 run_checks 调用，验证每个变体解压后与原文件完全一致
+
+用法（在站点根目录下运行）:
+    python3 precompress.py
+    python3 precompress.py --force --json
+    python3 precompress.py --check
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import site_cache
+from result_cache import file_hash
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from zopfli.gzip import compress as zopfli_gzip
+except ImportError:
+    zopfli_gzip = None
+
+CACHE_FILE = os.path.join('.cache', 'precompress.json')
+
+# 压缩参数或格式变化时递增，让缓存失效
+PIPELINE_VERSION = 1
+
+TEXT_EXTENSIONS = ('.html', '.htm', '.css', '.js', '.mjs', '.json', '.webmanifest',
+                   '.xml', '.svg', '.txt', '.map')
+
+# 不发布的目录
+SKIP_DIRS = {'node_modules', '__pycache__'}
+
+GZIP_LEVEL = 9
+ZOPFLI_ITERATIONS = 15
+BROTLI_QUALITY = 11
+
+# 编码名 -> 文件后缀
+SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+
+def available_encodings():
+    """当前环境能生成的编码"""
+    return ['gzip', 'br'] if brotli is not None else ['gzip']
+
+
+def gzip_tool():
+    return 'zopfli' if zopfli_gzip is not None else f'gzip -{GZIP_LEVEL}'
+
+
+def find_text_assets(root='.'):
+    """站点中需要预压缩的文本文件（相对路径，排序），跳过隐藏目录"""
+    assets = []
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS)
+        for name in sorted(files):
+            if name.startswith('.') or not name.lower().endswith(TEXT_EXTENSIONS):
+                continue
+            assets.append(os.path.normpath(os.path.relpath(os.path.join(directory, name), root)))
+    return assets
+
+
+# ---- 压缩 ----
+
+def compress(data, encoding):
+    """按编码压缩；gzip头不含文件名和时间戳，相同输入总是得到相同输出"""
+    if encoding == 'gzip':
+        if zopfli_gzip is not None:
+            return zopfli_gzip(data, numiterations=ZOPFLI_ITERATIONS)
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    raise ValueError(f'未知的编码: {encoding}')
+
+
+def decompress(data, encoding):
+    if encoding == 'gzip':
+        return gzip.decompress(data)
+    if encoding == 'br':
+        return brotli.decompress(data)
+    raise ValueError(f'未知的编码: {encoding}')
+
+
+def _write_bytes(path, data):
+    """原子写入，避免服务器读到写了一半的压缩文件"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp创建的文件权限是0600，改为普通文件的默认权限以便静态服务器读取
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def compress_file(path, encodings):
+    """在工作进程中生成一个文件的全部变体，返回每个编码的结果"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    variants = {}
+    for encoding in encodings:
+        output = path + SUFFIXES[encoding]
+        compressed = compress(data, encoding)
+        if len(compressed) >= len(data):
+            # 压缩没有收益，删除旧变体，让服务器直接发送原文件
+            if os.path.exists(output):
+                os.remove(output)
+            variants[encoding] = {'path': output, 'bytes': None, 'hash': None}
+            continue
+        _write_bytes(output, compressed)
+        variants[encoding] = {
+            'path': output,
+            'bytes': len(compressed),
+            'hash': hashlib.sha256(compressed).hexdigest(),
+        }
+    return variants
+
+
+# ---- 缓存 ----
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return cache if cache.get('version') == PIPELINE_VERSION else {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    cache['version'] = PIPELINE_VERSION
+    _write_bytes(path, (json.dumps(cache, ensure_ascii=False, indent=2) + '\n').encode('utf-8'))
+
+
+def _source_key(source_hash, encodings):
+    spec = json.dumps([PIPELINE_VERSION, encodings, gzip_tool(), GZIP_LEVEL, ZOPFLI_ITERATIONS, BROTLI_QUALITY])
+    return hashlib.sha256((source_hash + spec).encode('utf-8')).hexdigest()
+
+
+def _up_to_date(entry, key, source_path):
+    """原文件和参数都没变，且变体文件仍是上次生成的内容"""
+    if entry is None or entry['key'] != key:
+        return False
+    source_mtime = os.stat(source_path).st_mtime_ns
+    for variant in entry['variants'].values():
+        if variant['bytes'] is None:
+            if os.path.exists(variant['path']):
+                return False
+            continue
+        try:
+            st = os.stat(variant['path'])
+        except FileNotFoundError:
+            return False
+        if st.st_size != variant['bytes']:
+            return False
+        if st.st_mtime_ns < source_mtime:
+            # 原文件被touch或重新检出但内容没变；更新变体的mtime，否则服务器会认为它已过期
+            os.utime(variant['path'])
+    return True
+
+
+# ---- 主流程 ----
+
+def precompress(root='.', workers=None, force=False):
+    """压缩全部文本资源，返回报告"""
+    encodings = available_encodings()
+    cache_path = os.path.join(root, CACHE_FILE)
+    cache = load_cache(cache_path)
+    entries = cache.setdefault('files', {})
+
+    report = {'encodings': encodings, 'gzip_tool': gzip_tool(), 'files': []}
+    jobs = {}
+    for path in find_text_assets(root):
+        full_path = os.path.normpath(os.path.join(root, path))
+        item = {'path': path, 'bytes': os.path.getsize(full_path), 'status': None,
+                'error': None, 'variants': {}}
+        report['files'].append(item)
+        key = _source_key(file_hash(full_path), encodings)
+        entry = entries.get(path)
+        if not force and _up_to_date(entry, key, full_path):
+            item['status'] = 'unchanged'
+            item['variants'] = entry['variants']
+            continue
+        jobs[path] = (item, key)
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(compress_file, os.path.normpath(os.path.join(root, path)), encodings): path for path in jobs}
+            for future in as_completed(futures):
+                path = futures[future]
+                item, key = jobs[path]
+                try:
+                    item['variants'] = future.result()
+                except Exception as e:
+                    item['status'] = 'failed'
+                    item['error'] = f'{type(e).__name__}: {e}'
+                    entries.pop(path, None)
+                    continue
+                item['status'] = 'compressed'
+                entries[path] = {'key': key, 'variants': item['variants']}
+
+    # 删除已不存在的文件的记录
+    listed = {item['path'] for item in report['files']}
+    for path in list(entries):
+        if path not in listed:
+            del entries[path]
+    save_cache(cache, cache_path)
+
+    report['totals'] = {'bytes': sum(item['bytes'] for item in report['files'])}
+    for encoding in encodings:
+        report['totals'][encoding] = sum(
+            _transfer_bytes(item, encoding) for item in report['files'])
+    return report
+
+
+def _transfer_bytes(item, encoding):
+    """支持该编码的客户端实际下载的字节数（没有变体时是原文件）"""
+    variant = item['variants'].get(encoding)
+    if variant is None or variant['bytes'] is None:
+        return item['bytes']
+    return variant['bytes']
+
+
+STATUS_ICONS = {
+    'compressed': '✅',
+    'unchanged': '⏭️',
+    'failed': '💥',
+}
+
+
+def _ratio(compressed, raw):
+    return f"{compressed / raw * 100:5.1f}%" if raw else '    -'
+
+
+def print_report(report):
+    """打印每个文件的原始字节数和压缩字节数"""
+    encodings = report['encodings']
+    print("🗜️ 文本资源预压缩")
+    print("=" * 78)
+    print(f"🔧 gzip: {report['gzip_tool']}；brotli: {'quality ' + str(BROTLI_QUALITY) if 'br' in encodings else '未安装（pip install brotli）'}")
+    print()
+    header = f"{'文件':<40} {'原始':>9}" + ''.join(f" {encoding:>9} {'比例':>6}" for encoding in encodings)
+    print(header)
+    for item in report['files']:
+        line = f"{STATUS_ICONS[item['status']]} {item['path']:<37} {item['bytes']:>9}"
+        for encoding in encodings:
+            size = _transfer_bytes(item, encoding)
+            line += f" {size:>9} {_ratio(size, item['bytes'])}"
+        print(line)
+        if item['error']:
+            print(f"     {item['error']}")
+    totals = report['totals']
+    print("=" * 78)
+    line = f"📊 {'合计':<37} {totals['bytes']:>9}"
+    for encoding in encodings:
+        line += f" {totals[encoding]:>9} {_ratio(totals[encoding], totals['bytes'])}"
+    print(line)
+    compressed = sum(1 for item in report['files'] if item['status'] == 'compressed')
+    unchanged = sum(1 for item in report['files'] if item['status'] == 'unchanged')
+    print(f"✅ 压缩 {compressed} 个文件，⏭️ {unchanged} 个未变化")
+
+
+# ---- 检查 ----
+
+def verify_variants(root='.'):
+    """验证所有已有变体
+
+    返回 (问题列表 [(变体路径, 说明)], 因缺少解压库而未验证的变体路径列表)
+    """
+    problems = []
+    unverified = []
+    for path in find_text_assets(root):
+        source_path = os.path.normpath(os.path.join(root, path))
+        # 源文件按字节读取，不经过site_cache的文本缓存；这里只为把它记录为检查的输入
+        site_cache.exists(source_path)
+        original = None
+        source_mtime = os.stat(source_path).st_mtime_ns
+        for encoding, suffix in SUFFIXES.items():
+            variant_path = source_path + suffix
+            # 记录为检查输入（包括不存在的变体），变体出现或变化后检查会重新运行
+            if not site_cache.exists(variant_path):
+                continue
+            if encoding == 'br' and brotli is None:
+                unverified.append(variant_path)
+                continue
+            if original is None:
+                with open(source_path, 'rb') as f:
+                    original = f.read()
+            with open(variant_path, 'rb') as f:
+                data = f.read()
+            try:
+                decoded = decompress(data, encoding)
+            except Exception as e:
+                problems.append((variant_path, f'无法解压: {type(e).__name__}: {e}'))
+                continue
+            if decoded != original:
+                problems.append((variant_path, '解压后与原文件不一致'))
+            elif os.stat(variant_path).st_mtime_ns < source_mtime:
+                problems.append((variant_path, '比原文件旧，服务器不会使用'))
+    return problems, unverified
+
+
+def _print_verification(problems, unverified, indent=''):
+    for path, message in problems:
+        print(f"{indent}❌ {path}: {message}")
+    if unverified:
+        print(f"{indent}⚠️ 未安装brotli，跳过 {len(unverified)} 个 .br 文件的验证（pip install brotli）")
+    if not problems:
+        print(f"{indent}✅ 所有预压缩文件与原文件一致")
+
+
+def check_precompressed():
+    """检查预压缩文件解压后与原文件完全一致"""
+    print("🗜️ 检查预压缩文件...")
+    problems, unverified = verify_variants()
+    _print_verification(problems, unverified, '  ')
+    if problems:
+        print("  请重新运行: python3 precompress.py")
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='为文本资源生成gzip和brotli预压缩文件')
+    parser.add_argument('--root', default='.', help='站点根目录')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认CPU核数')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，全部重新压缩')
+    parser.add_argument('--check', action='store_true', help='只验证已有的预压缩文件')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    if args.check:
+        problems, unverified = verify_variants(args.root)
+        _print_verification(problems, unverified)
+        return 1 if problems else 0
+
+    if brotli is None:
+        print("⚠️ 未安装brotli，只生成gzip（pip install brotli）")
+
+    report = precompress(args.root, args.workers, args.force)
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(report)
+    return 1 if any(item['status'] == 'failed' for item in report['files']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
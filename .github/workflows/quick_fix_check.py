@@ -6,7 +6,9 @@
 import subprocess
 import time
 import requests
-import os
+
+import js_index
+import site_cache
 
 def check_fix():
     """检查修复状态"""
@@ -17,7 +19,7 @@ def check_fix():
     files = ['js/main.js', 'index.html', 'image_import_test.html']
     print("\n1. 检查修复文件...")
     for file in files:
-        if os.path.exists(file):
+        if site_cache.exists(file):
             print(f"✅ {file} 存在")
         else:
             print(f"❌ {file} 缺失")
@@ -25,9 +27,9 @@ def check_fix():
     
     # 2. 验证代码修复
     print("\n2. 验证代码修复...")
-    with open('js/main.js', 'r', encoding='utf-8') as f:
-        content = f.read()
+    index = js_index.load('js/main.js')
     
+    # 这些提示文字都在字符串字面量中（日志和通知消息）
     fixes = [
         ('开始加载图片', '调试日志'),
         ('非图片文件类型', '文件类型验证'),
@@ -37,15 +39,14 @@ def check_fix():
     ]
     
     for pattern, description in fixes:
-        if pattern in content:
+        if index.strings_containing(pattern):
             print(f"✅ {description}: 已修复")
         else:
             print(f"❌ {description}: 未找到")
     
     # 3. 验证HTML修复
     print("\n3. 验证HTML调试功能...")
-    with open('index.html', 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    html_content = site_cache.read_text('index.html')
     
     if 'PhotoEditor initialized successfully' in html_content:
         print("✅ 自动调试功能: 已添加")
@@ -60,7 +61,7 @@ def check_fix():
     print("✅ 创建了专门的测试页面")
     
     print("\n📋 下一步操作:")
-    print("1. 启动服务器: python3 -m http.server 8000")
+    print("1. 启动服务器: python3 static_server.py")
     print("2. 打开测试页面: http://localhost:8000/image_import_test.html")
     print("3. 按F12打开开发者工具")
     print("4. 测试图片导入功能")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+检查结果的增量缓存
+记录每个检查读取过的文件及其内容哈希，输入没有变化时直接回放上次的结果
+缓存以JSON Lines格式保存在 .cache/check_results.jsonl，每行一个检查
+"""
+
+import ast
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+CACHE_FILE = os.path.join('.cache', 'check_results.jsonl')
+
+# 缓存格式版本，格式变化时递增以丢弃旧记录
+CACHE_VERSION = 1
+
+
+def file_hash(path):
+    """文件内容的SHA-256，文件不存在时返回None"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def _local_imports(path):
+    """脚本中导入的同目录模块文件（顶层和函数内的import都算）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+    directory = os.path.dirname(os.path.abspath(path))
+    files = (os.path.join(directory, name.split('.')[0] + '.py') for name in names)
+    return sorted(f for f in files if os.path.isfile(f))
+
+
+def code_hash(path):
+    """脚本及其传递导入的同目录模块的组合哈希
+
+    检查依赖的共享模块（site_cache、html_scan、js_index等）变化时，缓存的结果同样失效
+    """
+    seen = set()
+    pending = [os.path.abspath(path)]
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        pending.extend(_local_imports(current))
+    digest = hashlib.sha256()
+    for current in sorted(seen):
+        digest.update(f'{os.path.basename(current)}\0{file_hash(current)}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+class ResultCache:
+    """按 检查ID + 代码哈希 + 输入文件哈希 缓存检查结果"""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('version') == CACHE_VERSION:
+                        self.entries[entry['id']] = entry
+        except FileNotFoundError:
+            pass
+
+    def _input_unchanged(self, path, recorded):
+        signature = _stat_signature(path)
+        if recorded['hash'] is None or signature is None:
+            return recorded['hash'] is None and signature is None
+        if signature == recorded['stat']:
+            return True
+        # mtime变化但内容可能相同（例如touch或重新检出），再比较哈希
+        if file_hash(path) != recorded['hash']:
+            return False
+        recorded['stat'] = signature
+        self._dirty = True
+        return True
+
+    def lookup(self, check_id, code_hash):
+        """输入和检查代码都未变化时返回缓存的结果，否则返回None"""
+        with self._lock:
+            entry = self.entries.get(check_id)
+            if entry is None or entry['code_hash'] != code_hash:
+                return None
+            for path, recorded in entry['inputs'].items():
+                if not self._input_unchanged(path, recorded):
+                    return None
+            return dict(entry['result'])
+
+    def store(self, check_id, code_hash, inputs, result):
+        """记录检查结果及其输入文件的当前哈希"""
+        recorded = {}
+        for path in sorted(inputs):
+            recorded[path] = {'hash': file_hash(path), 'stat': _stat_signature(path)}
+        with self._lock:
+            self.entries[check_id] = {
+                'version': CACHE_VERSION,
+                'id': check_id,
+                'code_hash': code_hash,
+                'inputs': recorded,
+                'result': result,
+            }
+            self._dirty = True
+
+    def save(self):
+        """原子地写回缓存文件"""
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.check_results.')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    for entry in self.entries.values():
+                        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._dirty = False
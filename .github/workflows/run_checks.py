@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+统一的并行检查运行器
+自动发现各工作流脚本中的 check_*/test_* 函数，按依赖关系并行执行并收集结构化结果
+
+用法（在站点根目录下运行）:
+    python3 run_checks.py                 # 运行全部检查
+    python3 run_checks.py -k seo -v       # 只运行名称包含seo的检查，并显示输出
+    python3 run_checks.py --json          # 输出JSON结果
+    python3 run_checks.py --no-cache      # 忽略增量缓存，全部重新运行
+    python3 run_checks.py --profile       # 记录每个检查的耗时、内存和读取量（见check_profiler.py）
+
+输入文件（通过site_cache读取或检查存在性的文件）与检查代码（包括它导入的本地模块）都未变化的检查，
+会直接回放 .cache/check_results.jsonl 中保存的结果
+"""
+
+import argparse
+import contextlib
+import importlib
+import inspect
+import io
+import json
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import check_profiler
+import site_cache
+from result_cache import CACHE_FILE, ResultCache, code_hash
+
+# 参与统一运行的脚本
+CHECK_MODULES = [
+    'final_test',
+    'seo_verification',
+    'test_functionality',
+    'quick_fix_check',
+    'verify_fix',
+    'test_zoom_fixes',
+    'detailed_image_diagnosis',
+    'precompress',
+    'sitemap_gen',
+    'sw_precache',
+    'js_index',
+]
+
+CHECK_PREFIXES = ('check_', 'test_')
+
+# 文件存在性检查：同一脚本中的其他检查都依赖它们
+FILE_CHECKS = ('check_files', 'test_files')
+
+# 额外的跨脚本依赖: 检查ID -> 前置检查ID列表
+DEPENDENCIES = {
+    'test_zoom_fixes.test_zoom_fixes': ['final_test.test_server'],
+}
+
+# 前置检查处于这些状态时，依赖它的检查会被跳过
+BLOCKING_STATUSES = ('failed', 'error', 'skipped')
+
+# 依赖网络或外部程序的检查，结果不能只由输入文件决定，不做缓存
+UNCACHEABLE = {
+    'final_test.test_server',
+    'test_zoom_fixes.test_zoom_fixes',
+    'verify_fix.test_syntax',
+}
+
+# 可缓存的结果状态
+CACHEABLE_STATUSES = ('passed', 'failed', 'done')
+
+
+class _ThreadLocalStdout:
+    """按线程分发的stdout，使并行检查的print输出互不干扰"""
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def capture(self, buffer):
+        self._local.buffer = buffer
+
+    def release(self):
+        self._local.buffer = None
+
+    def _target(self):
+        return getattr(self._local, 'buffer', None) or self._fallback
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._fallback, name)
+
+
+class _InlineExecutor:
+    """在调用线程中立即执行任务的执行器
+
+    剖析时使用: 检查一个接一个地在主线程运行，调度和结果缓存的读写都发生在两次计量之间，
+    不会被算进正在运行的检查（tracemalloc的峰值是进程级的）
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def discover_checks(module_names=None):
+    """导入脚本并返回 (检查列表, 导入失败列表)
+
+    每个检查为 {'id', 'module', 'name', 'func', 'code_hash'}，按源码顺序排列
+    """
+    checks = []
+    import_errors = []
+    for module_name in module_names or CHECK_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            import_errors.append({'module': module_name, 'error': f'{type(e).__name__}: {e}'})
+            continue
+
+        functions = []
+        for name, func in vars(module).items():
+            if not name.startswith(CHECK_PREFIXES) or not inspect.isfunction(func):
+                continue
+            if func.__module__ != module.__name__:
+                continue
+            signature = inspect.signature(func)
+            if any(p.default is p.empty for p in signature.parameters.values()):
+                continue
+            functions.append((func.__code__.co_firstlineno, name, func))
+
+        module_hash = code_hash(module.__file__)
+        for _, name, func in sorted(functions, key=lambda item: item[0]):
+            checks.append({
+                'id': f'{module_name}.{name}',
+                'module': module_name,
+                'name': name,
+                'func': func,
+                'code_hash': module_hash,
+            })
+    return checks, import_errors
+
+
+def build_graph(checks):
+    """构建依赖图: 检查ID -> 前置检查ID集合（只保留本次运行中存在的检查）"""
+    ids = {check['id'] for check in checks}
+    graph = {}
+    for check in checks:
+        deps = set(DEPENDENCIES.get(check['id'], ()))
+        if check['name'] not in FILE_CHECKS:
+            deps.update(f"{check['module']}.{name}" for name in FILE_CHECKS)
+        graph[check['id']] = {dep for dep in deps if dep in ids and dep != check['id']}
+    return graph
+
+
+def _status_of(value):
+    if value is True:
+        return 'passed'
+    if value is False:
+        return 'failed'
+    return 'done'
+
+
+def run_check(check, stdout=None, profiler=None):
+    """运行单个检查并返回结构化结果；传入Profiler时同时计量"""
+    buffer = io.StringIO()
+    if stdout is not None:
+        stdout.capture(buffer)
+    measure = profiler.measure(check['id']) if profiler is not None else contextlib.nullcontext()
+    start = time.perf_counter()
+    with site_cache.track() as inputs, measure:
+        try:
+            value = check['func']()
+            status = _status_of(value)
+            error = None
+        except Exception as e:
+            value = None
+            status = 'error'
+            error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+        finally:
+            if stdout is not None:
+                stdout.release()
+    duration = time.perf_counter() - start
+
+    return {
+        'id': check['id'],
+        'module': check['module'],
+        'name': check['name'],
+        'status': status,
+        'result': value if isinstance(value, (bool, int, float, str, type(None))) else repr(value),
+        'error': error,
+        'duration': round(duration, 6),
+        'output': buffer.getvalue(),
+        'inputs': sorted(inputs),
+        'cached': False,
+    }
+
+
+def _skipped(check, reason):
+    return {
+        'id': check['id'],
+        'module': check['module'],
+        'name': check['name'],
+        'status': 'skipped',
+        'result': None,
+        'error': reason,
+        'duration': 0.0,
+        'output': '',
+        'inputs': [],
+        'cached': False,
+    }
+
+
+def _cacheable(result):
+    return (result['status'] in CACHEABLE_STATUSES
+            and result['inputs']
+            and result['id'] not in UNCACHEABLE)
+
+
+def run_checks(checks, workers=8, cache=None, profiler=None):
+    """按依赖图并行运行检查，返回按发现顺序排列的结果列表
+
+    传入ResultCache时，输入未变化的检查直接回放缓存结果；
+    传入Profiler时在当前线程逐个运行并计量每个实际运行的检查（回放的结果不计量）
+    """
+    by_id = {check['id']: check for check in checks}
+    graph = build_graph(checks)
+    pending = {check_id: set(deps) for check_id, deps in graph.items()}
+    dependents = {check_id: [] for check_id in graph}
+    for check_id, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(check_id)
+
+    results = {}
+    stdout = _ThreadLocalStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        if profiler is not None:
+            executor = _InlineExecutor()
+        else:
+            executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        with executor as pool:
+            running = {}
+
+            def schedule(check_id):
+                blocked = [dep for dep in graph[check_id]
+                           if results[dep]['status'] in BLOCKING_STATUSES]
+                if blocked:
+                    results[check_id] = _skipped(by_id[check_id], '前置检查未通过: ' + ', '.join(sorted(blocked)))
+                    release(check_id)
+                    return
+                if cache is not None and check_id not in UNCACHEABLE:
+                    cached = cache.lookup(check_id, by_id[check_id]['code_hash'])
+                    if cached is not None:
+                        cached['cached'] = True
+                        results[check_id] = cached
+                        release(check_id)
+                        return
+                running[pool.submit(run_check, by_id[check_id], stdout, profiler)] = check_id
+
+            def release(check_id):
+                for child in dependents[check_id]:
+                    pending[child].discard(check_id)
+                    if not pending[child] and child not in results:
+                        schedule(child)
+
+            for check_id in [cid for cid, deps in pending.items() if not deps]:
+                schedule(check_id)
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    check_id = running.pop(future)
+                    result = future.result()
+                    results[check_id] = result
+                    if cache is not None and _cacheable(result):
+                        cache.store(check_id, by_id[check_id]['code_hash'], result['inputs'], result)
+                    release(check_id)
+    finally:
+        sys.stdout = stdout._fallback
+        if cache is not None:
+            cache.save()
+
+    for check_id in graph:
+        if check_id not in results:
+            results[check_id] = _skipped(by_id[check_id], '依赖关系存在循环')
+    return [results[check['id']] for check in checks]
+
+
+STATUS_ICONS = {
+    'passed': '✅',
+    'done': 'ℹ️',
+    'failed': '❌',
+    'error': '💥',
+    'skipped': '⏭️',
+}
+
+
+def print_report(results, import_errors, elapsed, verbose=False):
+    """打印检查结果汇总"""
+    print("🚀 统一检查运行器")
+    print("=" * 60)
+
+    for item in import_errors:
+        print(f"💥 无法导入 {item['module']}: {item['error']}")
+
+    for result in results:
+        icon = STATUS_ICONS[result['status']]
+        if result['cached']:
+            print(f"{icon} {result['id']} (♻️ 缓存)")
+        else:
+            print(f"{icon} {result['id']} ({result['duration'] * 1000:.1f}ms)")
+        if result['error']:
+            print(f"     {result['error']}")
+        if verbose and result['output'].strip():
+            for line in result['output'].rstrip().splitlines():
+                print(f"     | {line}")
+
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    serial = sum(result['duration'] for result in results if not result['cached'])
+    cached = sum(1 for result in results if result['cached'])
+
+    print("=" * 60)
+    print("📋 结果汇总: " + ", ".join(f"{STATUS_ICONS[s]} {s} {n}" for s, n in counts.items()))
+    if cached:
+        print(f"♻️ {cached} 个检查的输入未变化，已回放缓存结果")
+    print(f"⏱️ 总耗时 {elapsed:.2f}s（各检查耗时之和 {serial:.2f}s）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='并行运行所有工作流检查')
+    parser.add_argument('-m', '--module', action='append', dest='modules',
+                        help='只运行指定脚本中的检查（可重复）')
+    parser.add_argument('-k', '--select', action='append', default=[],
+                        help='只运行ID包含该子串的检查（可重复）')
+    parser.add_argument('-w', '--workers', type=int, default=8, help='并行线程数')
+    parser.add_argument('-v', '--verbose', action='store_true', help='显示每个检查的输出')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    parser.add_argument('--no-cache', action='store_true', help='不使用增量结果缓存')
+    parser.add_argument('--cache-file', default=CACHE_FILE, help='结果缓存文件路径')
+    parser.add_argument('--profile', action='store_true',
+                        help='记录每个检查的耗时、内存峰值和读取量（串行运行）')
+    args = parser.parse_args(argv)
+
+    checks, import_errors = discover_checks(args.modules)
+    if args.select:
+        checks = [c for c in checks if any(s in c['id'] for s in args.select)]
+
+    cache = None if args.no_cache else ResultCache(args.cache_file)
+
+    # 内存峰值是进程级的，剖析时run_checks在主线程逐个运行检查
+    profiler = check_profiler.Profiler() if args.profile else contextlib.nullcontext()
+
+    start = time.perf_counter()
+    with profiler:
+        results = run_checks(checks, workers=args.workers, cache=cache,
+                             profiler=profiler if args.profile else None)
+    elapsed = time.perf_counter() - start
+
+    profile = None
+    if args.profile:
+        statuses = {result['id']: result['status'] for result in results}
+        for record in profiler.records:
+            record['status'] = statuses.get(record['id'])
+        profile = check_profiler.save(profiler, {'elapsed': round(elapsed, 6)})
+
+    if args.json:
+        output = {
+            'elapsed': round(elapsed, 6),
+            'import_errors': import_errors,
+            'results': results,
+        }
+        if profile is not None:
+            output['profile'] = profile
+        json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(results, import_errors, elapsed, verbose=args.verbose)
+        if profile is not None:
+            check_profiler.print_report(profile)
+
+    failed = import_errors or any(r['status'] in ('failed', 'error') for r in results)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
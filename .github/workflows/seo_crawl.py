@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+基于sitemap.xml的多页面SEO检查
+流式解析sitemap.xml，把每个<loc>映射到本地文件，用进程池并行运行
+check_html_structure、check_content_structure、check_meta_content，输出逐页结果矩阵
+
+用法（在站点根目录下运行）:
+    python3 seo_crawl.py
+    python3 seo_crawl.py --sitemap sitemap.xml --workers 4 --json
+"""
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+# 每个页面运行的检查: (函数名, 显示名称)
+PAGE_CHECKS = [
+    ('check_html_structure', 'HTML/SEO元素'),
+    ('check_content_structure', '内容结构'),
+    ('check_meta_content', 'Meta内容'),
+]
+
+
+def _open_sitemap(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def iter_sitemap_urls(path, root='.', _visited=None):
+    """流式读取sitemap中所有页面的<loc>；sitemap索引会继续读取本地的子sitemap
+
+    重复或循环引用的子sitemap只读取一次
+    """
+    visited = set() if _visited is None else _visited
+    key = os.path.realpath(path)
+    if key in visited:
+        return
+    visited.add(key)
+    with _open_sitemap(path) as f:
+        for _, element in ET.iterparse(f, events=('end',)):
+            if element.tag == SITEMAP_NS + 'url':
+                loc = element.find(SITEMAP_NS + 'loc')
+                if loc is not None and loc.text:
+                    yield loc.text.strip()
+                element.clear()
+            elif element.tag == SITEMAP_NS + 'sitemap':
+                loc = element.find(SITEMAP_NS + 'loc')
+                element.clear()
+                if loc is None or not loc.text:
+                    continue
+                child = os.path.join(root, urlparse(loc.text.strip()).path.lstrip('/'))
+                if os.path.exists(child):
+                    yield from iter_sitemap_urls(child, root, visited)
+
+
+def map_to_local(loc, root='.'):
+    """把sitemap中的URL映射到本地HTML文件，找不到时返回None"""
+    url_path = urlparse(loc).path.lstrip('/')
+    if not url_path or url_path.endswith('/'):
+        candidates = [url_path + 'index.html']
+    else:
+        candidates = [url_path, url_path + '.html', url_path + '/index.html']
+    for candidate in candidates:
+        local = os.path.join(root, candidate)
+        if os.path.isfile(local):
+            return local
+    return None
+
+
+def check_page(path):
+    """在工作进程中对单个页面运行所有检查，返回 {函数名: {'passed', 'output', 'error'}}"""
+    import seo_verification
+
+    results = {}
+    for func_name, _ in PAGE_CHECKS:
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                passed = getattr(seo_verification, func_name)(path)
+            error = None
+        except Exception as e:
+            passed = False
+            error = f'{type(e).__name__}: {e}'
+        results[func_name] = {'passed': bool(passed), 'output': buffer.getvalue(), 'error': error}
+    return results
+
+
+def crawl(sitemap='sitemap.xml', root='.', workers=None):
+    """检查sitemap中的所有页面，返回按sitemap顺序排列的逐页结果"""
+    pages = []
+    seen = set()
+    for loc in iter_sitemap_urls(os.path.join(root, sitemap), root):
+        if loc in seen:
+            continue
+        seen.add(loc)
+        pages.append({'loc': loc, 'path': map_to_local(loc, root), 'checks': None})
+
+    local_pages = [page for page in pages if page['path']]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for page, checks in zip(local_pages, pool.map(check_page, [p['path'] for p in local_pages])):
+            page['checks'] = checks
+    return pages
+
+
+def print_matrix(pages):
+    """打印逐页检查结果矩阵"""
+    print("🕸️ 多页面SEO检查")
+    print("=" * 60)
+
+    header = ['页面'] + [label for _, label in PAGE_CHECKS]
+    rows = []
+    for page in pages:
+        row = [urlparse(page['loc']).path or '/']
+        if page['checks'] is None:
+            row += ['—'] * len(PAGE_CHECKS)
+        else:
+            row += ['✅' if page['checks'][name]['passed'] else '❌' for name, _ in PAGE_CHECKS]
+        rows.append(row)
+
+    widths = [max(len(str(r[i])) for r in rows + [header]) for i in range(len(header))]
+    print('  '.join(h.ljust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        print('  '.join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+    missing = [page['loc'] for page in pages if page['checks'] is None]
+    if missing:
+        print("\n⚠️ 以下URL没有对应的本地页面（—）:")
+        for loc in missing:
+            print(f"  • {loc}")
+
+    for page in pages:
+        for name, _ in PAGE_CHECKS:
+            result = (page['checks'] or {}).get(name)
+            if result and result['error']:
+                print(f"💥 {page['loc']} {name}: {result['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按sitemap.xml检查所有页面的SEO元素')
+    parser.add_argument('--sitemap', default='sitemap.xml', help='sitemap文件（相对于站点根目录）')
+    parser.add_argument('--root', default='.', help='站点根目录')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='进程数（默认CPU核数）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    pages = crawl(args.sitemap, args.root, args.workers)
+
+    if args.json:
+        json.dump(pages, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_matrix(pages)
+
+    failed = any(
+        page['checks'] is None or not all(r['passed'] for r in page['checks'].values())
+        for page in pages
+    )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
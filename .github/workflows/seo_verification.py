@@ -5,35 +5,48 @@ SEO优化验证脚本
 """
 
 import re
-from pathlib import Path
 
-def check_html_structure():
+import site_cache
+from pattern_rules import RuleSet
+
+# 基本SEO元素
+SEO_RULES = RuleSet([
+    (r'<title>.*photo.*editor.*</title>', '优化后的Title标签'),
+    (r'<meta name="description"', 'Meta Description'),
+    (r'<meta name="keywords"', 'Meta Keywords'),
+    (r'<meta name="robots"', 'Robots标签'),
+    (r'<link rel="canonical"', 'Canonical URL'),
+    (r'<meta property="og:', 'Open Graph标签'),
+    (r'<meta name="twitter:', 'Twitter Cards'),
+    (r'application/ld\+json', '结构化数据'),
+    (r'@type.*WebApplication', 'WebApplication Schema'),
+    (r'@type.*BreadcrumbList', 'BreadcrumbList Schema'),
+    (r'aria-labelledby', 'ARIA标签'),
+    (r'role="navigation"|role="main"|role="banner"', '语义化标签'),
+    (r'skip-nav', 'Skip Navigation'),
+], re.IGNORECASE)
+
+# 内容元素
+CONTENT_RULES = RuleSet([
+    (r'hero-section', 'Hero Section'),
+    (r'features-section', 'Features Section'),
+    (r'faq-section', 'FAQ Section'),
+    (r'main-footer', 'Footer Section'),
+    (r'<h1>', 'H1标题'),
+    (r'<h[2-4]>', '子标题结构'),
+    (r'feature-card', '功能卡片'),
+    (r'faq-item', 'FAQ项目'),
+])
+
+def check_html_structure(path='index.html'):
     """检查HTML结构和SEO元素"""
     print("🔍 检查HTML结构和SEO元素...")
     
-    with open('index.html', 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 检查基本SEO元素
-    seo_checks = [
-        (r'<title>.*photo.*editor.*</title>', '优化后的Title标签'),
-        (r'<meta name="description"', 'Meta Description'),
-        (r'<meta name="keywords"', 'Meta Keywords'),
-        (r'<meta name="robots"', 'Robots标签'),
-        (r'<link rel="canonical"', 'Canonical URL'),
-        (r'<meta property="og:', 'Open Graph标签'),
-        (r'<meta name="twitter:', 'Twitter Cards'),
-        (r'application/ld\+json', '结构化数据'),
-        (r'@type.*WebApplication', 'WebApplication Schema'),
-        (r'@type.*BreadcrumbList', 'BreadcrumbList Schema'),
-        (r'aria-labelledby', 'ARIA标签'),
-        (r'role="navigation"|role="main"|role="banner"', '语义化标签'),
-        (r'skip-nav', 'Skip Navigation'),
-    ]
+    content = site_cache.read_text(path)
     
     all_passed = True
-    for pattern, description in seo_checks:
-        if re.search(pattern, content, re.IGNORECASE):
+    for _, description, offset in SEO_RULES.matches(content):
+        if offset is not None:
             print(f"  ✅ {description}")
         else:
             print(f"  ❌ {description}")
@@ -41,28 +54,15 @@ def check_html_structure():
     
     return all_passed
 
-def check_content_structure():
+def check_content_structure(path='index.html'):
     """检查内容结构"""
     print("\n📝 检查内容结构...")
     
-    with open('index.html', 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # 检查内容元素
-    content_checks = [
-        (r'hero-section', 'Hero Section'),
-        (r'features-section', 'Features Section'),
-        (r'faq-section', 'FAQ Section'),
-        (r'main-footer', 'Footer Section'),
-        (r'<h1>', 'H1标题'),
-        (r'<h[2-4]>', '子标题结构'),
-        (r'feature-card', '功能卡片'),
-        (r'faq-item', 'FAQ项目'),
-    ]
+    content = site_cache.read_text(path)
     
     all_passed = True
-    for pattern, description in content_checks:
-        if re.search(pattern, content):
+    for _, description, offset in CONTENT_RULES.matches(content):
+        if offset is not None:
             print(f"  ✅ {description}")
         else:
             print(f"  ❌ {description}")
@@ -82,7 +82,7 @@ def check_technical_files():
     
     all_passed = True
     for filename, description in required_files:
-        if Path(filename).exists():
+        if site_cache.exists(filename):
             print(f"  ✅ {description}")
         else:
             print(f"  ❌ {description}")
@@ -94,8 +94,7 @@ def check_css_styles():
     """检查CSS样式"""
     print("\n🎨 检查CSS样式...")
     
-    with open('styles/main.css', 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = site_cache.read_text('styles/main.css')
     
     # 检查新添加的CSS类
     css_checks = [
@@ -122,8 +121,7 @@ def check_javascript():
     """检查JavaScript功能"""
     print("\n⚙️ 检查JavaScript功能...")
     
-    with open('index.html', 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = site_cache.read_text('index.html')
     
     # 检查FAQ功能
     if 'initializeFAQ()' in content:
@@ -140,12 +138,11 @@ def check_javascript():
     
     return True
 
-def check_meta_content():
+def check_meta_content(path='index.html'):
     """检查Meta标签内容质量"""
     print("\n📊 检查Meta标签内容...")
     
-    with open('index.html', 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = site_cache.read_text(path)
     
     # 提取title和description
     title_match = re.search(r'<title>(.*?)</title>', content)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+站点文件共享文档缓存
+每个站点文件在进程内只读取、解析一次，供所有检查脚本共用
+"""
+
+import bisect
+import contextlib
+import os
+import threading
+
+# 缓存: 绝对路径 -> Document，Document.key 为 (mtime_ns, size)
+_documents = {}
+_lock = threading.Lock()
+
+# 当前线程正在记录的输入文件集合（见 track()）
+_tracking = threading.local()
+
+
+class Document:
+    """已加载的站点文件：原始文本、行索引和按需构建的BeautifulSoup树"""
+
+    def __init__(self, path, text, key):
+        self.path = path
+        self.text = text
+        self.key = key
+        self._line_starts = None
+        self._soup = None
+        self._lock = threading.Lock()
+
+    @property
+    def line_starts(self):
+        """每一行起始字符的偏移量"""
+        if self._line_starts is None:
+            starts = [0]
+            find = self.text.find
+            pos = find('\n')
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = find('\n', pos + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    def line_of(self, offset):
+        """字符偏移量对应的行号（从1开始）"""
+        return bisect.bisect_right(self.line_starts, offset)
+
+    @property
+    def soup(self):
+        """BeautifulSoup树，首次访问时解析"""
+        with self._lock:
+            if self._soup is None:
+                from bs4 import BeautifulSoup
+                self._soup = BeautifulSoup(self.text, 'html.parser')
+            return self._soup
+
+
+@contextlib.contextmanager
+def track():
+    """记录当前线程在with块内通过本模块访问过的文件（绝对路径集合）"""
+    paths = set()
+    previous = getattr(_tracking, 'paths', None)
+    _tracking.paths = paths
+    try:
+        yield paths
+    finally:
+        _tracking.paths = previous
+        if previous is not None:
+            previous.update(paths)
+
+
+def _record(abs_path):
+    paths = getattr(_tracking, 'paths', None)
+    if paths is not None:
+        paths.add(abs_path)
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load(path):
+    """返回path对应的Document；文件的mtime或大小变化后自动重新读取"""
+    abs_path = os.path.abspath(path)
+    _record(abs_path)
+    key = _stat_key(abs_path)
+    with _lock:
+        doc = _documents.get(abs_path)
+        if doc is not None and doc.key == key:
+            return doc
+    with open(abs_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    doc = Document(abs_path, text, key)
+    with _lock:
+        _documents[abs_path] = doc
+    return doc
+
+
+def read_text(path):
+    """读取文件文本（缓存）"""
+    return load(path).text
+
+
+def iter_chunks(path, size=8192):
+    """逐块读取文件文本；已缓存的文件直接从内存分块，否则流式读取且不进入缓存"""
+    abs_path = os.path.abspath(path)
+    _record(abs_path)
+    key = _stat_key(abs_path)
+    with _lock:
+        doc = _documents.get(abs_path)
+    if doc is not None and doc.key == key:
+        text = doc.text
+        for start in range(0, len(text), size):
+            yield text[start:start + size]
+        return
+    with open(abs_path, 'r', encoding='utf-8') as f:
+        for chunk in iter(lambda: f.read(size), ''):
+            yield chunk
+
+
+def get_soup(path):
+    """获取文件的BeautifulSoup树（缓存）"""
+    return load(path).soup
+
+
+def exists(path):
+    """文件是否存在（同样记录为检查的输入）"""
+    abs_path = os.path.abspath(path)
+    _record(abs_path)
+    return os.path.exists(abs_path)
+
+
+def line_of(path, offset):
+    """文件中字符偏移量对应的行号"""
+    return load(path).line_of(offset)
+
+
+def clear():
+    """清空缓存"""
+    with _lock:
+        _documents.clear()
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+增量sitemap生成
+扫描站点的HTML页面，按内容哈希维护每个页面的lastmod: 只有页面内容变化时才更新为
+当天日期，爬虫因此只会重新抓取真正变化的页面。哈希索引保存在 .cache/sitemap_index.json
+
+- 收录的页面: 已在sitemap中且能映射到本地文件的页面，以及canonical指向自身的页面；
+  noindex或被robots.txt禁止的页面会被移除
+- 映射不到本地文件的条目（如前端路由 /editor）原样保留
+- changefreq、priority以及已有图片的title/caption保持不变
+- image:image 与页面实际引用的图片（<img>、og:image）同步
+- 超过单个sitemap的URL数或字节数上限时，拆分为gzip压缩的分片并生成sitemap索引
+
+哈希索引丢失时（例如CI的全新检出），页面的现有lastmod作为基线保留，不会被统一改成当天
+
+check_sitemap() 供 run_checks 调用，检查sitemap是否与页面内容同步
+
+用法（在站点根目录下运行）:
+    python3 sitemap_gen.py
+    python3 sitemap_gen.py --dry-run
+    python3 sitemap_gen.py --date 2025-01-31 --max-urls 1000
+"""
+
+import argparse
+import datetime
+import gzip
+import json
+import os
+import re
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from urllib import robotparser
+from urllib.parse import urljoin, urlparse
+from xml.sax.saxutils import escape
+
+import html_scan
+import site_cache
+from result_cache import file_hash
+from seo_crawl import map_to_local
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+IMAGE_NS = 'http://www.google.com/schemas/sitemap-image/1.1'
+
+INDEX_FILE = os.path.join('.cache', 'sitemap_index.json')
+
+# 索引格式变化时递增
+INDEX_VERSION = 1
+
+# sitemaps.org 规定的单个sitemap上限（未压缩字节数）
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+
+# 分片文件名，如 sitemap-1.xml.gz
+SHARD_NAME = 'sitemap-{}.xml.gz'
+SHARD_RE = re.compile(r'^sitemap-\d+\.xml\.gz$')
+
+SKIP_DIRS = {'node_modules', '__pycache__'}
+
+PAGE_QUERIES = [
+    html_scan.Query('canonical', tag='link', attrs={'rel': 'canonical', 'href': True}),
+    html_scan.Query('robots', tag='meta', attrs={'name': lambda name: name.lower() == 'robots',
+                                                 'content': True}),
+    html_scan.Query('og_image', tag='meta', attrs={'property': 'og:image', 'content': True}),
+    html_scan.Query('og_image_alt', tag='meta', attrs={'property': 'og:image:alt', 'content': True}),
+    html_scan.Query('images', tag='img', attrs={'src': True}, find_all=True),
+]
+
+
+# ---- 读取现有sitemap ----
+
+def _open_sitemap(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _child_text(element, tag):
+    child = element.find(tag)
+    return child.text.strip() if child is not None and child.text else None
+
+
+def read_sitemap(path, root='.', _visited=None):
+    """读取sitemap（或sitemap索引及其本地分片）中的全部条目
+
+    每个条目为 {'loc', 'lastmod', 'changefreq', 'priority', 'images': [{'loc', 'title', 'caption'}]}
+    索引中重复或循环引用的sitemap只读取一次
+    """
+    entries = []
+    visited = set() if _visited is None else _visited
+    key = os.path.realpath(path)
+    if key in visited:
+        return entries
+    visited.add(key)
+    # 通过site_cache检查存在性，sitemap文件会被记录为检查的输入
+    if not site_cache.exists(path):
+        return entries
+    with _open_sitemap(path) as f:
+        for _, element in ET.iterparse(f, events=('end',)):
+            if element.tag == f'{{{SITEMAP_NS}}}url':
+                images = []
+                for image in element.findall(f'{{{IMAGE_NS}}}image'):
+                    images.append({
+                        'loc': _child_text(image, f'{{{IMAGE_NS}}}loc'),
+                        'title': _child_text(image, f'{{{IMAGE_NS}}}title'),
+                        'caption': _child_text(image, f'{{{IMAGE_NS}}}caption'),
+                    })
+                entries.append({
+                    'loc': _child_text(element, f'{{{SITEMAP_NS}}}loc'),
+                    'lastmod': _child_text(element, f'{{{SITEMAP_NS}}}lastmod'),
+                    'changefreq': _child_text(element, f'{{{SITEMAP_NS}}}changefreq'),
+                    'priority': _child_text(element, f'{{{SITEMAP_NS}}}priority'),
+                    'images': [image for image in images if image['loc']],
+                })
+                element.clear()
+            elif element.tag == f'{{{SITEMAP_NS}}}sitemap':
+                loc = _child_text(element, f'{{{SITEMAP_NS}}}loc')
+                element.clear()
+                if loc:
+                    child = os.path.join(root, urlparse(loc).path.lstrip('/'))
+                    entries.extend(read_sitemap(child, root, visited))
+    return [entry for entry in entries if entry['loc']]
+
+
+# ---- 页面 ----
+
+def find_pages(root='.'):
+    """站点中的HTML页面（规范化的相对路径），跳过隐藏目录"""
+    pages = []
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS)
+        for name in sorted(files):
+            if name.lower().endswith(('.html', '.htm')) and not name.startswith('.'):
+                pages.append(os.path.normpath(os.path.join(directory, name)))
+    return pages
+
+
+def scan_page(path, page_url=None):
+    """页面的canonical、是否noindex和引用的图片 [(绝对URL, 标题或None)]"""
+    found = html_scan.scan_file(path, PAGE_QUERIES)
+    canonical = found['canonical'].get('href').strip() if found['canonical'] else None
+    base = page_url or canonical or ''
+    robots = found['robots'].get('content').lower() if found['robots'] else ''
+
+    images = []
+    seen = set()
+
+    def add(src, title):
+        src = (src or '').strip()
+        if not src or src.startswith('data:'):
+            return
+        url = urljoin(base, src)
+        if url not in seen:
+            seen.add(url)
+            images.append((url, title or None))
+
+    if found['og_image']:
+        add(found['og_image'].get('content'),
+            found['og_image_alt'].get('content') if found['og_image_alt'] else None)
+    for element in found['images']:
+        add(element.get('src'), element.get('alt'))
+    return {
+        'canonical': canonical,
+        'noindex': 'noindex' in {part.strip() for part in robots.split(',')},
+        'images': images,
+    }
+
+
+def load_robots(root='.'):
+    """本地robots.txt的解析器，没有robots.txt时返回None"""
+    path = os.path.join(root, 'robots.txt')
+    if not site_cache.exists(path):
+        return None
+    parser = robotparser.RobotFileParser()
+    parser.parse(site_cache.read_text(path).splitlines())
+    return parser
+
+
+def _same_page(loc, path, root):
+    local = map_to_local(loc, root)
+    return local is not None and os.path.normpath(local) == os.path.normpath(path)
+
+
+# ---- 哈希索引 ----
+
+def load_index(path=INDEX_FILE):
+    # 记录为检查的输入: 索引更新后check_sitemap的缓存结果随之失效
+    site_cache.exists(path)
+    try:
+        with open(path, encoding='utf-8') as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return index if index.get('version') == INDEX_VERSION else {}
+
+
+def _write_bytes(path, data):
+    """原子写入，服务器和爬虫不会读到写了一半的sitemap"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp创建的文件权限是0600，改为普通文件的默认权限以便静态服务器读取
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def save_index(index, path=INDEX_FILE):
+    index['version'] = INDEX_VERSION
+    _write_bytes(path, (json.dumps(index, ensure_ascii=False, indent=2) + '\n').encode('utf-8'))
+
+
+# ---- 生成条目 ----
+
+def _sync_images(existing, referenced):
+    """按页面实际引用的图片生成image条目，已有图片保留原来的title和caption"""
+    previous = {image['loc']: image for image in existing}
+    images = []
+    for url, title in referenced:
+        image = previous.get(url)
+        images.append(dict(image) if image else {'loc': url, 'title': title, 'caption': None})
+    return images
+
+
+def build_entries(root='.', sitemap_path='sitemap.xml', index=None, today=None):
+    """计算新的sitemap条目
+
+    返回 (条目列表, 页面报告, 新的哈希索引)；报告中每项为 {'loc', 'path', 'status'}，
+    status为 added / updated / unchanged / baseline / unmapped / removed / skipped
+    """
+    today = today or datetime.date.today().isoformat()
+    pages_index = dict((index or {}).get('pages', {}))
+    existing = read_sitemap(os.path.join(root, sitemap_path), root)
+    robots = load_robots(root)
+
+    report = []
+    entries = []
+    new_pages = {}
+
+    # 现有条目对应的本地页面
+    listed = {}
+    for entry in existing:
+        local = map_to_local(entry['loc'], root)
+        if local is not None:
+            listed.setdefault(os.path.normpath(local), entry)
+
+    candidates = {}
+    for path in find_pages(root):
+        entry = listed.get(path)
+        info = scan_page(path, entry['loc'] if entry else None)
+        if entry is not None:
+            loc = entry['loc']
+        elif info['canonical'] and _same_page(info['canonical'], path, root):
+            loc = info['canonical']
+        else:
+            continue
+        if info['noindex'] or (robots is not None and not robots.can_fetch('*', loc)):
+            report.append({'loc': loc, 'path': path, 'status': 'removed' if entry else 'skipped'})
+            continue
+        candidates[loc] = (path, info, entry)
+
+    def page_entry(loc, path, info, entry):
+        digest = file_hash(path)
+        previous = pages_index.get(loc)
+        if previous is not None and previous['hash'] == digest:
+            lastmod, status = previous['lastmod'], 'unchanged'
+        elif previous is None and entry is not None and entry['lastmod']:
+            # 索引中没有记录: 以现有lastmod为基线，下次内容变化时再更新
+            lastmod, status = entry['lastmod'], 'baseline'
+        else:
+            lastmod, status = today, 'updated' if entry is not None else 'added'
+        new_pages[loc] = {'hash': digest, 'lastmod': lastmod, 'path': path}
+        report.append({'loc': loc, 'path': path, 'status': status})
+        return {
+            'loc': loc,
+            'lastmod': lastmod,
+            'changefreq': entry['changefreq'] if entry else None,
+            'priority': entry['priority'] if entry else None,
+            'images': _sync_images(entry['images'] if entry else [], info['images']),
+        }
+
+    # 保持现有条目的顺序，新页面按路径排在最后
+    for entry in existing:
+        if entry['loc'] in candidates:
+            entries.append(page_entry(entry['loc'], *candidates.pop(entry['loc'])))
+        elif map_to_local(entry['loc'], root) is not None:
+            continue
+        elif entry['loc'] in pages_index:
+            # 以前有本地页面，现在文件已被删除
+            report.append({'loc': entry['loc'], 'path': pages_index[entry['loc']]['path'], 'status': 'removed'})
+        else:
+            entries.append(entry)
+            report.append({'loc': entry['loc'], 'path': None, 'status': 'unmapped'})
+    for loc, (path, info, entry) in sorted(candidates.items(), key=lambda item: item[1][0]):
+        entries.append(page_entry(loc, path, info, entry))
+
+    return entries, report, {'pages': new_pages}
+
+
+# ---- 输出 ----
+
+def _render_url(entry):
+    lines = ['    <url>', f"        <loc>{escape(entry['loc'])}</loc>"]
+    for field in ('lastmod', 'changefreq', 'priority'):
+        if entry[field]:
+            lines.append(f"        <{field}>{escape(entry[field])}</{field}>")
+    for image in entry['images']:
+        lines.append('        <image:image>')
+        for field in ('loc', 'title', 'caption'):
+            if image[field]:
+                lines.append(f"            <image:{field}>{escape(image[field])}</image:{field}>")
+        lines.append('        </image:image>')
+    lines.append('    </url>')
+    return '\n'.join(lines) + '\n'
+
+
+URLSET_HEAD = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               f'<urlset xmlns="{SITEMAP_NS}"\n'
+               f'        xmlns:image="{IMAGE_NS}">\n')
+URLSET_TAIL = '</urlset>\n'
+
+
+def shard_entries(entries, max_urls=MAX_URLS, max_bytes=MAX_BYTES):
+    """按URL数和字节数上限把条目分组，返回 [(urlset文本, 条目列表)]"""
+    overhead = len(URLSET_HEAD.encode('utf-8')) + len(URLSET_TAIL.encode('utf-8'))
+    shards = []
+    chunks, group, size = [], [], overhead
+    for entry in entries:
+        chunk = _render_url(entry)
+        chunk_size = len(chunk.encode('utf-8'))
+        if group and (len(group) >= max_urls or size + chunk_size > max_bytes):
+            shards.append((URLSET_HEAD + ''.join(chunks) + URLSET_TAIL, group))
+            chunks, group, size = [], [], overhead
+        chunks.append(chunk)
+        group.append(entry)
+        size += chunk_size
+    shards.append((URLSET_HEAD + ''.join(chunks) + URLSET_TAIL, group))
+    return shards
+
+
+def render_sitemaps(entries, base_url, sitemap_path='sitemap.xml', max_urls=MAX_URLS, max_bytes=MAX_BYTES):
+    """生成要写入的文件 {相对路径: 字节}；只有一个分片时直接写sitemap.xml"""
+    shards = shard_entries(entries, max_urls, max_bytes)
+    if len(shards) == 1:
+        return {sitemap_path: shards[0][0].encode('utf-8')}
+
+    directory = os.path.dirname(sitemap_path)
+    files = {}
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             f'<sitemapindex xmlns="{SITEMAP_NS}">']
+    for number, (text, group) in enumerate(shards, 1):
+        name = SHARD_NAME.format(number)
+        files[os.path.join(directory, name)] = gzip.compress(text.encode('utf-8'), compresslevel=9, mtime=0)
+        lines.append('    <sitemap>')
+        lines.append(f"        <loc>{escape(urljoin(base_url, name))}</loc>")
+        lastmods = [entry['lastmod'] for entry in group if entry['lastmod']]
+        if lastmods:
+            lines.append(f"        <lastmod>{max(lastmods)}</lastmod>")
+        lines.append('    </sitemap>')
+    lines.append('</sitemapindex>')
+    files[sitemap_path] = ('\n'.join(lines) + '\n').encode('utf-8')
+    return files
+
+
+def _stale_shards(root, files, sitemap_path):
+    """上次生成、这次不再需要的分片文件"""
+    directory = os.path.join(root, os.path.dirname(sitemap_path))
+    keep = {os.path.basename(path) for path in files}
+    try:
+        names = os.listdir(directory or '.')
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names if SHARD_RE.match(name) and name not in keep]
+
+
+def default_base_url(entries, sitemap_path='sitemap.xml'):
+    """分片的URL前缀: 与sitemap位于同一站点目录"""
+    for entry in entries:
+        parsed = urlparse(entry['loc'])
+        if parsed.scheme and parsed.netloc:
+            directory = os.path.dirname(sitemap_path)
+            return f"{parsed.scheme}://{parsed.netloc}/{directory + '/' if directory else ''}"
+    return '/'
+
+
+def generate(root='.', sitemap_path='sitemap.xml', today=None, base_url=None,
+             max_urls=MAX_URLS, max_bytes=MAX_BYTES, dry_run=False):
+    """生成sitemap，返回报告；dry_run时不写任何文件"""
+    index_path = os.path.join(root, INDEX_FILE)
+    entries, pages, new_index = build_entries(root, sitemap_path, load_index(index_path), today)
+    files = render_sitemaps(entries, base_url or default_base_url(entries, sitemap_path),
+                            sitemap_path, max_urls, max_bytes)
+
+    written = []
+    for path, data in files.items():
+        full_path = os.path.join(root, path)
+        try:
+            with open(full_path, 'rb') as f:
+                if f.read() == data:
+                    continue
+        except FileNotFoundError:
+            pass
+        written.append(path)
+        if not dry_run:
+            _write_bytes(full_path, data)
+    removed = _stale_shards(root, files, sitemap_path)
+    if not dry_run:
+        for path in removed:
+            os.remove(path)
+        save_index(new_index, index_path)
+
+    return {
+        'pages': pages,
+        'urls': len(entries),
+        'files': sorted(files),
+        'written': written,
+        'removed_files': sorted(os.path.relpath(path, root) for path in removed),
+        'sharded': len(files) > 1,
+    }
+
+
+STATUS_MESSAGES = {
+    'added': '🆕 新增',
+    'updated': '✏️ 已更新',
+    'unchanged': '✅ 未变化',
+    'baseline': '📌 建立基线',
+    'unmapped': '🔗 保留（无本地页面）',
+    'removed': '🗑️ 已移除',
+    'skipped': '⏭️ 跳过（noindex或robots.txt禁止）',
+}
+
+
+def print_report(report, dry_run=False):
+    """打印结果"""
+    print("🗺️ Sitemap生成")
+    print("=" * 60)
+    for page in report['pages']:
+        path = f" ({page['path']})" if page['path'] else ''
+        print(f"  {STATUS_MESSAGES[page['status']]}: {page['loc']}{path}")
+    print("=" * 60)
+    layout = f"{len(report['files']) - 1} 个分片 + 索引" if report['sharded'] else '单个文件'
+    print(f"📋 共 {report['urls']} 个URL，{layout}")
+    verb = '需要写入' if dry_run else '已写入'
+    if report['written']:
+        print(f"💾 {verb}: {', '.join(report['written'])}")
+    else:
+        print("✅ sitemap已是最新")
+    if report['removed_files']:
+        print(f"🗑️ {'需要删除' if dry_run else '已删除'}旧分片: {', '.join(report['removed_files'])}")
+
+
+# ---- 检查 ----
+
+def check_sitemap():
+    """检查sitemap与页面内容同步（lastmod、收录的页面和图片）
+
+    按条目比较而不是逐字节比较，手工编辑留下的注释和空行不算差异
+    """
+    print("🗺️ 检查sitemap同步...")
+    entries, pages, _ = build_entries(index=load_index())
+    changed = [page for page in pages if page['status'] in ('added', 'updated', 'removed')]
+    for page in changed:
+        print(f"  ❌ {STATUS_MESSAGES[page['status']]}: {page['loc']}")
+    if changed or entries != read_sitemap('sitemap.xml'):
+        print("  ❌ sitemap与页面内容不同步，请运行: python3 sitemap_gen.py")
+        return False
+    print(f"  ✅ sitemap已是最新（{len(entries)} 个URL）")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按页面内容哈希增量生成sitemap')
+    parser.add_argument('--root', default='.', help='站点根目录')
+    parser.add_argument('--sitemap', default='sitemap.xml', help='sitemap文件（相对于站点根目录）')
+    parser.add_argument('--date', default=None, help='变化页面的lastmod，默认今天（YYYY-MM-DD）')
+    parser.add_argument('--base-url', default=None, help='分片文件的URL前缀，默认取自页面URL')
+    parser.add_argument('--max-urls', type=int, default=MAX_URLS, help='单个sitemap的URL数上限')
+    parser.add_argument('--max-bytes', type=int, default=MAX_BYTES, help='单个sitemap的字节数上限（未压缩）')
+    parser.add_argument('--dry-run', action='store_true', help='只显示会做的修改，不写文件')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+
+    if args.date is not None:
+        try:
+            datetime.date.fromisoformat(args.date)
+        except ValueError:
+            print(f"❌ 日期格式错误: {args.date}（应为YYYY-MM-DD）")
+            return 1
+
+    report = generate(args.root, args.sitemap, args.date, args.base_url,
+                      args.max_urls, args.max_bytes, args.dry_run)
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(report, args.dry_run)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+本地静态服务器的冒烟/压力测试
+抓取首页及 index.html 引用的全部脚本、样式、预加载、manifest和图标，
+以可配置的并发模拟一批首次访问，统计每个URL的 p50/p95/p99 延迟、传输字节数和失败次数
+
+每个工作线程持有一个keep-alive连接并在所有请求间复用
+
+用法:
+    python3 smoke_test.py                                # 测试 http://localhost:8000
+    python3 smoke_test.py --concurrency 16 --rounds 20   # 更大的突发负载
+    python3 smoke_test.py --json
+    python3 smoke_test.py --serve                        # 在随机端口启动static_server后测试当前目录
+"""
+
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import html_scan
+import static_server
+
+# 不会真正下载资源的link类型
+NON_FETCH_RELS = {'preconnect', 'dns-prefetch', 'canonical', 'alternate'}
+
+ASSET_QUERIES = [
+    html_scan.Query('scripts', tag='script', attrs={'src': True}, find_all=True),
+    html_scan.Query('links', tag='link', attrs={'href': True}, find_all=True),
+]
+
+
+def percentile(values, pct):
+    """最近秩百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class ConnectionPool:
+    """每个线程一个keep-alive HTTP连接"""
+
+    def __init__(self, base_url, timeout=10, headers=None):
+        parsed = urlparse(base_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self._local = threading.local()
+        self.connections_opened = 0
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+            with self._lock:
+                self.connections_opened += 1
+                self._connections.add(conn)
+        return conn
+
+    def _discard(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            with self._lock:
+                self._connections.discard(conn)
+        self._local.conn = None
+
+    def close(self):
+        """关闭所有线程打开的连接"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+
+    def get(self, path):
+        """发送GET请求，返回 (状态码, 响应体)；连接被服务器关闭时重连一次"""
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request('GET', path, headers=self.headers)
+                response = conn.getresponse()
+                body = response.read()
+                if response.will_close:
+                    self._discard()
+                return response.status, body
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self._discard()
+                if attempt:
+                    raise
+            except Exception:
+                self._discard()
+                raise
+
+
+def discover_assets(base_url, html):
+    """从首页HTML中找出同源的可下载资源路径，返回 (路径列表, 跳过的外部URL列表)"""
+    found = html_scan.scan_text(html, ASSET_QUERIES)
+    refs = [element.get('src') for element in found['scripts']]
+    for element in found['links']:
+        rels = set(element.get('rel', '').lower().split())
+        if rels and rels <= NON_FETCH_RELS:
+            continue
+        refs.append(element.get('href'))
+
+    base = urlparse(base_url)
+    paths = []
+    external = []
+    for ref in refs:
+        url = urljoin(base_url.rstrip('/') + '/', ref)
+        parsed = urlparse(url)
+        if parsed.netloc != base.netloc:
+            if url not in external:
+                external.append(url)
+            continue
+        path = parsed.path + (f'?{parsed.query}' if parsed.query else '')
+        if path not in paths:
+            paths.append(path)
+    return paths, external
+
+
+def run_burst(pool, paths, rounds, concurrency):
+    """以给定并发把每个路径请求rounds次，返回 {路径: 统计}"""
+    samples = {path: {'latencies': [], 'bytes': 0, 'failures': 0, 'statuses': {}} for path in paths}
+    lock = threading.Lock()
+    jobs = [path for path in paths for _ in range(rounds)]
+    random.shuffle(jobs)
+
+    def fetch(path):
+        start = time.perf_counter()
+        try:
+            status, body = pool.get(path)
+            error = None
+        except Exception as e:
+            status, body, error = None, b'', f'{type(e).__name__}: {e}'
+        elapsed = time.perf_counter() - start
+        with lock:
+            stats = samples[path]
+            stats['latencies'].append(elapsed)
+            stats['bytes'] += len(body)
+            key = str(status) if status else error
+            stats['statuses'][key] = stats['statuses'].get(key, 0) + 1
+            if status is None or status >= 400:
+                stats['failures'] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(fetch, jobs))
+    return samples
+
+
+def summarize(samples):
+    """把原始样本转换为报告"""
+    report = []
+    for path, stats in samples.items():
+        latencies = stats['latencies']
+        report.append({
+            'path': path,
+            'requests': len(latencies),
+            'failures': stats['failures'],
+            'bytes': stats['bytes'],
+            'statuses': stats['statuses'],
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        })
+    return report
+
+
+def smoke_test(base_url, rounds=5, concurrency=8, timeout=10, accept_encoding='gzip, br'):
+    """执行完整的冒烟测试，返回结构化报告"""
+    headers = {'Connection': 'keep-alive'}
+    if accept_encoding:
+        headers['Accept-Encoding'] = accept_encoding
+
+    pool = ConnectionPool(base_url, timeout=timeout, headers={'Connection': 'keep-alive'})
+    start_path = urlparse(base_url).path or '/'
+    try:
+        status, body = pool.get(start_path)
+    finally:
+        pool.close()
+    if status != 200:
+        raise RuntimeError(f'首页返回状态码 {status}')
+    paths, external = discover_assets(base_url, body.decode('utf-8', errors='replace'))
+
+    burst_pool = ConnectionPool(base_url, timeout=timeout, headers=headers)
+    try:
+        start = time.perf_counter()
+        samples = run_burst(burst_pool, [start_path] + paths, rounds, concurrency)
+        elapsed = time.perf_counter() - start
+    finally:
+        burst_pool.close()
+
+    report = summarize(samples)
+    total_requests = sum(item['requests'] for item in report)
+    return {
+        'base_url': base_url,
+        'rounds': rounds,
+        'concurrency': concurrency,
+        'elapsed': round(elapsed, 6),
+        'requests': total_requests,
+        'requests_per_second': round(total_requests / elapsed, 1) if elapsed else None,
+        'bytes': sum(item['bytes'] for item in report),
+        'failures': sum(item['failures'] for item in report),
+        'connections_opened': burst_pool.connections_opened,
+        'skipped_external': external,
+        'urls': report,
+    }
+
+
+def print_report(result):
+    """打印测试报告"""
+    print("🌐 静态服务器冒烟测试")
+    print("=" * 60)
+    print(f"目标: {result['base_url']}  并发: {result['concurrency']}  每个URL请求: {result['rounds']}次")
+    print()
+    print(f"{'URL':<36} {'p50':>8} {'p95':>8} {'p99':>8} {'字节':>10} {'失败':>4}")
+    for item in result['urls']:
+        icon = '✅' if not item['failures'] else '❌'
+        print(f"{icon} {item['path'][:33]:<33} {item['p50_ms']:>7.1f}ms {item['p95_ms']:>6.1f}ms "
+              f"{item['p99_ms']:>6.1f}ms {item['bytes']:>10} {item['failures']:>4}")
+        if item['failures']:
+            print(f"     状态: {item['statuses']}")
+
+    print("=" * 60)
+    print(f"📋 {result['requests']} 个请求，{result['elapsed']:.2f}s，"
+          f"{result['requests_per_second']} 请求/秒，{result['bytes']} 字节，"
+          f"{result['connections_opened']} 个连接")
+    if result['skipped_external']:
+        print(f"⏭️ 跳过 {len(result['skipped_external'])} 个外部资源")
+    if result['failures']:
+        print(f"❌ 共 {result['failures']} 次失败")
+    else:
+        print("✅ 所有请求成功")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='并发抓取首页及其全部资源，统计延迟分布')
+    parser.add_argument('--url', default='http://localhost:8000/', help='首页URL')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='并发连接数')
+    parser.add_argument('-n', '--rounds', type=int, default=5, help='每个URL请求次数')
+    parser.add_argument('--timeout', type=float, default=10, help='单个请求超时（秒）')
+    parser.add_argument('--accept-encoding', default='gzip, br',
+                        help='请求的Accept-Encoding（空字符串表示不压缩）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    parser.add_argument('--serve', action='store_true',
+                        help='在随机端口启动static_server提供当前目录，测试完成后关闭（忽略--url）')
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if args.serve:
+        server, url = static_server.serve_in_background('.')
+    try:
+        result = smoke_test(url, args.rounds, args.concurrency, args.timeout, args.accept_encoding)
+    except Exception as e:
+        print(f"❌ 无法连接到服务器: {e}")
+        print("请先启动服务器: python3 static_server.py")
+        return 1
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    if args.json:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(result)
+    return 1 if result['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+本地预览/测试用的静态文件服务器，替代 python3 -m http.server 8000
+- 多线程处理请求，HTTP/1.1 keep-alive
+- ETag / Last-Modified 校验，条件请求返回304
+- 存在预压缩的 .br / .gz 文件时按 Accept-Encoding 直接发送（带 Vary）
+- 文件名带内容哈希的资源（build_assets的输出）发送一年期 immutable 缓存头
+- 支持单段Range请求（206/416）和If-Range
+- 文件内容通过 os.sendfile 零拷贝发送
+
+用法（在站点根目录下运行）:
+    python3 static_server.py               # http://localhost:8000
+    python3 static_server.py 8080 --bind 0.0.0.0 --directory dist
+"""
+
+import argparse
+import email.utils
+import functools
+import http.server
+import mimetypes
+import os
+import re
+import sys
+import threading
+from urllib.parse import urlsplit
+
+from build_assets import HASHED_NAME_RE
+
+DEFAULT_PORT = 8000
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# Accept-Encoding中的编码 -> 预压缩文件后缀，按优先顺序
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+# mimetypes在部分系统上缺少或猜错的类型
+EXTRA_TYPES = {
+    '.js': 'text/javascript',
+    '.mjs': 'text/javascript',
+    '.css': 'text/css',
+    '.svg': 'image/svg+xml',
+    '.webp': 'image/webp',
+    '.avif': 'image/avif',
+    '.webmanifest': 'application/manifest+json',
+    '.json': 'application/json',
+    '.xml': 'application/xml',
+    '.wasm': 'application/wasm',
+    # 直接请求预压缩文件时按压缩数据返回（mimetypes会给出解压后内容的类型）
+    '.gz': 'application/gzip',
+    '.br': 'application/octet-stream',
+}
+
+TEXT_TYPES = ('text/', 'application/javascript', 'application/json', 'application/manifest+json',
+              'application/xml', 'image/svg+xml')
+
+# 可以对外提供的点开头目录
+PUBLIC_DOT_DIRS = {'.well-known'}
+
+# 304响应中保留的头
+NOT_MODIFIED_HEADERS = {'ETag', 'Last-Modified', 'Cache-Control', 'Vary'}
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# 每次sendfile调用的最大字节数
+SENDFILE_CHUNK = 1 << 20
+
+
+def content_type(path):
+    """文件的Content-Type，文本类型附带utf-8"""
+    ext = os.path.splitext(path)[1].lower()
+    ctype = EXTRA_TYPES.get(ext) or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if ctype.startswith(TEXT_TYPES):
+        ctype += '; charset=utf-8'
+    return ctype
+
+
+def accepted_encodings(header):
+    """解析Accept-Encoding，返回q>0的编码集合"""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(name)
+    return accepted
+
+
+def parse_range(header, size):
+    """解析单段Range头
+
+    返回 (start, end)（含end）；格式无法识别或为多段时返回None（按整个文件处理）；
+    范围无法满足时返回 'unsatisfiable'
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return 'unsatisfiable'
+    return start, end
+
+
+def make_etag(st, variant=''):
+    """基于修改时间和大小的强ETag，不同编码的表示使用不同的ETag"""
+    suffix = f'-{variant}' if variant else ''
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}{suffix}"'
+
+
+def _opaque(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+def etag_matches(header, etag):
+    """If-None-Match是否包含etag（弱比较）"""
+    if header is None:
+        return False
+    if header.strip() == '*':
+        return True
+    return any(_opaque(tag) == _opaque(etag) for tag in header.split(','))
+
+
+class StaticHandler(http.server.SimpleHTTPRequestHandler):
+    """带缓存校验、预压缩和Range支持的静态文件处理器"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'PhotoEditorStatic/1.0'
+    # 头和响应体分开写出，开启Nagle时keep-alive连接上的小响应要等客户端的延迟ACK（约40ms）
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    # ---- 选择文件 ----
+
+    def _resolve(self):
+        """请求路径对应的文件；目录重定向或不存在时返回None（已发送响应）"""
+        url_path = urlsplit(self.path).path
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not url_path.endswith('/'):
+                self.send_response(301)
+                self.send_header('Location', url_path + '/')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return None
+            path = os.path.join(path, 'index.html')
+        # translate_path已去掉 .. 路径段；这里再拒绝 .git、.cache 等隐藏文件
+        relative = os.path.relpath(path, self.directory)
+        hidden = any(part.startswith('.') and part not in PUBLIC_DOT_DIRS for part in relative.split(os.sep))
+        if hidden or not os.path.isfile(path):
+            self._not_found()
+            return None
+        return path
+
+    def _select_variant(self, path):
+        """按Accept-Encoding选择预压缩文件，返回 (实际路径, 编码或None, 是否有变体)"""
+        accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+        source_mtime = os.stat(path).st_mtime_ns
+        has_variants = False
+        for encoding, suffix in PRECOMPRESSED:
+            candidate = path + suffix
+            try:
+                st = os.stat(candidate)
+            except FileNotFoundError:
+                continue
+            # 比源文件旧的压缩文件已过期，不使用
+            if st.st_mtime_ns < source_mtime:
+                continue
+            has_variants = True
+            if encoding in accepted:
+                return candidate, encoding, True
+        return path, None, has_variants
+
+    # ---- 响应 ----
+
+    def _not_found(self):
+        """404响应；send_error总是关闭连接，这里保持keep-alive"""
+        body = b'404 Not Found\n'
+        self.send_response(404)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _serve(self, send_body):
+        path = self._resolve()
+        if path is None:
+            return
+        try:
+            file_path, encoding, has_variants = self._select_variant(path)
+            f = open(file_path, 'rb')
+        except OSError:
+            self._not_found()
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            etag = make_etag(st, encoding or '')
+            last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+
+            headers = [
+                ('Content-Type', content_type(path)),
+                ('ETag', etag),
+                ('Last-Modified', last_modified),
+                ('Cache-Control', IMMUTABLE_CACHE if HASHED_NAME_RE.search(path) else REVALIDATE_CACHE),
+                ('Accept-Ranges', 'bytes'),
+            ]
+            if encoding:
+                headers.append(('Content-Encoding', encoding))
+            if has_variants:
+                headers.append(('Vary', 'Accept-Encoding'))
+
+            if self._not_modified(etag, st):
+                self.send_response(304)
+                for name, value in headers:
+                    if name in NOT_MODIFIED_HEADERS:
+                        self.send_header(name, value)
+                self.end_headers()
+                return
+
+            size = st.st_size
+            byte_range = None
+            if 'Range' in self.headers and self._if_range_matches(etag, st):
+                byte_range = parse_range(self.headers['Range'], size)
+            if byte_range == 'unsatisfiable':
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            if byte_range is None:
+                start, length = 0, size
+                self.send_response(200)
+            else:
+                start, end = byte_range
+                length = end - start + 1
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(length))
+            self.end_headers()
+            if send_body and length:
+                self._send_file(f, start, length)
+
+    def _not_modified(self, etag, st):
+        """If-None-Match优先于If-Modified-Since"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag_matches(if_none_match, etag)
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(st.st_mtime) <= since
+        return False
+
+    def _if_range_matches(self, etag, st):
+        """没有If-Range，或If-Range与当前表示一致时才处理Range"""
+        if_range = self.headers.get('If-Range')
+        if if_range is None:
+            return True
+        if if_range.strip().startswith(('"', 'W/')):
+            # If-Range要求强比较
+            return if_range.strip() == etag
+        try:
+            return int(st.st_mtime) <= email.utils.parsedate_to_datetime(if_range).timestamp()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+
+    def _send_file(self, f, start, length):
+        """用sendfile发送文件的一段，不支持时退回普通复制"""
+        self.wfile.flush()
+        offset = start
+        end = start + length
+        try:
+            out_fd = self.connection.fileno()
+            while offset < end:
+                sent = os.sendfile(out_fd, f.fileno(), offset, min(end - offset, SENDFILE_CHUNK))
+                if sent == 0:
+                    return
+                offset += sent
+            return
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except (AttributeError, OSError):
+            # 没有sendfile（如Windows）或套接字不支持，从已发送的位置继续复制
+            pass
+        f.seek(offset)
+        while offset < end:
+            chunk = f.read(min(end - offset, 64 * 1024))
+            if not chunk:
+                break
+            self.wfile.write(chunk)
+            offset += len(chunk)
+
+
+class StaticServer(http.server.ThreadingHTTPServer):
+    """每个连接一个线程；请求队列足够大，突发并发时不会拒绝连接"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, directory='.', quiet=False):
+        self.quiet = quiet
+        super().__init__(address, functools.partial(StaticHandler, directory=os.path.abspath(directory)))
+
+
+def make_server(directory='.', port=DEFAULT_PORT, bind='', quiet=False):
+    """创建服务器（未启动）；port为0时由系统分配端口"""
+    return StaticServer((bind, port), directory, quiet)
+
+
+def serve_in_background(directory='.', port=0, bind='127.0.0.1', quiet=True):
+    """在后台线程中启动服务器，返回 (server, 根URL)；用完调用 server.shutdown()"""
+    server = make_server(directory, port, bind, quiet)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f'http://{host}:{port}/'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地静态文件服务器（缓存校验、预压缩、Range、sendfile）')
+    parser.add_argument('port', nargs='?', type=int, default=DEFAULT_PORT, help='端口，默认8000')
+    parser.add_argument('--bind', '-b', default='', help='监听地址，默认所有地址')
+    parser.add_argument('--directory', '-d', default='.', help='站点根目录，默认当前目录')
+    parser.add_argument('--quiet', '-q', action='store_true', help='不打印访问日志')
+    args = parser.parse_args(argv)
+
+    try:
+        server = make_server(args.directory, args.port, args.bind, args.quiet)
+    except OSError as e:
+        print(f"❌ 无法监听端口 {args.port}: {e}")
+        return 1
+
+    host = args.bind or 'localhost'
+    print(f"🚀 静态服务器已启动: http://{host}:{server.server_address[1]}/")
+    print(f"📁 站点目录: {os.path.abspath(args.directory)}")
+    print("按 Ctrl+C 停止")
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n👋 服务器已停止")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
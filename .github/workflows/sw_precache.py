@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Service Worker预缓存清单生成
+从index.html的资源依赖图（脚本、样式表、预加载、图标、manifest及其中的图标）
+收集同站资源，生成带内容哈希的预缓存清单 precache-manifest.json 和对应的 sw.js:
+
+- 安装时按清单预缓存全部资源；内容没变的资源直接从旧缓存复制，不重新下载
+- 脚本、样式等静态资源 cache-first（文件名带哈希的资源即使不在清单中也缓存）
+- HTML导航请求 stale-while-revalidate: 先返回缓存，同时在后台更新；离线时回退到首页
+- 激活时删除旧版本的缓存
+
+清单内容变化时sw.js的内容随之变化，浏览器会自动安装新版本
+
+check_precache_manifest() 供 run_checks 调用，验证清单中的每个URL都存在且与哈希一致
+
+用法（在站点根目录下运行）:
+    python3 sw_precache.py
+    python3 sw_precache.py --register      # 同时在index.html中注册Service Worker（补丁，可回滚）
+    python3 sw_precache.py --check
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from urllib.parse import urljoin, urlparse
+
+import patch_engine
+import site_cache
+from asset_graph import build_asset_graph, iter_resources
+from build_assets import HASHED_NAME_RE
+
+MANIFEST_FILE = 'precache-manifest.json'
+SERVICE_WORKER_FILE = 'sw.js'
+
+# 清单格式变化时递增
+MANIFEST_FORMAT = 1
+
+# 预缓存的资源类型（asset_graph中的kind）
+PRECACHE_KINDS = ('script', 'stylesheet', 'preload', 'icon', 'manifest')
+
+CACHE_PREFIX = 'photoeditor-precache-'
+
+# 每个资源的revision取内容哈希的前几位
+REVISION_LENGTH = 16
+
+SERVICE_WORKER_TEMPLATE = r'''// 由 sw_precache.py 生成，请勿手工修改
+'use strict';
+
+const VERSION = '__VERSION__';
+const CACHE_PREFIX = '__CACHE_PREFIX__';
+const CACHE_NAME = CACHE_PREFIX + VERSION;
+const PRECACHE = __ENTRIES__;
+const HASHED_ASSET = /__HASHED_RE__/;
+const NAVIGATION_FALLBACK = new URL('/', self.location).href;
+
+// 缓存键带上revision，内容不变的资源在新版本安装时可以从旧缓存复制
+const cacheKeys = new Map(PRECACHE.map((entry) => {
+    const url = new URL(entry.url, self.location).href;
+    return [url, `${url}?__rev=${entry.revision}`];
+}));
+
+async function findInOldCaches(key) {
+    for (const name of await caches.keys()) {
+        if (name.startsWith(CACHE_PREFIX) && name !== CACHE_NAME) {
+            const response = await (await caches.open(name)).match(key);
+            if (response) {
+                return response;
+            }
+        }
+    }
+    return null;
+}
+
+self.addEventListener('install', (event) => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(CACHE_NAME);
+        await Promise.all([...cacheKeys].map(async ([url, key]) => {
+            if (await cache.match(key)) {
+                return;
+            }
+            let response = await findInOldCaches(key);
+            if (!response) {
+                response = await fetch(url, {cache: 'reload'});
+                if (!response.ok) {
+                    throw new Error(`预缓存失败: ${url} (${response.status})`);
+                }
+            }
+            await cache.put(key, response);
+        }));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        for (const name of await caches.keys()) {
+            if (name.startsWith(CACHE_PREFIX) && name !== CACHE_NAME) {
+                await caches.delete(name);
+            }
+        }
+        await self.clients.claim();
+    })());
+});
+
+async function cacheFirst(request, key) {
+    const cache = await caches.open(CACHE_NAME);
+    const cached = await cache.match(key);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (response.ok) {
+        await cache.put(key, response.clone());
+    }
+    return response;
+}
+
+async function staleWhileRevalidate(event, key) {
+    const cache = await caches.open(CACHE_NAME);
+    const cached = await cache.match(key);
+    const network = fetch(event.request).then(async (response) => {
+        if (response.ok) {
+            await cache.put(key, response.clone());
+        }
+        return response;
+    });
+    if (cached) {
+        // 后台更新缓存，失败时保留旧内容
+        event.waitUntil(network.catch(() => undefined));
+        return cached;
+    }
+    try {
+        return await network;
+    } catch (error) {
+        const fallback = await cache.match(cacheKeys.get(NAVIGATION_FALLBACK) || NAVIGATION_FALLBACK);
+        if (fallback) {
+            return fallback;
+        }
+        throw error;
+    }
+}
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+    url.hash = '';
+    const key = cacheKeys.get(url.href);
+    if (request.mode === 'navigate' || (request.headers.get('Accept') || '').includes('text/html')) {
+        event.respondWith(staleWhileRevalidate(event, key || url.href));
+    } else if (key) {
+        event.respondWith(cacheFirst(request, key));
+    } else if (HASHED_ASSET.test(url.pathname)) {
+        event.respondWith(cacheFirst(request, url.href));
+    }
+});
+'''
+
+# 在</body>之前注册Service Worker
+REGISTER_SCRIPT = '''    <script>
+        if ('serviceWorker' in navigator) {
+            window.addEventListener('load', () => {
+                navigator.serviceWorker.register('/sw.js').catch((error) => {
+                    console.warn('Service Worker注册失败:', error);
+                });
+            });
+        }
+    </script>'''
+
+
+def _before_body_end(text):
+    """</body>所在行之前的位置（空区间，补丁插入为单独的行）"""
+    body_end = text.rfind('</body>')
+    if body_end == -1:
+        return None
+    line_start = text.rfind('\n', 0, body_end)
+    return line_start, line_start
+
+
+def register_patch(html_path='index.html'):
+    """在页面中注册Service Worker的补丁"""
+    return patch_engine.Patch(
+        'service-worker-register', 1, html_path, 'insert_after', REGISTER_SCRIPT,
+        anchor=_before_body_end,
+        already_present="navigator.serviceWorker.register('/sw.js')",
+        description='页面加载后注册预缓存Service Worker',
+    )
+
+
+# ---- 收集资源 ----
+
+def _site_url(url, page_url='/'):
+    """同站资源的站点绝对路径（去掉查询参数和片段），外部资源返回None"""
+    absolute = urljoin(page_url, url)
+    parsed = urlparse(absolute)
+    if parsed.scheme or parsed.netloc:
+        return None
+    return parsed.path
+
+
+def _manifest_icons(manifest_path, manifest_url):
+    """Web App Manifest中声明的图标URL"""
+    try:
+        manifest = json.loads(site_cache.read_text(manifest_path))
+    except (OSError, ValueError):
+        return []
+    return [urljoin(manifest_url, icon['src']) for icon in manifest.get('icons', []) if icon.get('src')]
+
+
+def collect_urls(html_path='index.html', root=None):
+    """页面需要预缓存的同站URL，按页面中的顺序去重，页面本身排在最前"""
+    if root is None:
+        root = os.path.dirname(html_path) or '.'
+    urls = ['/']
+    graph = build_asset_graph(html_path, root)
+    for resource in iter_resources(graph['resources']):
+        if resource['kind'] not in PRECACHE_KINDS or not resource['url']:
+            continue
+        url = _site_url(resource['url'])
+        if url is None:
+            continue
+        urls.append(url)
+        if resource['kind'] == 'manifest' and resource['exists']:
+            urls.extend(filter(None, (_site_url(icon) for icon in _manifest_icons(resource['local'], url))))
+    return list(dict.fromkeys(urls))
+
+
+def local_path(url, root='.'):
+    """站点URL对应的本地文件（目录对应其中的index.html）"""
+    path = os.path.join(root, url.lstrip('/'))
+    if url.endswith('/'):
+        path = os.path.join(path, 'index.html')
+    return os.path.normpath(path)
+
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_manifest(html_path='index.html', root='.'):
+    """生成清单，返回 (清单, 缺失的URL列表)"""
+    entries = []
+    missing = []
+    for url in collect_urls(html_path, root):
+        path = local_path(url, root)
+        if not site_cache.exists(path):
+            missing.append(url)
+            continue
+        entries.append({
+            'url': url,
+            'revision': _file_digest(path)[:REVISION_LENGTH],
+            'bytes': os.path.getsize(path),
+        })
+    version = hashlib.sha256(json.dumps(
+        [[entry['url'], entry['revision']] for entry in entries]).encode('utf-8')).hexdigest()[:12]
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'version': version,
+        'cache': CACHE_PREFIX + version,
+        'entries': entries,
+    }
+    return manifest, missing
+
+
+def render_service_worker(manifest):
+    """按清单生成sw.js"""
+    entries = [{'url': entry['url'], 'revision': entry['revision']} for entry in manifest['entries']]
+    return (SERVICE_WORKER_TEMPLATE
+            .replace('__VERSION__', manifest['version'])
+            .replace('__CACHE_PREFIX__', CACHE_PREFIX)
+            .replace('__ENTRIES__', json.dumps(entries, indent=4))
+            .replace('__HASHED_RE__', HASHED_NAME_RE.pattern))
+
+
+def _write_if_changed(path, text):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    patch_engine.atomic_write(path, text)
+    return True
+
+
+def generate(html_path='index.html', root='.'):
+    """写入清单和sw.js，返回报告"""
+    manifest, missing = build_manifest(html_path, root)
+    written = []
+    manifest_text = json.dumps(manifest, ensure_ascii=False, indent=2) + '\n'
+    if _write_if_changed(os.path.join(root, MANIFEST_FILE), manifest_text):
+        written.append(MANIFEST_FILE)
+    if _write_if_changed(os.path.join(root, SERVICE_WORKER_FILE), render_service_worker(manifest)):
+        written.append(SERVICE_WORKER_FILE)
+    return {'manifest': manifest, 'missing': missing, 'written': written}
+
+
+def print_report(report):
+    """打印结果"""
+    manifest = report['manifest']
+    print("📦 Service Worker预缓存清单")
+    print("=" * 60)
+    for entry in manifest['entries']:
+        hashed = ' 🔒' if HASHED_NAME_RE.search(entry['url']) else ''
+        print(f"  ✅ {entry['url']:<40} {entry['bytes']:>9} 字节  {entry['revision']}{hashed}")
+    for url in report['missing']:
+        print(f"  ⚠️ {url} 文件不存在，未加入清单")
+    total = sum(entry['bytes'] for entry in manifest['entries'])
+    print("=" * 60)
+    print(f"📋 {len(manifest['entries'])} 个资源，共 {total} 字节，缓存版本 {manifest['cache']}")
+    if report['written']:
+        print(f"💾 已写入: {', '.join(report['written'])}")
+    else:
+        print("✅ 清单和sw.js已是最新")
+
+
+# ---- 检查 ----
+
+def verify_manifest(html_path='index.html', root='.'):
+    """验证清单，返回 (是否存在清单, 问题列表)"""
+    manifest_path = os.path.join(root, MANIFEST_FILE)
+    if not site_cache.exists(manifest_path):
+        return False, []
+    problems = []
+    try:
+        manifest = json.loads(site_cache.read_text(manifest_path))
+    except ValueError as e:
+        return True, [f'{MANIFEST_FILE} 格式错误: {e}']
+
+    for entry in manifest.get('entries', []):
+        path = local_path(entry['url'], root)
+        if not site_cache.exists(path):
+            problems.append(f"{entry['url']} 文件不存在")
+        elif _file_digest(path)[:REVISION_LENGTH] != entry['revision']:
+            problems.append(f"{entry['url']} 内容与清单中的哈希不一致")
+
+    listed = {entry['url'] for entry in manifest.get('entries', [])}
+    for url in collect_urls(html_path, root):
+        if url not in listed and site_cache.exists(local_path(url, root)):
+            problems.append(f"{url} 被页面引用但不在清单中")
+
+    sw_path = os.path.join(root, SERVICE_WORKER_FILE)
+    if not site_cache.exists(sw_path):
+        problems.append(f'{SERVICE_WORKER_FILE} 不存在')
+    elif f"const VERSION = '{manifest.get('version')}';" not in site_cache.read_text(sw_path):
+        problems.append(f'{SERVICE_WORKER_FILE} 与清单版本不一致')
+    return True, problems
+
+
+def check_precache_manifest():
+    """检查预缓存清单中的每个URL都存在且与哈希一致"""
+    print("\n📦 检查Service Worker预缓存清单...")
+    exists, problems = verify_manifest()
+    if not exists:
+        print(f"  ⚠️ 未生成 {MANIFEST_FILE}（运行 python3 sw_precache.py）")
+        return None
+    if problems:
+        for problem in problems:
+            print(f"  ❌ {problem}")
+        print("  请重新运行: python3 sw_precache.py")
+        return False
+    print("  ✅ 清单中的资源全部存在且与哈希一致")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成Service Worker预缓存清单和sw.js')
+    parser.add_argument('--html', default='index.html', help='页面文件')
+    parser.add_argument('--register', action='store_true', help='在页面中注册Service Worker（补丁）')
+    parser.add_argument('--dry-run', action='store_true', help='与--register一起使用: 只预览补丁')
+    parser.add_argument('--check', action='store_true', help='只验证现有清单')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args(argv)
+    root = os.path.dirname(args.html) or '.'
+
+    if args.check:
+        exists, problems = verify_manifest(args.html, root)
+        if not exists:
+            print(f"❌ 未生成 {MANIFEST_FILE}")
+            return 1
+        for problem in problems:
+            print(f"❌ {problem}")
+        if not problems:
+            print("✅ 清单中的资源全部存在且与哈希一致")
+        return 1 if problems else 0
+
+    # 先注册，清单中记录的是注册后的页面
+    if args.register:
+        result = patch_engine.apply(register_patch(args.html), dry_run=args.dry_run)
+        patch_engine.print_result(result, dry_run=args.dry_run)
+        if result['status'] in ('missing-anchor', 'missing-file'):
+            return 1
+        if args.dry_run:
+            return 0
+
+    report = generate(args.html, root)
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,7 +6,9 @@ import subprocess
 import time
 import sys
 import json
-from pathlib import Path
+
+import js_index
+import site_cache
 
 def check_files():
     """Check if all required files exist"""
@@ -22,7 +24,7 @@ def check_files():
     
     print("Checking required files...")
     for file in required_files:
-        if not Path(file).exists():
+        if not site_cache.exists(file):
             print(f"❌ Missing file: {file}")
             return False
         print(f"✅ Found: {file}")
@@ -32,8 +34,7 @@ def check_files():
 def check_admin_user():
     """Check if admin user is created in user.js"""
     print("\nChecking admin user creation...")
-    with open('js/user.js', 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = site_cache.read_text('js/user.js')
         
     if 'createAdminUser()' in content:
         print("✅ Admin user creation method found")
@@ -58,8 +59,7 @@ def check_admin_user():
 def check_login_functionality():
     """Check if login supports both username and email"""
     print("\nChecking login functionality...")
-    with open('js/user.js', 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = site_cache.read_text('js/user.js')
         
     if 'emailOrUsername' in content:
         print("✅ Login supports username/email input")
@@ -78,22 +78,21 @@ def check_login_functionality():
 def check_canvas_initialization():
     """Check if canvas is properly initialized"""
     print("\nChecking canvas initialization...")
-    with open('js/main.js', 'r', encoding='utf-8') as f:
-        content = f.read()
+    index = js_index.load('js/main.js')
         
-    if 'initializeCanvas()' in content:
+    if index.defines('initializeCanvas') or index.calls('initializeCanvas'):
         print("✅ Canvas initialization method found")
     else:
         print("❌ Canvas initialization missing")
         return False
         
-    if 'canvas.width = 800' in content or 'this.canvas.width = 800' in content:
+    if index.assigns('this.canvas.width', '800') or index.assigns('canvas.width', '800'):
         print("✅ Default canvas width set")
     else:
         print("❌ Default canvas width not set")
         return False
         
-    if 'canvas.height = 600' in content or 'this.canvas.height = 600' in content:
+    if index.assigns('this.canvas.height', '600') or index.assigns('canvas.height', '600'):
         print("✅ Default canvas height set")
     else:
         print("❌ Default canvas height not set")
@@ -104,8 +103,7 @@ def check_canvas_initialization():
 def check_admin_panel():
     """Check if admin panel is implemented"""
     print("\nChecking admin panel...")
-    with open('js/user.js', 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = site_cache.read_text('js/user.js')
         
     if 'showAdminPanel' in content:
         print("✅ Admin panel method found")
@@ -130,8 +128,7 @@ def check_admin_panel():
 def check_translations():
     """Check if translations are complete"""
     print("\nChecking translations...")
-    with open('js/language.js', 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = site_cache.read_text('js/language.js')
         
     required_keys = [
         'emailOrUsername',
@@ -6,9 +6,38 @@
 
 import requests
 import time
-from bs4 import BeautifulSoup
 import re
 
+import html_scan
+import site_cache
+
+# 缩放显示修复需要检查的元素，一次流式扫描全部回答
+MOBILE_META_TAGS = [
+    'mobile-web-app-capable',
+    'apple-mobile-web-app-capable',
+    'format-detection'
+]
+
+SECTIONS_TO_CHECK = [
+    ('section', 'hero-section'),
+    ('section', 'features-section'),
+    ('section', 'faq-section'),
+    ('footer', 'main-footer')
+]
+
+ZOOM_QUERIES = [
+    html_scan.Query('viewport', tag='meta', attrs={'name': 'viewport'}),
+    *[html_scan.Query(f'meta:{tag}', tag='meta', attrs={'name': tag}) for tag in MOBILE_META_TAGS],
+    html_scan.Query('zoom_css', tag='style', text=re.compile(r'text-size-adjust')),
+    html_scan.Query('main_content', tag='main', class_='main-content'),
+    html_scan.Query('canvas', tag='canvas', id='mainCanvas'),
+    html_scan.Query('toolbar', tag='aside', class_='toolbar'),
+    html_scan.Query('properties', tag='aside', class_='properties-panel'),
+    html_scan.Query('main_js', tag='script', attrs={'src': lambda src: 'main.js' in src}),
+    html_scan.Query('main_css', tag='link', attrs={'rel': 'stylesheet', 'href': lambda href: 'main.css' in href}),
+    *[html_scan.Query(f'section:{class_name}', tag=tag, class_=class_name) for tag, class_name in SECTIONS_TO_CHECK],
+]
+
 def test_zoom_fixes():
     """测试缩放显示修复效果"""
     
@@ -17,21 +46,24 @@ def test_zoom_fixes():
     
     # 测试网站访问
     try:
-        response = requests.get('http://localhost:8000', timeout=5)
+        response = requests.get('http://localhost:8000', timeout=5, stream=True)
         if response.status_code == 200:
             print("✅ 网站可正常访问")
         else:
             print(f"❌ 网站访问失败: {response.status_code}")
+            response.close()
             return False
     except Exception as e:
         print(f"❌ 连接错误: {e}")
         return False
     
-    # 解析HTML
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # 流式解析HTML，所有元素都找到后不再读取剩余内容
+    with response:
+        response.encoding = response.encoding or 'utf-8'
+        found = html_scan.scan_chunks(response.iter_content(chunk_size=html_scan.CHUNK_SIZE, decode_unicode=True), ZOOM_QUERIES)
     
     # 检查viewport标签
-    viewport = soup.find('meta', attrs={'name': 'viewport'})
+    viewport = found['viewport']
     if viewport:
         content = viewport.get('content', '')
         print(f"📱 Viewport设置: {content}")
@@ -43,83 +75,60 @@ def test_zoom_fixes():
         print("❌ 缺少viewport标签")
     
     # 检查移动端优化标签
-    mobile_meta_tags = [
-        'mobile-web-app-capable',
-        'apple-mobile-web-app-capable',
-        'format-detection'
-    ]
-    
     mobile_optimized = True
-    for tag in mobile_meta_tags:
-        if soup.find('meta', attrs={'name': tag}):
+    for tag in MOBILE_META_TAGS:
+        if found[f'meta:{tag}']:
             print(f"✅ 找到移动端优化标签: {tag}")
         else:
             print(f"⚠️  缺少移动端优化标签: {tag}")
             mobile_optimized = False
     
     # 检查缩放优化CSS
-    zoom_css = soup.find('style', string=re.compile(r'text-size-adjust'))
-    if zoom_css:
+    if found['zoom_css']:
         print("✅ 找到缩放优化CSS样式")
     else:
         print("⚠️  未找到缩放优化CSS样式")
     
     # 检查HTML结构
-    main_content = soup.find('main', class_='main-content')
-    if main_content:
+    if found['main_content']:
         print("✅ 主内容区域结构正确")
     else:
         print("❌ 缺少主内容区域")
     
     # 检查Canvas元素
-    canvas = soup.find('canvas', id='mainCanvas')
-    if canvas:
+    if found['canvas']:
         print("✅ Canvas元素存在")
     else:
         print("❌ Canvas元素缺失")
     
     # 检查工具栏
-    toolbar = soup.find('aside', class_='toolbar')
-    if toolbar:
+    if found['toolbar']:
         print("✅ 工具栏结构正确")
     else:
         print("❌ 工具栏结构缺失")
     
     # 检查属性面板
-    properties = soup.find('aside', class_='properties-panel')
-    if properties:
+    if found['properties']:
         print("✅ 属性面板结构正确")
     else:
         print("⚠️  属性面板结构可能缺失")
     
     # 检查JavaScript文件
-    js_files = soup.find_all('script', src=True)
-    main_js = any('main.js' in js.get('src', '') for js in js_files)
-    if main_js:
+    if found['main_js']:
         print("✅ 主JavaScript文件已加载")
     else:
         print("❌ 主JavaScript文件缺失")
     
     # 检查CSS文件
-    css_files = soup.find_all('link', rel='stylesheet')
-    main_css = any('main.css' in css.get('href', '') for css in css_files)
-    if main_css:
+    if found['main_css']:
         print("✅ 主CSS文件已加载")
     else:
         print("❌ 主CSS文件缺失")
     
     # 检查SEO内容（新增的sections）
-    sections_to_check = [
-        ('section', 'hero-section'),
-        ('section', 'features-section'),
-        ('section', 'faq-section'),
-        ('footer', 'main-footer')
-    ]
-    
     seo_content_count = 0
-    for tag, class_name in sections_to_check:
-        element = soup.find(tag, class_=class_name)
-        if element:
+    for tag, class_name in SECTIONS_TO_CHECK:
+        if found[f'section:{class_name}']:
             print(f"✅ SEO内容区域存在: {class_name}")
             seo_content_count += 1
         else:
@@ -141,8 +150,7 @@ def check_css_fixes():
     print("-" * 40)
     
     try:
-        with open('/workspace/styles/main.css', 'r', encoding='utf-8') as f:
-            css_content = f.read()
+        css_content = site_cache.read_text('/workspace/styles/main.css')
         
         # 检查关键修复内容
         fixes_to_check = [
@@ -3,36 +3,38 @@
 验证PhotoEditor修复
 """
 
-import subprocess
-import os
+
+import js_syntax
+import site_cache
 
 def test_syntax():
-    """检查JavaScript语法"""
+    """检查页面中所有脚本的JavaScript语法"""
     print("🔍 检查JavaScript语法...")
     
-    js_files = ['js/main.js', 'js/user.js', 'js/notifications.js']
+    scripts, warnings = js_syntax.run()
+    
+    for script in scripts:
+        name = script['name']
+        if script['status'] == 'ok':
+            print(f"  ✅ {name} 语法正确")
+        elif script['status'] == 'error':
+            print(f"  ❌ {name} 语法错误:")
+            position = f" (第{script['error_line']}行)" if script['error_line'] else ''
+            print(f"     {script['message']}{position}")
+        elif script['status'] == 'missing':
+            print(f"  ❌ {name} 文件不存在")
+        elif script['status'] == 'skipped':
+            print(f"  ⚠️ Node.js未安装，跳过{name}语法检查")
+    for warning in warnings:
+        print(f"  ⚠️ {warning['script']}:{warning['line']} {warning['message']}")
     
-    for js_file in js_files:
-        if os.path.exists(js_file):
-            try:
-                result = subprocess.run(['node', '-c', js_file], 
-                                      capture_output=True, text=True)
-                if result.returncode == 0:
-                    print(f"  ✅ {js_file} 语法正确")
-                else:
-                    print(f"  ❌ {js_file} 语法错误:")
-                    print(f"     {result.stderr}")
-            except FileNotFoundError:
-                print(f"  ⚠️ Node.js未安装，跳过{js_file}语法检查")
-        else:
-            print(f"  ❌ {js_file} 文件不存在")
+    return not js_syntax.has_errors(scripts, warnings)
 
 def check_initialization():
     """检查初始化代码"""
     print("\n🔍 检查PhotoEditor初始化...")
     
-    with open('js/main.js', 'r', encoding='utf-8') as f:
-        content = f.read()
+    content = site_cache.read_text('js/main.js')
     
     if 'window.photoEditor = new PhotoEditor()' in content:
         print("  ✅ PhotoEditor实例化代码已添加")